@@ -9,6 +9,7 @@ Cette version combine les deux sources de données en un seul script pour facili
 
 import requests
 from bs4 import BeautifulSoup
+import html_parsing  # Parsing HTML rapide (lxml si disponible, sans scripts ni styles)
 import re
 import json
 import os
@@ -1227,7 +1228,7 @@ def scrape_spectacles(page_url):
             logger.error("Erreur lors de la récupération de la page %s : %s", page_url, response.status_code)
             return []
             
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = html_parsing.make_soup(response.text)
         spectacle_sections = soup.find_all('td', class_='bgbeige')
         spectacles = []
         
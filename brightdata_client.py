@@ -0,0 +1,222 @@
+"""
+Client HTTP partagé pour BrightData
+
+Tous les appels BrightData du projet (pipeline_complet_fixed.py, wellness.py)
+passent par un même client au lieu d'appeler requests.post/requests.get à
+chaque fois:
+- une requests.Session par mode d'accès (API Web Unlocker, super proxy),
+  avec un pool de connexions keep-alive: plus de nouvelle poignée de main
+  TCP + TLS vers api.brightdata.com à chaque page
+- nouvelles tentatives sur 429/5xx et erreurs réseau, avec attente
+  exponentielle à jitter (en respectant l'en-tête Retry-After)
+- un nombre maximum de requêtes simultanées par zone BrightData
+
+Utilisation:
+    import brightdata_client
+    html = brightdata_client.get_client().fetch(url, country="fr")
+"""
+
+import os
+import json
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configuration
+BRIGHTDATA_TOKEN = os.getenv("BRIGHTDATA_TOKEN")
+BRIGHTDATA_API_URL = "https://api.brightdata.com/request"
+BRIGHTDATA_PROXY_HOST = "brd.superproxy.io:22225"
+BRIGHTDATA_DEFAULT_ZONE = "web_unlocker1"
+BRIGHTDATA_POOL_SIZE = 32  # Connexions keep-alive conservées par session
+BRIGHTDATA_ZONE_CONCURRENCY = {"web_unlocker1": 8, "superproxy": 8}  # Requêtes simultanées par zone
+BRIGHTDATA_DEFAULT_CONCURRENCY = 8
+BRIGHTDATA_MAX_RETRIES = 3
+BRIGHTDATA_BACKOFF_BASE = 1.0  # Secondes, doublées à chaque tentative
+BRIGHTDATA_BACKOFF_MAX = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class BrightDataClient:
+    """
+    Client BrightData thread-safe à connexions persistantes
+
+    Les hooks permettent à chaque script de garder sa propre comptabilité:
+    - before_attempt(): appelé avant chaque tentative facturée, False pour abandonner
+      (ex: quota API épuisé)
+    - on_retry(reason): appelé à chaque nouvelle tentative (ex: métriques)
+    """
+    def __init__(self, token=None, pool_size=BRIGHTDATA_POOL_SIZE, zone_concurrency=None,
+                 max_retries=BRIGHTDATA_MAX_RETRIES, backoff_base=BRIGHTDATA_BACKOFF_BASE,
+                 backoff_max=BRIGHTDATA_BACKOFF_MAX):
+        self.token = token or BRIGHTDATA_TOKEN
+        self.pool_size = pool_size
+        self.zone_concurrency = dict(BRIGHTDATA_ZONE_CONCURRENCY)
+        self.zone_concurrency.update(zone_concurrency or {})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {"requests": 0, "ok": 0, "retries": 0, "failures": 0, "throttled": 0}
+        self._api_session = None
+        self._proxy_session = None
+        self._zone_slots = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        session = requests.Session()
+        # Les nouvelles tentatives sont gérées ici (jitter, Retry-After), pas par urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def api_session(self):
+        with self._lock:
+            if self._api_session is None:
+                self._api_session = self._new_session()
+                self._api_session.headers.update({
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.token}",
+                })
+            return self._api_session
+
+    @property
+    def proxy_session(self):
+        with self._lock:
+            if self._proxy_session is None:
+                self._proxy_session = self._new_session()
+                proxy_url = f"http://{self.token}:@{BRIGHTDATA_PROXY_HOST}"
+                self._proxy_session.proxies.update({"http": proxy_url, "https": proxy_url})
+            return self._proxy_session
+
+    def zone_slot(self, zone):
+        """Sémaphore limitant les requêtes simultanées d'une zone"""
+        with self._lock:
+            if zone not in self._zone_slots:
+                limit = self.zone_concurrency.get(zone, BRIGHTDATA_DEFAULT_CONCURRENCY)
+                self._zone_slots[zone] = threading.BoundedSemaphore(max(1, limit))
+            return self._zone_slots[zone]
+
+    def backoff_delay(self, attempt, response=None):
+        """
+        Délai avant la tentative suivante
+
+        Attente exponentielle à jitter complet (évite que tous les threads
+        reviennent en même temps), ou valeur de Retry-After si fournie.
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(self.backoff_max, float(retry_after))
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _send(self, send, zone, max_retries=None, before_attempt=None, on_retry=None, log_prefix=""):
+        """
+        Exécute une requête avec nouvelles tentatives
+
+        Returns:
+            Réponse 200 ou None
+        """
+        max_retries = max(1, int(max_retries or self.max_retries))
+        for attempt in range(max_retries):
+            if attempt > 0:
+                self._count("retries")
+                if on_retry:
+                    on_retry(zone)
+            if before_attempt is not None and not before_attempt():
+                return None
+
+            response = None
+            try:
+                with self.zone_slot(zone):
+                    self._count("requests")
+                    response = send()
+                if response.status_code == 200:
+                    self._count("ok")
+                    return response
+                print(f"{log_prefix}❌ Erreur BrightData {response.status_code}: {response.text[:200]}")
+                if response.status_code == 429:
+                    self._count("throttled")
+                if response.status_code not in RETRY_STATUS_CODES:
+                    # Erreur de requête (400, 401...): une nouvelle tentative donnerait le même résultat
+                    break
+            except requests.RequestException as e:
+                print(f"{log_prefix}❌ Erreur lors de la requête BrightData: {str(e)}")
+
+            if attempt < max_retries - 1:
+                wait_time = self.backoff_delay(attempt, response)
+                print(f"{log_prefix}⚠️ Tentative {attempt + 2}/{max_retries} dans {wait_time:.1f}s")
+                time.sleep(wait_time)
+
+        self._count("failures")
+        return None
+
+    def fetch(self, url, zone=BRIGHTDATA_DEFAULT_ZONE, render=True, country=None, timeout=120, **kwargs):
+        """
+        Récupère une page via l'API Web Unlocker
+
+        Args:
+            url: URL à scraper
+            zone: Zone BrightData
+            render: Exécuter le JavaScript de la page
+            country: Code pays de la sortie (ex: "fr")
+            timeout: Délai d'attente maximum par tentative en secondes
+            **kwargs: max_retries, before_attempt, on_retry, log_prefix
+
+        Returns:
+            Texte HTML de la page ou None en cas d'échec
+        """
+        payload = {"url": url, "zone": zone, "render": render, "format": "raw"}
+        if country:
+            payload["country"] = country
+        body = json.dumps(payload)
+        response = self._send(lambda: self.api_session.post(BRIGHTDATA_API_URL, data=body, timeout=timeout),
+                              zone, **kwargs)
+        return response.text if response is not None else None
+
+    def proxy_get(self, url, timeout=120, **kwargs):
+        """
+        Récupère une page à travers le super proxy BrightData
+
+        Returns:
+            Texte HTML de la page ou None en cas d'échec
+        """
+        response = self._send(lambda: self.proxy_session.get(url, timeout=timeout), "superproxy", **kwargs)
+        return response.text if response is not None else None
+
+    def close(self):
+        with self._lock:
+            for session in (self._api_session, self._proxy_session):
+                if session is not None:
+                    session.close()
+            self._api_session = None
+            self._proxy_session = None
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_client(token=None, zone_concurrency=None):
+    """
+    Client BrightData partagé par tous les threads du processus
+
+    Les paramètres ne sont pris en compte qu'à la création du client.
+    """
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = BrightDataClient(token=token, zone_concurrency=zone_concurrency)
+        return _CLIENT
+
+def close_client():
+    """Ferme les connexions du client partagé"""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is not None:
+            _CLIENT.close()
+            _CLIENT = None
@@ -0,0 +1,234 @@
+"""
+Requêtes géographiques sur les collections de producteurs
+
+Les producteurs sont géolocalisés en GeoJSON ({"type": "Point",
+"coordinates": [lon, lat]}): gps_coordinates pour les restaurants,
+location pour les lieux de loisirs, les événements et les lieux de
+beauté. Avec un index 2dsphere, MongoDB répond aux requêtes de proximité
+sans parcourir la collection:
+- nearest: les N producteurs les plus proches d'un point (avec leur distance)
+- within_radius / count_within_radius: producteurs dans un cercle
+- within_polygon / within_box: producteurs dans un polygone ou un rectangle
+
+Toutes les fonctions prennent les coordonnées dans l'ordre (lat, lon),
+comme le reste du dépôt; la conversion vers l'ordre GeoJSON est interne.
+
+Création des index de toutes les collections de producteurs:
+    python geo_queries.py indexes
+Restaurants les plus proches d'un point:
+    python geo_queries.py nearest 48.8867 2.3431 --limit 5
+"""
+
+import os
+import argparse
+
+from pymongo import MongoClient, GEOSPHERE
+from pymongo.errors import PyMongoError
+
+MONGO_URI = os.getenv("MONGO_URI")  # CLI uniquement (--mongo-uri sinon)
+EARTH_RADIUS_M = 6378100  # Rayon utilisé par MongoDB pour $centerSphere
+
+# Champ GeoJSON de chaque collection de producteurs: (base, collection) -> champ
+PRODUCER_GEO_FIELDS = {
+    ("Restauration_Officielle", "producers"): "gps_coordinates",
+    ("Loisir&Culture", "Loisir_Paris_Producers"): "location",
+    ("Loisir&Culture", "Loisir_Paris_Evenements"): "location",
+    ("Beauty_Wellness", "BeautyPlaces"): "location",
+}
+DEFAULT_GEO_FIELD = "gps_coordinates"
+
+def geo_point(lat, lon):
+    """Point GeoJSON (ordre [lon, lat])"""
+    return {"type": "Point", "coordinates": [float(lon), float(lat)]}
+
+def geo_field_for(collection):
+    """Champ GeoJSON d'une collection de producteurs connue (gps_coordinates par défaut)"""
+    return PRODUCER_GEO_FIELDS.get((collection.database.name, collection.name), DEFAULT_GEO_FIELD)
+
+def point_coordinates(value):
+    """
+    (lat, lon) d'une valeur de localisation, quel que soit son format
+
+    Formats reconnus: GeoJSON {"type": "Point", "coordinates": [lon, lat]},
+    {"lat", "lng"}, {"latitude", "longitude"}.
+
+    Returns:
+        Tuple (lat, lon) ou None
+    """
+    if not isinstance(value, dict):
+        return None
+    coordinates = value.get("coordinates")
+    if isinstance(coordinates, (list, tuple)) and len(coordinates) >= 2 and None not in coordinates[:2]:
+        return coordinates[1], coordinates[0]
+    lat = value.get("lat", value.get("latitude"))
+    lon = value.get("lng", value.get("lon", value.get("longitude")))
+    if lat is None or lon is None:
+        return None
+    return lat, lon
+
+def ensure_geo_index(collection, field=None):
+    """
+    Crée (si nécessaire) l'index 2dsphere d'une collection
+
+    La création échoue si des documents existants ont une localisation
+    invalide (coordonnées nulles, ordre lat/lon inversé hors bornes...):
+    l'erreur est signalée et la collection reste sans index.
+
+    Returns:
+        True si l'index est disponible, False sinon
+    """
+    field = field or geo_field_for(collection)
+    try:
+        # create_index est idempotent: sans effet si l'index existe déjà
+        collection.create_index([(field, GEOSPHERE)])
+        return True
+    except PyMongoError as e:
+        print(f"⚠️ Index 2dsphere impossible sur {collection.database.name}.{collection.name}.{field}: {e}")
+        return False
+
+def ensure_producer_geo_indexes(client, collections=None):
+    """
+    Crée les index 2dsphere de toutes les collections de producteurs
+
+    Args:
+        client: MongoClient
+        collections: Sous-ensemble de PRODUCER_GEO_FIELDS (défaut: toutes)
+
+    Returns:
+        Dictionnaire {"base.collection": index disponible}
+    """
+    status = {}
+    for (db_name, collection_name), field in (collections or PRODUCER_GEO_FIELDS).items():
+        status[f"{db_name}.{collection_name}"] = ensure_geo_index(client[db_name][collection_name], field)
+    return status
+
+def _with_query(geo_filter, query):
+    return {"$and": [query, geo_filter]} if query else geo_filter
+
+def nearest(collection, lat, lon, limit=10, max_distance_m=None, query=None, projection=None, field=None):
+    """
+    Producteurs les plus proches d'un point, du plus proche au plus lointain
+
+    Args:
+        collection: Collection MongoDB (index 2dsphere requis)
+        lat, lon: Point de référence
+        limit: Nombre maximum de résultats
+        max_distance_m: Distance maximale en mètres (optionnelle)
+        query: Filtre supplémentaire (ex: {"category": "Restaurant"})
+        projection: Champs à renvoyer (dictionnaire $project)
+        field: Champ GeoJSON (défaut: celui de la collection)
+
+    Returns:
+        Liste de documents, chacun avec sa distance en mètres ("distance_m")
+    """
+    field = field or geo_field_for(collection)
+    geo_near = {
+        "near": geo_point(lat, lon),
+        "key": field,
+        "distanceField": "distance_m",
+        "spherical": True,
+    }
+    if max_distance_m is not None:
+        geo_near["maxDistance"] = max_distance_m
+    if query:
+        geo_near["query"] = query
+    pipeline = [{"$geoNear": geo_near}, {"$limit": int(limit)}]
+    if projection:
+        pipeline.append({"$project": {**projection, "distance_m": 1}})
+    return list(collection.aggregate(pipeline))
+
+def radius_filter(lat, lon, radius_m, field=DEFAULT_GEO_FIELD):
+    """Filtre MongoDB des documents dans un cercle (utilisable avec count_documents)"""
+    return {field: {"$geoWithin": {"$centerSphere": [[float(lon), float(lat)], radius_m / EARTH_RADIUS_M]}}}
+
+def polygon_filter(points, field=DEFAULT_GEO_FIELD):
+    """
+    Filtre MongoDB des documents dans un polygone
+
+    Args:
+        points: Sommets [(lat, lon), ...], fermé automatiquement
+    """
+    ring = [[float(lon), float(lat)] for lat, lon in points]
+    if ring and ring[0] != ring[-1]:
+        ring.append(ring[0])
+    if len(ring) < 4:
+        raise ValueError("Un polygone nécessite au moins 3 sommets")
+    return {field: {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}}}
+
+def box_filter(lat_min, lat_max, lng_min, lng_max, field=DEFAULT_GEO_FIELD):
+    """Filtre MongoDB des documents dans un rectangle (mêmes bornes que les zones du pipeline)"""
+    return polygon_filter([(lat_min, lng_min), (lat_min, lng_max), (lat_max, lng_max), (lat_max, lng_min)], field)
+
+def within_radius(collection, lat, lon, radius_m, query=None, projection=None, limit=0, field=None):
+    """
+    Producteurs situés à moins de radius_m mètres d'un point (ordre quelconque)
+
+    Returns:
+        Curseur MongoDB
+    """
+    geo_filter = radius_filter(lat, lon, radius_m, field or geo_field_for(collection))
+    return collection.find(_with_query(geo_filter, query), projection).limit(limit)
+
+def count_within_radius(collection, lat, lon, radius_m, query=None, field=None):
+    """Nombre de producteurs situés à moins de radius_m mètres d'un point"""
+    geo_filter = radius_filter(lat, lon, radius_m, field or geo_field_for(collection))
+    return collection.count_documents(_with_query(geo_filter, query))
+
+def within_polygon(collection, points, query=None, projection=None, limit=0, field=None):
+    """
+    Producteurs situés dans un polygone [(lat, lon), ...]
+
+    Returns:
+        Curseur MongoDB
+    """
+    geo_filter = polygon_filter(points, field or geo_field_for(collection))
+    return collection.find(_with_query(geo_filter, query), projection).limit(limit)
+
+def within_box(collection, lat_min, lat_max, lng_min, lng_max, query=None, projection=None, limit=0, field=None):
+    """
+    Producteurs situés dans un rectangle
+
+    Returns:
+        Curseur MongoDB
+    """
+    geo_filter = box_filter(lat_min, lat_max, lng_min, lng_max, field or geo_field_for(collection))
+    return collection.find(_with_query(geo_filter, query), projection).limit(limit)
+
+def count_within_box(collection, lat_min, lat_max, lng_min, lng_max, query=None, field=None):
+    """Nombre de producteurs situés dans un rectangle"""
+    geo_filter = box_filter(lat_min, lat_max, lng_min, lng_max, field or geo_field_for(collection))
+    return collection.count_documents(_with_query(geo_filter, query))
+
+def main():
+    parser = argparse.ArgumentParser(description="Index et requêtes géographiques des producteurs")
+    parser.add_argument("--mongo-uri", default=MONGO_URI, help="URI MongoDB (défaut: variable MONGO_URI)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("indexes", help="Créer les index 2dsphere de toutes les collections de producteurs")
+    nearest_parser = subparsers.add_parser("nearest", help="Producteurs les plus proches d'un point")
+    nearest_parser.add_argument("lat", type=float)
+    nearest_parser.add_argument("lon", type=float)
+    nearest_parser.add_argument("--limit", type=int, default=10, help="Nombre de résultats (défaut: 10)")
+    nearest_parser.add_argument("--max-distance", type=float, help="Distance maximale en mètres")
+    nearest_parser.add_argument("--db", default="Restauration_Officielle", help="Base (défaut: Restauration_Officielle)")
+    nearest_parser.add_argument("--collection", default="producers", help="Collection (défaut: producers)")
+
+    args = parser.parse_args()
+    if not args.mongo_uri:
+        parser.error("URI MongoDB manquante: --mongo-uri ou variable MONGO_URI")
+    client = MongoClient(args.mongo_uri)
+    try:
+        if args.command == "indexes":
+            for name, ok in ensure_producer_geo_indexes(client).items():
+                print(f"{'✅' if ok else '❌'} {name}")
+        else:
+            collection = client[args.db][args.collection]
+            ensure_geo_index(collection)
+            for doc in nearest(collection, args.lat, args.lon, limit=args.limit, max_distance_m=args.max_distance,
+                               projection={"name": 1, "lieu": 1, "address": 1}):
+                print(f"{doc['distance_m']:>8.0f} m  {doc.get('name') or doc.get('lieu')}  {doc.get('address', '')}")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
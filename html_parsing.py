@@ -0,0 +1,192 @@
+"""
+Parsing HTML partagé par les scrapers
+
+Les pages rendues par BrightData (render: True) sont volumineuses et
+BeautifulSoup(html, 'html.parser') est le backend le plus lent. Ce module
+choisit le backend le plus rapide disponible et limite ce qui est parsé:
+- BeautifulSoup sur lxml si installé, sinon html.parser
+- suppression des blocs <script>, <style>, <svg>, <noscript>, <template>
+  et de <head> avant parsing (jamais lus par les scrapers, souvent la
+  majorité du poids d'une page rendue)
+- SoupStrainer pour ne construire que les balises utiles (ex: liens Bing)
+- selectolax, si installé, pour l'extraction de liens
+- sélecteurs CSS compilés une fois (soupsieve)
+
+Benchmark sur des pages enregistrées (fichiers <plateforme>_<nom>.html):
+    python html_parsing.py benchmark fixtures/ --iterations 5
+"""
+
+import os
+import re
+import glob
+import time
+import argparse
+import functools
+from collections import defaultdict
+
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+
+try:
+    import lxml  # noqa: F401 (backend de BeautifulSoup)
+    BS4_PARSER = "lxml"
+except ImportError:
+    BS4_PARSER = "html.parser"
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as FastHTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as FastHTMLParser  # selectolax < 0.3.14
+    except ImportError:
+        FastHTMLParser = None  # Extraction de liens via BeautifulSoup
+
+NOISE_BLOCK_PATTERN = r"<(script|style|svg|noscript|template)\b[^>]*>.*?</\1\s*>"
+HEAD_PATTERN = r"<head\b[^>]*>.*?</head\s*>"
+NOISE_BLOCK_RE = re.compile(NOISE_BLOCK_PATTERN, re.IGNORECASE | re.DOTALL)
+HEAD_RE = re.compile(HEAD_PATTERN, re.IGNORECASE | re.DOTALL)
+# Variantes bytes: l'encodage d'une réponse brute reste détecté par BeautifulSoup
+NOISE_BLOCK_BYTES_RE = re.compile(NOISE_BLOCK_PATTERN.encode(), re.IGNORECASE | re.DOTALL)
+LINK_TAGS = SoupStrainer("a", href=True)
+
+def strip_noise(html):
+    """Retire <head> et les blocs jamais lus par les scrapers (scripts, styles, SVG)"""
+    if isinstance(html, bytes):
+        # <head> est conservé: il peut déclarer l'encodage (<meta charset>)
+        return NOISE_BLOCK_BYTES_RE.sub(b"", html)
+    return NOISE_BLOCK_RE.sub("", HEAD_RE.sub("", html, count=1))
+
+def make_soup(html, parse_only=None, strip=True):
+    """
+    Parse une page avec le backend le plus rapide disponible
+
+    Args:
+        html: Contenu HTML (str ou bytes)
+        parse_only: SoupStrainer limitant les balises construites
+        strip: Retirer <head>, scripts et styles avant parsing
+
+    Returns:
+        Objet BeautifulSoup
+    """
+    if strip:
+        html = strip_noise(html)
+    return BeautifulSoup(html, BS4_PARSER, parse_only=parse_only)
+
+def only_tags(*names):
+    """SoupStrainer ne construisant que les balises indiquées (et leur contenu)"""
+    return SoupStrainer(list(names))
+
+@functools.lru_cache(maxsize=256)
+def compile_selector(css):
+    """Sélecteur CSS compilé une seule fois"""
+    return soupsieve.compile(css)
+
+def select(soup, css):
+    return compile_selector(css).select(soup)
+
+def select_one(soup, css):
+    return compile_selector(css).select_one(soup)
+
+def extract_links(html, pattern=None):
+    """
+    Liste les href des liens <a> d'une page, dans l'ordre du document
+
+    Args:
+        html: Contenu HTML
+        pattern: Expression régulière (str ou compilée) que le href doit contenir
+
+    Returns:
+        Liste des href
+    """
+    if isinstance(pattern, str):
+        pattern = re.compile(pattern)
+    if FastHTMLParser is not None:
+        hrefs = [node.attributes.get("href") for node in FastHTMLParser(html).css("a[href]")]
+    else:
+        hrefs = [a.get("href") for a in make_soup(html, parse_only=LINK_TAGS).find_all("a")]
+    return [href for href in hrefs if href and (pattern is None or pattern.search(href))]
+
+# =============================================
+# BENCHMARK
+# =============================================
+
+def load_fixtures(directory):
+    """
+    Charge des pages enregistrées, regroupées par plateforme
+
+    Le nom de fichier donne la plateforme: tripadvisor_le-comptoir.html -> tripadvisor
+    """
+    pages = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        platform = os.path.basename(path).split("_", 1)[0]
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages[platform].append(f.read())
+    return dict(pages)
+
+def _time_per_page(func, pages, iterations):
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        for html in pages:
+            func(html)
+    return (time.perf_counter() - start_time) / (iterations * len(pages)) * 1000
+
+def benchmark_parsing(pages_by_platform, iterations=5):
+    """
+    Compare les backends de parsing sur des pages réelles, par plateforme
+
+    Args:
+        pages_by_platform: Dictionnaire {plateforme: [html, ...]}
+        iterations: Nombre de passes sur chaque page
+
+    Returns:
+        Dictionnaire {plateforme: {variante: ms par page}}
+    """
+    variants = [("html.parser", lambda html: BeautifulSoup(html, "html.parser"))]
+    if BS4_PARSER == "lxml":
+        variants.append(("lxml", lambda html: BeautifulSoup(html, "lxml")))
+    variants.append((f"{BS4_PARSER}+nettoyage", lambda html: make_soup(html)))
+    variants.append(("liens", lambda html: extract_links(html)))
+
+    results = {}
+    print(f"\n📊 BENCHMARK PARSING ({iterations} itérations, ms par page)")
+    print("=" * 90)
+    print(f"{'PLATEFORME':<14} | {'PAGES':<5} | {'Ko/PAGE':<8} | " + " | ".join(f"{name:<18}" for name, _ in variants))
+    print("-" * 90)
+    for platform, pages in sorted(pages_by_platform.items()):
+        if not pages:
+            continue
+        average_kb = sum(len(html) for html in pages) / len(pages) / 1024
+        timings = {name: _time_per_page(func, pages, iterations) for name, func in variants}
+        baseline = timings["html.parser"]
+        cells = [f"{ms:>7.1f} (x{baseline / ms:>4.1f})" if ms else f"{ms:>7.1f}" for ms in timings.values()]
+        print(f"{platform:<14} | {len(pages):<5} | {average_kb:<8.0f} | " + " | ".join(f"{cell:<18}" for cell in cells))
+
+        # Les liens extraits doivent être les mêmes qu'avec le parsing de référence
+        for html in pages:
+            reference = [a.get("href") for a in BeautifulSoup(html, "html.parser").find_all("a", href=True) if a.get("href")]
+            if extract_links(html) != reference:
+                print(f"   ⚠️ {platform}: liens différents de html.parser sur au moins une page")
+                break
+        results[platform] = timings
+    print("=" * 90)
+    print(f"Backend BeautifulSoup: {BS4_PARSER} | selectolax: {'oui' if FastHTMLParser else 'non'}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Parsing HTML partagé par les scrapers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench = subparsers.add_parser("benchmark", help="Comparer les backends sur des pages enregistrées")
+    bench.add_argument("fixtures", help="Répertoire de pages <plateforme>_<nom>.html")
+    bench.add_argument("--iterations", type=int, default=5, help="Passes sur chaque page (défaut: 5)")
+
+    args = parser.parse_args()
+    if args.command == "benchmark":
+        pages = load_fixtures(args.fixtures)
+        if not pages:
+            print(f"❌ Aucune page .html dans {args.fixtures}")
+            return
+        benchmark_parsing(pages, iterations=max(1, args.iterations))
+
+if __name__ == "__main__":
+    main()
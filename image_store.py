@@ -0,0 +1,414 @@
+"""
+Stockage des images par contenu (content-addressed)
+
+Les images ne sont plus stockées en URL data base64 dans les documents
+MongoDB: chaque image est écrite une seule fois, sous le hash SHA-256 de
+son contenu, et le document ne garde qu'une référence courte de la forme
+"blob:sha256:<hash>.<extension>". Deux restaurants avec la même photo
+partagent le même blob.
+
+Deux backends:
+- "filesystem": fichiers sous IMAGE_STORE_DIR/<2 premiers caractères>/<hash>.<ext>
+- "gridfs": bucket GridFS "images" de la base MongoDB, _id = hash
+
+Utilisation en ligne de commande (migration des images déjà en base):
+    python image_store.py migrate --db Restauration_Officielle --collection producers --fields image,photo,photos,images
+    python image_store.py migrate --db Beauty_Wellness --collection BeautyPlaces --fields profile_photo --backend gridfs
+    python image_store.py get blob:sha256:<hash>.jpeg --out image.jpeg
+"""
+
+import os
+import re
+import base64
+import hashlib
+import argparse
+import traceback
+
+from pymongo import MongoClient, UpdateOne
+
+try:
+    import gridfs
+except ImportError:
+    gridfs = None  # Backend GridFS indisponible sans le paquet pymongo complet
+
+# Configuration
+# Désactivé par défaut: les lecteurs des documents (générateur de posts, application) doivent résoudre les références
+IMAGE_STORE_ENABLED = os.getenv("IMAGE_STORE_ENABLED", "false").lower() == "true"
+# GridFS par défaut: le backend filesystem n'est lisible que sur la machine du scraper
+IMAGE_STORE_BACKEND = os.getenv("IMAGE_STORE_BACKEND", "gridfs")  # "gridfs" ou "filesystem"
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_store"))
+IMAGE_STORE_BUCKET = "images"  # Nom du bucket GridFS
+MIGRATION_BATCH_SIZE = 100  # Documents mis à jour par bulk_write lors de la migration
+
+BLOB_REF_PREFIX = "blob:sha256:"
+BLOB_REF_RE = re.compile(r"^blob:sha256:([0-9a-f]{64})\.([a-z0-9]+)$")
+DATA_URL_RE = re.compile(r"^data:(image/[a-zA-Z0-9.+-]+);base64,(.*)$", re.DOTALL)
+
+def is_blob_ref(value):
+    """Indique si une valeur est une référence vers le stockage d'images"""
+    return isinstance(value, str) and BLOB_REF_RE.match(value) is not None
+
+def is_data_url(value):
+    """Indique si une valeur est une image inline (URL data base64)"""
+    return isinstance(value, str) and value.startswith("data:image/")
+
+def parse_data_url(data_url):
+    """
+    Décode une URL data base64
+
+    Args:
+        data_url: Chaîne "data:image/<type>;base64,<contenu>"
+
+    Returns:
+        Tuple (content_type, octets) ou None si la valeur n'est pas une image inline valide
+    """
+    match = DATA_URL_RE.match(data_url or "")
+    if not match:
+        return None
+    try:
+        return match.group(1).lower(), base64.b64decode(match.group(2))
+    except Exception:
+        return None
+
+def make_blob_ref(data, content_type):
+    """Calcule la référence d'un contenu: blob:sha256:<hash>.<extension>"""
+    digest = hashlib.sha256(data).hexdigest()
+    extension = content_type.split("/")[-1].split("+")[0].lower()
+    if extension == "jpg":
+        extension = "jpeg"
+    return f"{BLOB_REF_PREFIX}{digest}.{extension}"
+
+def split_blob_ref(ref):
+    """
+    Décompose une référence
+
+    Returns:
+        Tuple (hash, content_type)
+    """
+    match = BLOB_REF_RE.match(ref or "")
+    if not match:
+        raise ValueError(f"Référence d'image invalide: {ref}")
+    return match.group(1), f"image/{match.group(2)}"
+
+class FilesystemBlobStore:
+    """
+    Blobs écrits sur disque, un fichier par hash (écriture atomique)
+    """
+    def __init__(self, root=None):
+        self.root = root or IMAGE_STORE_DIR
+
+    def _path(self, ref):
+        digest, content_type = split_blob_ref(ref)
+        return os.path.join(self.root, digest[:2], f"{digest}.{content_type.split('/')[-1]}")
+
+    def exists(self, ref):
+        return os.path.exists(self._path(ref))
+
+    def put(self, data, content_type):
+        """
+        Écrit un contenu s'il n'existe pas déjà
+
+        Returns:
+            Tuple (référence, True si le blob vient d'être créé)
+        """
+        ref = make_blob_ref(data, content_type)
+        path = self._path(ref)
+        if os.path.exists(path):
+            return ref, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return ref, True
+
+    def get(self, ref):
+        """
+        Returns:
+            Tuple (octets, content_type) ou None si le blob est absent
+        """
+        path = self._path(ref)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read(), split_blob_ref(ref)[1]
+
+class GridFSBlobStore:
+    """
+    Blobs stockés dans un bucket GridFS, identifiés par leur hash
+    """
+    def __init__(self, db, bucket_name=IMAGE_STORE_BUCKET):
+        if gridfs is None:
+            raise RuntimeError("Le module gridfs (pymongo) est requis pour le backend GridFS")
+        self.bucket = gridfs.GridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    def exists(self, ref):
+        digest, _ = split_blob_ref(ref)
+        return self.files.count_documents({"_id": digest}, limit=1) > 0
+
+    def put(self, data, content_type):
+        """
+        Écrit un contenu s'il n'existe pas déjà
+
+        Returns:
+            Tuple (référence, True si le blob vient d'être créé)
+        """
+        ref = make_blob_ref(data, content_type)
+        digest, _ = split_blob_ref(ref)
+        if self.exists(ref):
+            return ref, False
+        try:
+            self.bucket.upload_from_stream_with_id(
+                digest, ref, data, metadata={"contentType": content_type}
+            )
+        except Exception as e:
+            # Écriture concurrente du même contenu: le blob existe déjà
+            if "duplicate key" in str(e).lower():
+                return ref, False
+            raise
+        return ref, True
+
+    def get(self, ref):
+        """
+        Returns:
+            Tuple (octets, content_type) ou None si le blob est absent
+        """
+        digest, content_type = split_blob_ref(ref)
+        try:
+            return self.bucket.open_download_stream(digest).read(), content_type
+        except Exception:
+            return None
+
+def get_image_store(backend=None, db=None, root=None):
+    """
+    Construit le stockage d'images configuré
+
+    Args:
+        backend: "filesystem" ou "gridfs" (défaut: IMAGE_STORE_BACKEND)
+        db: Base MongoDB (obligatoire pour GridFS)
+        root: Dossier racine du backend filesystem (défaut: IMAGE_STORE_DIR)
+    """
+    backend = backend or IMAGE_STORE_BACKEND
+    if backend == "gridfs":
+        if db is None:
+            raise ValueError("Le backend GridFS nécessite une base MongoDB")
+        return GridFSBlobStore(db)
+    return FilesystemBlobStore(root)
+
+def store_image_value(value, store):
+    """
+    Remplace une image inline par sa référence
+
+    Les URLs http(s), références existantes et valeurs vides sont renvoyées
+    telles quelles.
+
+    Returns:
+        Tuple (nouvelle valeur, octets déplacés hors du document)
+    """
+    if not is_data_url(value):
+        return value, 0
+    parsed = parse_data_url(value)
+    if parsed is None:
+        return value, 0
+    content_type, data = parsed
+    ref, _ = store.put(data, content_type)
+    return ref, len(value) - len(ref)
+
+def externalize_images(document, fields, store):
+    """
+    Remplace les images inline d'un document par des références (en place)
+
+    Args:
+        document: Document MongoDB (dict)
+        fields: Champs à traiter; chaînes ou listes de chaînes
+        store: Stockage d'images
+
+    Returns:
+        Nombre d'octets retirés du document
+    """
+    saved = 0
+    for field in fields:
+        value = document.get(field)
+        if isinstance(value, list):
+            new_values = []
+            for item in value:
+                new_item, moved = store_image_value(item, store)
+                new_values.append(new_item)
+                saved += moved
+            document[field] = new_values
+        elif value:
+            document[field], moved = store_image_value(value, store)
+            saved += moved
+    return saved
+
+def resolve_image(value, store):
+    """
+    Reconstitue une URL data à partir d'une référence (pour les lecteurs
+    qui ont encore besoin de l'image inline)
+
+    Returns:
+        URL data, la valeur d'origine si ce n'est pas une référence, ou None si le blob est absent
+    """
+    if not is_blob_ref(value):
+        return value
+    blob = store.get(value)
+    if blob is None:
+        return None
+    data, content_type = blob
+    return f"data:{content_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+def has_blob_refs(document, fields):
+    """Indique si un des champs d'image d'un document contient une référence"""
+    for field in fields:
+        value = document.get(field)
+        if any(is_blob_ref(item) for item in (value if isinstance(value, list) else [value])):
+            return True
+    return False
+
+def resolve_images(document, fields, store):
+    """
+    Copie d'un document dont les références d'image sont remplacées par des URLs data
+
+    Les références dont le blob est introuvable sont retirées (chaîne vide ou
+    élément de liste supprimé) plutôt que transmises comme URL inutilisable.
+
+    Args:
+        document: Document MongoDB (dict), non modifié
+        fields: Champs d'image à résoudre
+        store: Stockage d'images
+
+    Returns:
+        Nouveau dictionnaire (le document d'origine si aucune référence n'est présente)
+    """
+    resolved = None
+    for field in fields:
+        value = document.get(field)
+        if isinstance(value, list):
+            if not any(is_blob_ref(item) for item in value):
+                continue
+            new_value = [resolve_image(item, store) for item in value]
+            new_value = [item for item in new_value if item]
+        elif is_blob_ref(value):
+            new_value = resolve_image(value, store) or ""
+        else:
+            continue
+        if resolved is None:
+            resolved = dict(document)
+        resolved[field] = new_value
+    return resolved if resolved is not None else document
+
+def migrate_collection(collection, fields, store, batch_size=MIGRATION_BATCH_SIZE, dry_run=False, limit=None):
+    """
+    Déplace les images inline existantes d'une collection vers le stockage
+
+    Seuls les documents dont un des champs contient encore une URL data sont
+    lus, et seuls ces champs sont projetés. La migration peut être relancée:
+    les documents déjà migrés ne correspondent plus au filtre.
+
+    Args:
+        collection: Collection MongoDB
+        fields: Champs d'image (chaînes ou listes de chaînes)
+        store: Stockage d'images cible
+        batch_size: Documents par bulk_write
+        dry_run: Si True, compte sans rien écrire
+        limit: Nombre maximum de documents à migrer
+
+    Returns:
+        Statistiques de migration
+    """
+    query = {"$or": [{field: {"$regex": "^data:image/"}} for field in fields]}
+    projection = {field: 1 for field in fields}
+    cursor = collection.find(query, projection, no_cursor_timeout=not dry_run, batch_size=batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    stats = {"documents": 0, "images": 0, "bytes_saved": 0}
+    operations = []
+    try:
+        for document in cursor:
+            updates = {}
+            for field in fields:
+                value = document.get(field)
+                values = value if isinstance(value, list) else [value]
+                inline = [item for item in values if is_data_url(item)]
+                if not inline:
+                    continue
+                stats["images"] += len(inline)
+                if dry_run:
+                    stats["bytes_saved"] += sum(len(item) for item in inline)
+                    continue
+                doc_part = {field: value}
+                stats["bytes_saved"] += externalize_images(doc_part, [field], store)
+                updates[field] = doc_part[field]
+
+            stats["documents"] += 1
+            if updates:
+                operations.append(UpdateOne({"_id": document["_id"]}, {"$set": updates}))
+            if len(operations) >= batch_size:
+                collection.bulk_write(operations, ordered=False)
+                operations = []
+                print(f"📦 {stats['documents']} documents migrés ({stats['bytes_saved'] / 1024 / 1024:.1f} Mo retirés)")
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+    finally:
+        cursor.close()
+
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Stockage des images par contenu et migration des images inline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Déplacer les images base64 inline d'une collection vers le stockage")
+    migrate_parser.add_argument("--uri", type=str, default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"), help="URI MongoDB")
+    migrate_parser.add_argument("--db", type=str, required=True, help="Base de données (ex: Restauration_Officielle)")
+    migrate_parser.add_argument("--collection", type=str, required=True, help="Collection (ex: producers, BeautyPlaces)")
+    migrate_parser.add_argument("--fields", type=str, default="image,photo,photos,images", help="Champs d'image séparés par des virgules")
+    migrate_parser.add_argument("--backend", choices=["filesystem", "gridfs"], default=IMAGE_STORE_BACKEND, help=f"Backend de stockage (défaut: {IMAGE_STORE_BACKEND})")
+    migrate_parser.add_argument("--store-dir", type=str, default=IMAGE_STORE_DIR, help="Dossier du backend filesystem")
+    migrate_parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE, help="Documents par écriture groupée")
+    migrate_parser.add_argument("--limit", type=int, default=None, help="Nombre maximum de documents à migrer")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="Compter les images à déplacer sans rien écrire")
+
+    get_parser = subparsers.add_parser("get", help="Extraire une image du stockage")
+    get_parser.add_argument("ref", type=str, help="Référence blob:sha256:<hash>.<ext>")
+    get_parser.add_argument("--out", type=str, default=None, help="Fichier de sortie (défaut: <hash>.<ext>)")
+    get_parser.add_argument("--uri", type=str, default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"), help="URI MongoDB (backend GridFS)")
+    get_parser.add_argument("--db", type=str, default=None, help="Base de données (backend GridFS)")
+    get_parser.add_argument("--backend", choices=["filesystem", "gridfs"], default=IMAGE_STORE_BACKEND, help="Backend de stockage")
+    get_parser.add_argument("--store-dir", type=str, default=IMAGE_STORE_DIR, help="Dossier du backend filesystem")
+
+    args = parser.parse_args()
+
+    try:
+        client = MongoClient(args.uri) if args.backend == "gridfs" or args.command == "migrate" else None
+        db = client[args.db] if client is not None and args.db else None
+        store = get_image_store(args.backend, db=db, root=args.store_dir)
+
+        if args.command == "migrate":
+            fields = [field.strip() for field in args.fields.split(",") if field.strip()]
+            print(f"🚚 Migration des images de {args.db}.{args.collection} ({', '.join(fields)}) vers {args.backend}"
+                  f"{' (simulation)' if args.dry_run else ''}")
+            stats = migrate_collection(db[args.collection], fields, store, batch_size=args.batch_size,
+                                       dry_run=args.dry_run, limit=args.limit)
+            print(f"✅ {stats['documents']} documents, {stats['images']} images, "
+                  f"{stats['bytes_saved'] / 1024 / 1024:.1f} Mo retirés des documents")
+        else:
+            blob = store.get(args.ref)
+            if blob is None:
+                print(f"❌ Image introuvable: {args.ref}")
+                return 1
+            data, _ = blob
+            out = args.out or args.ref[len(BLOB_REF_PREFIX):]
+            with open(out, "wb") as f:
+                f.write(data)
+            print(f"✅ Image écrite dans {out} ({len(data)} octets)")
+        return 0
+    except Exception as e:
+        print(f"❌ Erreur: {str(e)}")
+        traceback.print_exc()
+        return 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+"""
+File de travail durable dans MongoDB
+
+Chaque élément à traiter (ex: un restaurant) est un document de la
+collection, avec un état:
+- "pending": en attente (éventuellement différé jusqu'à available_at après un échec)
+- "leased": réservé par un worker jusqu'à lease_expires_at
+- "done": traité avec succès
+- "failed": abandonné après max_attempts tentatives (file des échecs définitifs)
+
+La réservation se fait par find_one_and_update atomique: plusieurs processus,
+sur plusieurs machines, peuvent vider la même file sans traiter deux fois le
+même élément. Un worker qui plante ne libère pas ses baux: ils expirent et
+les éléments redeviennent disponibles pour les autres workers. Un worker
+actif prolonge ses baux (heartbeat) tant qu'il traite les éléments.
+
+Utilisation:
+    jobs = MongoJobQueue(client["Restauration_Officielle"]["restaurant_jobs"])
+    jobs.enqueue(restaurants, key_func=lambda r: r["place_id"])
+    for job in jobs.lease(4):
+        ...
+        jobs.complete(job["_id"])  # ou jobs.fail(job["_id"], "message")
+"""
+
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, UpdateOne, ReturnDocument
+
+# Configuration
+JOB_LEASE_SECONDS = 600  # Durée d'un bail avant que l'élément ne soit repris par un autre worker
+JOB_MAX_ATTEMPTS = 3  # Tentatives avant de passer l'élément en "failed"
+JOB_RETRY_DELAY = 60  # Secondes avant une nouvelle tentative, doublées à chaque échec
+JOB_ENQUEUE_BATCH_SIZE = 500  # Éléments par bulk_write lors de la mise en file
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+STATES = (PENDING, LEASED, DONE, FAILED)
+
+def utcnow():
+    # Horloge commune aux machines: les dates sont comparées côté serveur MongoDB
+    return datetime.now(timezone.utc)
+
+def default_worker_id():
+    """Identifiant d'un worker: machine, processus et suffixe aléatoire"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+class MongoJobQueue:
+    """
+    File de travail partagée, à baux et nombre de tentatives limité
+
+    Les opérations complete/fail/extend ne s'appliquent qu'aux éléments
+    encore réservés par ce worker: un worker dont le bail a expiré (et dont
+    l'élément a été repris ailleurs) ne peut plus en modifier l'état.
+    """
+    def __init__(self, collection, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS,
+                 retry_delay=JOB_RETRY_DELAY, worker_id=None):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.worker_id = worker_id or default_worker_id()
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        """Index de la réservation (état + disponibilité) et de la reprise des baux expirés"""
+        if self._indexes_ready:
+            return
+        # create_index est idempotent: sans effet si l'index existe déjà
+        self.collection.create_index([("state", ASCENDING), ("available_at", ASCENDING)])
+        self.collection.create_index([("state", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self._indexes_ready = True
+
+    def enqueue(self, items, key_func, requeue_done=False):
+        """
+        Met des éléments en file (sans doublon: un élément déjà présent est ignoré)
+
+        Args:
+            items: Itérable d'éléments (dictionnaires sérialisables en BSON)
+            key_func: Fonction donnant la clé unique d'un élément (_id du job)
+            requeue_done: Si True, un élément déjà terminé ("done" ou "failed")
+                est remis en attente avec le nouveau payload et ses tentatives
+                remises à zéro (les éléments en attente ou réservés sont ignorés)
+
+        Returns:
+            Nombre d'éléments ajoutés ou remis en attente
+        """
+        self.ensure_indexes()
+        added = 0
+        operations = []
+        requeue_operations = []
+        for item in items:
+            key = key_func(item)
+            if not key:
+                continue
+            now = utcnow()
+            operations.append(UpdateOne({"_id": key}, {"$setOnInsert": {
+                "payload": item,
+                "state": PENDING,
+                "attempts": 0,
+                "available_at": now,
+                "created_at": now,
+            }}, upsert=True))
+            if requeue_done:
+                requeue_operations.append(UpdateOne({"_id": key, "state": {"$in": [DONE, FAILED]}}, {
+                    "$set": {"payload": item, "state": PENDING, "attempts": 0, "available_at": now},
+                    "$unset": {"finished_at": "", "last_error": ""}}))
+            if len(operations) >= JOB_ENQUEUE_BATCH_SIZE:
+                added += self._write_enqueue_batch(operations, requeue_operations)
+                operations = []
+                requeue_operations = []
+        if operations:
+            added += self._write_enqueue_batch(operations, requeue_operations)
+        return added
+
+    def _write_enqueue_batch(self, operations, requeue_operations):
+        added = self.collection.bulk_write(operations, ordered=False).upserted_count
+        # Après les insertions: un élément qui vient d'être créé est en attente et n'est pas compté deux fois
+        if requeue_operations:
+            added += self.collection.bulk_write(requeue_operations, ordered=False).modified_count
+        return added
+
+    def _expire_exhausted_leases(self, now):
+        # Bail expiré à la dernière tentative: le worker a planté sur cet élément à chaque fois
+        self.collection.update_many(
+            {"state": LEASED, "lease_expires_at": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"state": FAILED, "finished_at": now, "last_error": "Bail expiré à la dernière tentative"},
+             "$unset": {"lease_owner": "", "lease_expires_at": ""}})
+
+    def lease(self, count=1):
+        """
+        Réserve jusqu'à count éléments disponibles
+
+        Un élément est disponible s'il est en attente (et que son délai de
+        nouvelle tentative est écoulé) ou si le bail de son worker a expiré.
+
+        Returns:
+            Liste des jobs réservés ({"_id", "payload", "attempts", ...})
+        """
+        self.ensure_indexes()
+        now = utcnow()
+        self._expire_exhausted_leases(now)
+        available = {"$or": [
+            {"state": PENDING, "available_at": {"$lte": now}},
+            {"state": LEASED, "lease_expires_at": {"$lt": now}, "attempts": {"$lt": self.max_attempts}},
+        ]}
+        jobs = []
+        for _ in range(count):
+            job = self.collection.find_one_and_update(
+                available,
+                {"$set": {"state": LEASED, "lease_owner": self.worker_id, "leased_at": now,
+                          "lease_expires_at": now + timedelta(seconds=self.lease_seconds)},
+                 "$inc": {"attempts": 1}},
+                sort=[("available_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                break
+            jobs.append(job)
+        return jobs
+
+    def _owned(self, job_ids):
+        if isinstance(job_ids, (list, tuple, set)):
+            return {"_id": {"$in": list(job_ids)}, "state": LEASED, "lease_owner": self.worker_id}
+        return {"_id": job_ids, "state": LEASED, "lease_owner": self.worker_id}
+
+    def extend(self, job_ids):
+        """
+        Prolonge les baux des éléments en cours de traitement (heartbeat)
+
+        Returns:
+            Nombre de baux prolongés
+        """
+        if not job_ids:
+            return 0
+        expires_at = utcnow() + timedelta(seconds=self.lease_seconds)
+        return self.collection.update_many(self._owned(job_ids),
+                                           {"$set": {"lease_expires_at": expires_at}}).modified_count
+
+    def complete(self, job_id):
+        """
+        Marque un élément comme traité
+
+        Returns:
+            False si le bail avait été perdu (élément repris par un autre worker)
+        """
+        result = self.collection.update_one(self._owned(job_id), {
+            "$set": {"state": DONE, "finished_at": utcnow()},
+            "$unset": {"lease_owner": "", "lease_expires_at": "", "last_error": ""}})
+        return result.modified_count == 1
+
+    def fail(self, job_id, error=None):
+        """
+        Enregistre l'échec d'une tentative
+
+        L'élément est remis en attente avec un délai croissant, ou passe en
+        "failed" s'il a atteint max_attempts tentatives.
+
+        Returns:
+            Nouvel état ("pending" ou "failed"), None si le bail avait été perdu
+        """
+        job = self.collection.find_one(self._owned(job_id), {"attempts": 1})
+        if job is None:
+            return None
+        now = utcnow()
+        attempts = job.get("attempts", 0)
+        update = {"last_error": str(error or "Échec")[:500], "lease_owner": None}
+        if attempts >= self.max_attempts:
+            update.update({"state": FAILED, "finished_at": now})
+        else:
+            update.update({"state": PENDING,
+                           "available_at": now + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))})
+        result = self.collection.update_one(self._owned(job_id), {"$set": update, "$unset": {"lease_expires_at": ""}})
+        return update["state"] if result.modified_count == 1 else None
+
+    def release(self, job_ids):
+        """
+        Rend des éléments réservés sans compter de tentative (arrêt propre d'un worker)
+
+        Returns:
+            Nombre d'éléments remis en attente
+        """
+        if not job_ids:
+            return 0
+        return self.collection.update_many(self._owned(job_ids), {
+            "$set": {"state": PENDING, "available_at": utcnow(), "lease_owner": None},
+            "$unset": {"lease_expires_at": ""},
+            "$inc": {"attempts": -1}}).modified_count
+
+    def requeue_failed(self):
+        """
+        Remet en attente les éléments en "failed", avec un compteur de tentatives remis à zéro
+
+        Returns:
+            Nombre d'éléments remis en attente
+        """
+        return self.collection.update_many({"state": FAILED}, {
+            "$set": {"state": PENDING, "attempts": 0, "available_at": utcnow()},
+            "$unset": {"finished_at": ""}}).modified_count
+
+    def has_unfinished(self):
+        """Indique s'il reste des éléments en attente (même différés) ou réservés"""
+        return self.collection.find_one({"state": {"$in": [PENDING, LEASED]}}, {"_id": 1}) is not None
+
+    def counts(self):
+        """Nombre d'éléments par état"""
+        counts = dict.fromkeys(STATES, 0)
+        for row in self.collection.aggregate([{"$group": {"_id": "$state", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    def recent_failures(self, limit=10):
+        """Derniers éléments passés en "failed", avec leur dernière erreur"""
+        return list(self.collection.find({"state": FAILED}, {"payload.name": 1, "attempts": 1, "last_error": 1})
+                    .sort("finished_at", -1).limit(limit))
@@ -21,6 +21,7 @@ import hashlib
 import requests
 import tempfile
 from bs4 import BeautifulSoup
+import html_parsing  # Parsing HTML rapide (lxml si disponible, sans scripts ni styles)
 import fitz  # PyMuPDF
 from bson.objectid import ObjectId
 from urllib.parse import urljoin
@@ -412,7 +413,8 @@ def extract_links_from_website(url, retries=3, backoff_factor=2):
             }
             response = requests.get(url, headers=headers, timeout=20)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
+            # Seuls les liens, images et iframes sont lus
+            soup = html_parsing.make_soup(response.content, parse_only=html_parsing.only_tags("a", "img", "iframe"))
 
             links = []
 
@@ -21,6 +21,8 @@ from bson.objectid import ObjectId
 import uuid
 import requests
 
+import geo_queries
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -60,6 +62,10 @@ COLL_VENUES_LOISIR = "Loisir_Paris_Producers"
 COLL_EVENTS_LOISIR = "Loisir_Paris_Evenements"
 COLL_WELLNESS_PLACES = "BeautyPlaces"
 
+# Lieux fréquents choisis autour de la position de l'utilisateur (index 2dsphere)
+FREQUENT_LOCATIONS_RADIUS_M = 3000  # Distance maximale d'un lieu fréquent
+FREQUENT_LOCATIONS_CANDIDATES = 30  # Lieux les plus proches parmi lesquels tirer au sort
+
 # --- Configuration du générateur ---
 DEFAULT_CONFIG = {
     "users_count": 20,        # Nombre d'utilisateurs à générer
@@ -547,26 +553,48 @@ def establish_producer_affinities(users, db_connections):
         except Exception as e:
             logger.error(f"❌ Erreur lors de la mise à jour des affinités: {e}")
 
+def nearby_venues(collection, user, fallback, projection):
+    """
+    Lieux les plus proches de la position d'un utilisateur
+    
+    Sans position ou sans index 2dsphere, renvoie l'échantillon commun (fallback).
+    """
+    point = geo_queries.point_coordinates(user.get("location"))
+    if point is None:
+        return fallback
+    try:
+        venues = geo_queries.nearest(collection, point[0], point[1], limit=FREQUENT_LOCATIONS_CANDIDATES,
+                                     max_distance_m=FREQUENT_LOCATIONS_RADIUS_M, projection=projection)
+    except Exception as e:
+        logger.warning(f"⚠️ Recherche de proximité impossible sur {collection.name}: {e}")
+        return fallback
+    return venues or fallback
+
 def generate_frequent_locations(users, db_connections):
     """Génère des localisations fréquentes pour les utilisateurs (utilisation position historique)"""
     logger.info("🔄 Génération des localisations fréquentes...")
     
+    restaurant_collection = db_connections["restauration"][COLL_PRODUCERS_RESTAURATION]
+    leisure_collection = db_connections["loisir"][COLL_VENUES_LOISIR]
+    wellness_collection = db_connections["beauty"][COLL_WELLNESS_PLACES]
+    restaurant_projection = {"_id": 1, "name": 1, "gps_coordinates": 1, "address": 1}
+    leisure_projection = {"_id": 1, "lieu": 1, "location": 1, "adresse": 1}
+    wellness_projection = {"_id": 1, "name": 1, "location": 1, "address": 1}
+    
+    # Échantillons communs, utilisés pour les utilisateurs sans position ou sans lieu à proximité
     # Récupérer des lieux de restaurants
-    restaurant_locations = list(db_connections["restauration"][COLL_PRODUCERS_RESTAURATION].find(
-        {"gps_coordinates": {"$exists": True}},
-        {"_id": 1, "name": 1, "gps_coordinates": 1, "address": 1}
+    restaurant_locations = list(restaurant_collection.find(
+        {"gps_coordinates": {"$exists": True}}, restaurant_projection
     ).limit(100))
     
     # Récupérer des lieux de loisirs
-    leisure_locations = list(db_connections["loisir"][COLL_VENUES_LOISIR].find(
-        {"location.coordinates": {"$exists": True}},
-        {"_id": 1, "lieu": 1, "location": 1, "adresse": 1}
+    leisure_locations = list(leisure_collection.find(
+        {"location.coordinates": {"$exists": True}}, leisure_projection
     ).limit(100))
     
     # Récupérer des lieux de beauté/bien-être
-    wellness_locations = list(db_connections["beauty"][COLL_WELLNESS_PLACES].find(
-        {"location.coordinates": {"$exists": True}},
-        {"_id": 1, "name": 1, "location": 1, "address": 1}
+    wellness_locations = list(wellness_collection.find(
+        {"location.coordinates": {"$exists": True}}, wellness_projection
     ).limit(100))
     
     user_collection = db_connections["choice"][COLL_USERS]
@@ -590,10 +618,13 @@ def generate_frequent_locations(users, db_connections):
             num_restaurants = random.randint(1, num_locations - num_wellness - 1)
             num_leisure = num_locations - num_restaurants - num_wellness
         
-        # Sélectionner les lieux
-        selected_restaurants = random.sample(restaurant_locations, min(num_restaurants, len(restaurant_locations)))
-        selected_leisure = random.sample(leisure_locations, min(num_leisure, len(leisure_locations)))
-        selected_wellness = random.sample(wellness_locations, min(num_wellness, len(wellness_locations)))
+        # Sélectionner les lieux parmi les plus proches de l'utilisateur
+        user_restaurants = nearby_venues(restaurant_collection, user, restaurant_locations, restaurant_projection)
+        user_leisure = nearby_venues(leisure_collection, user, leisure_locations, leisure_projection)
+        user_wellness = nearby_venues(wellness_collection, user, wellness_locations, wellness_projection)
+        selected_restaurants = random.sample(user_restaurants, min(num_restaurants, len(user_restaurants)))
+        selected_leisure = random.sample(user_leisure, min(num_leisure, len(user_leisure)))
+        selected_wellness = random.sample(user_wellness, min(num_wellness, len(user_wellness)))
         
         # Créer la liste des lieux fréquents avec historique
         frequent_locations = []
@@ -836,6 +867,11 @@ def get_db_connections(uri=None):
         # Compter le nombre d'utilisateurs existants
         users_count = db_choice[COLL_USERS].count_documents({}) if COLL_USERS in collections_choice else 0
         
+        # Index 2dsphere des collections de producteurs (recherche des lieux proches)
+        for name, ok in geo_queries.ensure_producer_geo_indexes(client).items():
+            if not ok:
+                logger.warning(f"⚠️ Pas d'index 2dsphere sur {name}: lieux fréquents tirés au hasard")
+        
         logger.info(f"Connexion établie aux bases de données MongoDB")
         logger.info(f"Utilisateurs actuels: {users_count}")
         
@@ -22,6 +22,8 @@ from datetime import datetime, timedelta
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
+import image_store  # Résolution des images stockées par référence (blob:sha256:...)
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -526,6 +528,32 @@ def get_db_connections(uri=None):
         logger.error(f"Détails: {str(e)}")
         raise
 
+# Champs pouvant contenir une référence vers le stockage d'images
+IMAGE_FIELDS = ("image", "photo", "photos", "images", "main_image", "profile_photo")
+IMAGE_STORES = {}  # Stockage d'images par base MongoDB
+
+def resolve_venue_images(venue, db):
+    """
+    Remplace les références d'image d'un lieu par des URLs data utilisables dans les médias
+
+    Args:
+        venue: Document producteur, événement ou lieu de beauté
+        db: Base MongoDB du document (bucket GridFS des images)
+
+    Returns:
+        Copie du document avec les images résolues (ou le document lui-même)
+    """
+    if not venue or not image_store.has_blob_refs(venue, IMAGE_FIELDS):
+        return venue
+    try:
+        if db.name not in IMAGE_STORES:
+            use_gridfs = image_store.IMAGE_STORE_BACKEND == "gridfs"
+            IMAGE_STORES[db.name] = image_store.get_image_store(db=db if use_gridfs else None)
+        return image_store.resolve_images(venue, IMAGE_FIELDS, IMAGE_STORES[db.name])
+    except Exception as e:
+        logger.warning(f"⚠️ Images non résolues pour {venue.get('name', venue.get('_id'))}: {e}")
+        return venue
+
 def generate_post_with_openai(prompt, openai_client):
     """Génère le contenu d'un post en utilisant le client OpenAI."""
     # Utiliser le cache si disponible
@@ -552,6 +580,8 @@ def create_post_for_event(db_connections, event, leisure_venue, openai_client):
         if not event or not leisure_venue:
             logger.warning("❌ Événement ou lieu manquant")
             return None
+        event = resolve_venue_images(event, db_connections["loisir"])
+        leisure_venue = resolve_venue_images(leisure_venue, db_connections["loisir"])
         
         # Récupérer les données de l'événement (avec différents noms de champs possibles)
         # Titre de l'événement
@@ -846,6 +876,8 @@ def create_post_for_event(db_connections, event, leisure_venue, openai_client):
 def create_post_for_restaurant(db_connections, restaurant, openai_client):
     """Crée un post producteur pour un restaurant en utilisant OpenAI."""
     try:
+        restaurant = resolve_venue_images(restaurant, db_connections["restauration"])
+        
         # Extraction des données du restaurant - Assurer qu'on a toujours un nom valide
         restaurant_name = restaurant.get("name", "")
         if not restaurant_name or restaurant_name.strip() == "":
@@ -1677,7 +1709,8 @@ def create_post_for_venue(db_connections, user, venue, is_event=False, is_beauty
             content = f"{random.choice(starts)} {random.choice(bodies)} {random.choice(ends)}"
         
         # Extraire les médias (images/vidéos)
-        media = create_media_from_venue(venue, is_event, is_beauty, with_video=with_video)
+        venue_db = db_connections["beauty" if is_beauty else "loisir" if is_event else "restauration"]
+        media = create_media_from_venue(resolve_venue_images(venue, venue_db), is_event, is_beauty, with_video=with_video)
         
         # Créer l'objet post
         user_id = str(user["_id"])
@@ -2763,6 +2796,8 @@ def create_post_for_beauty_place(db_connections, beauty_place, openai_client=Non
     logger.info(f"🧖‍♀️ Création d'un post pour le lieu de beauté: {beauty_place.get('name', 'Sans nom')}")
     
     try:
+        beauty_place = resolve_venue_images(beauty_place, db_connections["beauty"])
+        
         # Préparer les données pour le post
         place_name = beauty_place.get('name', 'Sans nom')
         place_id = str(beauty_place.get('_id', ''))
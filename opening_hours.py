@@ -0,0 +1,438 @@
+"""
+Parsing déterministe des horaires d'ouverture
+
+Les horaires arrivent sous des formes très variées: texte OCR du panneau
+Google Maps (français, anglais ou roumain selon la langue de la session),
+lignes TheFork, bloc TripAdvisor, lignes du tableau Maps. Ce module les
+ramène à une structure hebdomadaire unique:
+
+    {"monday": [{"open": "12:00", "close": "14:30"}, {"open": "19:00", "close": "23:00"}],
+     "sunday": [],                                   # fermé
+     ...}                                            # jour absent = inconnu
+
+Formats reconnus: jours seuls, abrégés, listes ("samedi, dimanche") et
+plages ("lun-ven", "du lundi au vendredi", "Mon–Fri"), "tous les jours",
+heures 9h / 9h30 / 09:30 / 9.30 / 9 AM / midi / minuit, plusieurs services
+par jour, "Fermé" / "Closed" / "Închis", "24h/24" / "Open 24 hours" /
+"Non-stop". Chaque résultat a un indice de confiance (0-1): l'appelant ne
+fait appel au LLM que lorsqu'il est trop faible.
+
+Vérification et benchmark sur des fichiers <nom>.txt (résultat attendu,
+facultatif, dans <nom>.json):
+    python opening_hours.py check fixtures/
+    python opening_hours.py benchmark fixtures/ --iterations 1000
+Sans répertoire, les exemples intégrés (EXAMPLES) sont utilisés.
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import argparse
+import unicodedata
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+DAY_LABELS = {day: day.capitalize() for day in DAYS}
+
+# Noms de jours complets (sans accents) -> jour canonique
+FULL_DAY_NAMES = {
+    # Français
+    "lundi": "monday", "mardi": "tuesday", "mercredi": "wednesday", "jeudi": "thursday",
+    "vendredi": "friday", "samedi": "saturday", "dimanche": "sunday",
+    # Anglais
+    "monday": "monday", "tuesday": "tuesday", "wednesday": "wednesday", "thursday": "thursday",
+    "friday": "friday", "saturday": "saturday", "sunday": "sunday",
+    # Roumain
+    "luni": "monday", "marti": "tuesday", "miercuri": "wednesday", "joi": "thursday",
+    "vineri": "friday", "sambata": "saturday", "duminica": "sunday",
+}
+# Abréviations: fiables dans un bloc d'horaires, ambiguës dans un texte libre ("Sam D.", "mer", "sun")
+DAY_ABBREVIATIONS = {
+    "lun": "monday", "mar": "tuesday", "mer": "wednesday", "jeu": "thursday",
+    "ven": "friday", "sam": "saturday", "dim": "sunday",
+    "mon": "monday", "tue": "tuesday", "tues": "tuesday", "wed": "wednesday", "thu": "thursday",
+    "thur": "thursday", "thurs": "thursday", "fri": "friday", "sat": "saturday", "sun": "sunday",
+}
+DAY_NAMES = {**FULL_DAY_NAMES, **DAY_ABBREVIATIONS}
+
+MIN_CONFIDENCE = 0.6  # En dessous, le résultat est jugé incertain (repli LLM possible)
+
+_TIME = r"(?:\d{1,2}\s*(?:[:h.]\s*\d{2}|h)?\s*(?:[ap]\.?\s?m\.?)?|midi|minuit|noon|midnight)"
+_RANGE_SEP = r"(?:-|a|to|until|jusqu a|pana la)"
+_DAY_SEP = r"(?:-|a|au|to|through|thru|pana)"
+
+def _token_re(day_names):
+    day = "(?:" + "|".join(sorted(day_names, key=len, reverse=True)) + r")\.?"
+    return re.compile(
+        r"(?P<allday>24\s*h(?:eures)?\s*/\s*24|24\s*/\s*7|(?:open|ouvert|deschis)\s+24\s*(?:h|hours|heures|ore)\b|non-?stop)"
+        r"|(?P<range>(?<![\d:.])(?P<start>" + _TIME + r")\s*" + _RANGE_SEP + r"\s*(?P<end>" + _TIME + r"))(?![\d:])"
+        r"|(?P<closed>\bfermee?s?\b(?!\s*(?:a|des|vers)\s*\d)|\bclosed\b|\binchis\b)"
+        r"|(?P<daily>tous les jours|7\s*j?\s*/\s*7|\bdaily\b|every\s?day|\bzilnic\b|toate zilele)"
+        r"|(?P<dayrange>\b(?P<first>" + day + r")\s*" + _DAY_SEP + r"\s*(?P<last>" + day + r")(?![a-z]))"
+        r"|(?P<day>\b" + day + r"(?![a-z]))"
+    )
+
+TOKEN_RE = _token_re(DAY_NAMES)
+FULL_NAMES_TOKEN_RE = _token_re(FULL_DAY_NAMES)  # Texte libre (page entière): jours en toutes lettres
+# Heures isolées (non consommées par une plage): signe d'un format non compris
+TIME_HINT_RE = re.compile(r"\b\d{1,2}\s*(?:[:h]\s*\d{2}|h(?:eures?)?\b)|\b\d{1,2}\s*[ap]\.?m\b")
+TIME_PARTS_RE = re.compile(r"(\d{1,2})\s*(?:[:h.]\s*(\d{2}))?\s*(?:h)?\s*([ap])?")
+
+_DASHES_RE = re.compile("[\u2010-\u2015\u2212]")
+
+def normalize_text(text):
+    """Minuscules, sans accents (ț, ţ, â, é...), tirets unifiés et sans espaces insécables"""
+    text = _DASHES_RE.sub("-", str(text or ""))
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return text.lower()
+
+def _day_name(token):
+    return DAY_NAMES[token.rstrip(".").strip()]
+
+def _day_span(first, last):
+    start, end = DAYS.index(first), DAYS.index(last)
+    if end < start:
+        end += 7  # "sam-mar": samedi, dimanche, lundi, mardi
+    return [DAYS[i % 7] for i in range(start, end + 1)]
+
+def parse_time(token, meridiem=None):
+    """
+    Convertit une heure ("9h30", "21:00", "9 pm", "midi") en "HH:MM"
+
+    Args:
+        token: Heure normalisée (sans accents, minuscules)
+        meridiem: "a" ou "p" repris de l'autre borne ("9-11 pm")
+
+    Returns:
+        Chaîne "HH:MM" (24:00 pour minuit en fin de plage) ou None si invalide
+    """
+    token = token.strip()
+    if token in ("midi", "noon"):
+        return "12:00"
+    if token in ("minuit", "midnight"):
+        return "24:00"
+    match = TIME_PARTS_RE.match(token)
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = match.group(3) or meridiem
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+def _meridiem(token):
+    match = TIME_PARTS_RE.match(token.strip())
+    return match.group(3) if match else None
+
+def parse_opening_hours(text, full_day_names=False):
+    """
+    Parse un texte d'horaires vers la structure hebdomadaire canonique
+
+    Les jours (ou groupes de jours) s'appliquent aux plages horaires qui les
+    suivent, sur la même ligne ou les lignes suivantes (format OCR Maps:
+    "lundi" puis "12:00–14:30" puis "19:00–23:00").
+
+    Args:
+        text: Texte brut (str) ou liste de lignes
+        full_day_names: Ignorer les abréviations de jours (texte libre, ex: page entière)
+
+    Returns:
+        Tuple (semaine, confiance): semaine = {jour: [{"open", "close"}, ...]},
+        liste vide pour un jour fermé; confiance entre 0 et 1
+    """
+    if isinstance(text, (list, tuple)):
+        text = "\n".join(str(line) for line in text)
+    text = normalize_text(text)
+    token_re = FULL_NAMES_TOKEN_RE if full_day_names else TOKEN_RE
+
+    week = {}
+    current_days = []  # Jours auxquels s'appliquent les plages lues
+    assigned = False  # Les jours courants ont déjà reçu des horaires
+    invalid = 0
+    consumed = []
+    all_day = False  # "24h/24" lu avant les jours ("Ouvert 24h/24, 7j/7")
+
+    def select_days(days):
+        nonlocal current_days, assigned
+        if assigned:
+            current_days, assigned = [], False
+        current_days.extend(day for day in days if day not in current_days)
+
+    def assign(shift):
+        nonlocal assigned
+        for day in current_days:
+            shifts = week.setdefault(day, [])
+            if shift is None:
+                # Fermé: écrase les plages lues pour ce jour
+                shifts.clear()
+            elif shift not in shifts:
+                shifts.append(shift)
+        assigned = True
+
+    for match in token_re.finditer(text):
+        consumed.append(match.span())
+        kind = match.lastgroup if match.lastgroup in ("allday", "closed", "daily", "day") else None
+        if match.group("range") is not None:
+            if not current_days:
+                continue  # Plage sans jour (ex: "Ouvert ⋅ 12:00–14:30" en tête de panneau)
+            start, end = match.group("start"), match.group("end")
+            meridiem = _meridiem(end)
+            open_time = parse_time(start, meridiem if _meridiem(start) is None else None)
+            close_time = parse_time(end)
+            if open_time is None or close_time is None or not (TIME_HINT_RE.search(start) or TIME_HINT_RE.search(end)
+                                                              or start.strip() in ("midi", "noon", "minuit", "midnight")):
+                invalid += 1
+                continue
+            if open_time == "24:00":
+                open_time = "00:00"
+            assign({"open": open_time, "close": "24:00" if close_time == "00:00" else close_time})
+        elif match.group("dayrange") is not None:
+            select_days(_day_span(_day_name(match.group("first")), _day_name(match.group("last"))))
+        elif kind == "day":
+            select_days([_day_name(match.group("day"))])
+        elif kind == "daily":
+            select_days(DAYS)
+        elif kind == "allday":
+            if current_days:
+                assign({"open": "00:00", "close": "24:00"})
+            else:
+                all_day = True
+        elif kind == "closed" and current_days:
+            assign(None)
+    if all_day and current_days and not assigned:
+        assign({"open": "00:00", "close": "24:00"})
+
+    return week, _confidence(text, week, consumed, invalid)
+
+def _confidence(text, week, consumed, invalid):
+    """
+    Indice de confiance d'un résultat
+
+    Proportion de jours renseignés, pénalisée par les heures restées hors
+    d'une plage reconnue (format non compris) et les plages invalides.
+    """
+    if not week:
+        return 0.0
+    leftovers = []
+    last = 0
+    for start, end in consumed:
+        leftovers.append(text[last:start])
+        last = end
+    leftovers.append(text[last:])
+    stray_times = len(TIME_HINT_RE.findall(" ".join(leftovers)))
+    ranges = sum(len(shifts) for shifts in week.values()) or 1
+    penalty = min(1.0, (stray_times + 2 * invalid) / (ranges + stray_times + invalid))
+    return round(len(week) / 7 * (1 - penalty), 3)
+
+def has_hours_evidence(text):
+    """Indique si un texte semble contenir des horaires (jour ou heure reconnus)"""
+    text = normalize_text(text)
+    if not TIME_HINT_RE.search(text):
+        return False
+    return any(match.group("day") or match.group("dayrange") or match.group("daily")
+               for match in TOKEN_RE.finditer(text))
+
+def validate_week(data):
+    """
+    Vérifie une structure hebdomadaire (ex: réponse du LLM) et la normalise
+
+    Returns:
+        Semaine canonique ou None si la structure est invalide
+    """
+    if not isinstance(data, dict):
+        return None
+    week = {}
+    for day, shifts in data.items():
+        day = DAY_NAMES.get(normalize_text(day).strip())
+        if day is None or shifts is None:
+            continue
+        if not isinstance(shifts, list):
+            return None
+        week[day] = []
+        for shift in shifts:
+            if not isinstance(shift, dict):
+                return None
+            open_time, close_time = parse_time(normalize_text(shift.get("open"))), parse_time(normalize_text(shift.get("close")))
+            if open_time is None or close_time is None:
+                return None
+            week[day].append({"open": "00:00" if open_time == "24:00" else open_time,
+                              "close": "24:00" if close_time == "00:00" else close_time})
+    return week or None
+
+def format_12h(hhmm):
+    """"21:30" -> "9:30 PM" (format des horaires Google)"""
+    hour, minute = map(int, hhmm.split(":"))
+    hour %= 24
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+def format_weekday_text(week):
+    """
+    Horaires au format stocké dans producers (comme weekday_text de Google)
+
+    Returns:
+        ["Monday: 12:00 PM – 2:30 PM, 7:00 PM – 11:00 PM", ..., "Sunday: Closed"]
+        (jours inconnus: "Not specified"), ou liste vide si aucun jour n'est connu
+    """
+    if not week:
+        return []
+    lines = []
+    for day in DAYS:
+        shifts = week.get(day)
+        if shifts is None:
+            value = "Not specified"
+        elif not shifts:
+            value = "Closed"
+        elif shifts == [{"open": "00:00", "close": "24:00"}]:
+            value = "Open 24 hours"
+        else:
+            value = ", ".join(f"{format_12h(shift['open'])} – {format_12h(shift['close'])}" for shift in shifts)
+        lines.append(f"{DAY_LABELS[day]}: {value}")
+    return lines
+
+# =============================================
+# VÉRIFICATION ET BENCHMARK
+# =============================================
+
+# Exemples représentatifs des sources du pipeline (texte, résultat attendu)
+_LUNCH_DINNER = [{"open": "12:00", "close": "14:30"}, {"open": "19:00", "close": "23:00"}]
+EXAMPLES = {
+    "maps_ocr_fr": (
+        "Horaires\nlundi\nFermé\nmardi\n12:00–14:30\n19:00–23:00\nmercredi\n12:00–14:30\n19:00–23:00\n"
+        "jeudi\n12:00–14:30\n19:00–23:00\nvendredi\n12:00–14:30\n19:00–23:00\nsamedi\n12:00–14:30\n"
+        "19:00–23:00\ndimanche\nFermé",
+        {"monday": [], "tuesday": _LUNCH_DINNER, "wednesday": _LUNCH_DINNER, "thursday": _LUNCH_DINNER,
+         "friday": _LUNCH_DINNER, "saturday": _LUNCH_DINNER, "sunday": []},
+    ),
+    "maps_ocr_ro": (
+        "luni 12:00–23:00\nmarți 12:00–23:00\nmiercuri 12:00–23:00\njoi 12:00–23:00\n"
+        "vineri 12:00–01:00\nsâmbătă 12:00–01:00\nduminică Închis",
+        {**{day: [{"open": "12:00", "close": "23:00"}] for day in DAYS[:4]},
+         "friday": [{"open": "12:00", "close": "01:00"}], "saturday": [{"open": "12:00", "close": "01:00"}],
+         "sunday": []},
+    ),
+    "thefork_lines": (
+        ["Lundi : 12h00 - 14h30 / 19h00 - 22h30", "Mardi : 12h00 - 14h30 / 19h00 - 22h30",
+         "Mercredi : 12h00 - 14h30 / 19h00 - 22h30", "Jeudi : 12h00 - 14h30 / 19h00 - 22h30",
+         "Vendredi : 12h00 - 14h30 / 19h00 - 22h30", "Samedi : 19h00 - 22h30"],
+        {**{day: [{"open": "12:00", "close": "14:30"}, {"open": "19:00", "close": "22:30"}] for day in DAYS[:5]},
+         "saturday": [{"open": "19:00", "close": "22:30"}]},
+    ),
+    "ranges_fr": (
+        "Du lundi au vendredi de 8h à 18h, samedi et dimanche fermés",
+        {**{day: [{"open": "08:00", "close": "18:00"}] for day in DAYS[:5]}, "saturday": [], "sunday": []},
+    ),
+    "tripadvisor_en": (
+        "Mon - Fri 11:30 AM - 3:00 PM 6:00 PM - 10:30 PM Sat - Sun 10:00 AM - 11:00 PM",
+        {**{day: [{"open": "11:30", "close": "15:00"}, {"open": "18:00", "close": "22:30"}] for day in DAYS[:5]},
+         "saturday": [{"open": "10:00", "close": "23:00"}], "sunday": [{"open": "10:00", "close": "23:00"}]},
+    ),
+    "always_open": (
+        "Ouvert 24h/24, 7j/7",
+        {day: [{"open": "00:00", "close": "24:00"}] for day in DAYS},
+    ),
+    "daily_24h": (
+        "Tous les jours : Ouvert 24h/24",
+        {day: [{"open": "00:00", "close": "24:00"}] for day in DAYS},
+    ),
+    "maps_ocr_status_line": (
+        "Ouvert ⋅ Ferme à 23:00\nlundi 11:30–15:00, 18:30–minuit\nmardi 11:30–15:00, 18:30–minuit",
+        {day: [{"open": "11:30", "close": "15:00"}, {"open": "18:30", "close": "24:00"}] for day in DAYS[:2]},
+    ),
+}
+
+def load_fixtures(directory):
+    """
+    Charge des textes d'horaires enregistrés: <nom>.txt et, si présent, <nom>.json (résultat attendu)
+
+    Returns:
+        Dictionnaire {nom: (texte, semaine attendue ou None)}
+    """
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        expected = None
+        if os.path.exists(os.path.join(directory, f"{name}.json")):
+            with open(os.path.join(directory, f"{name}.json"), encoding="utf-8") as f:
+                expected = json.load(f)
+        fixtures[name] = (text, expected)
+    return fixtures
+
+def check_fixtures(fixtures):
+    """
+    Compare le parsing aux résultats attendus
+
+    Returns:
+        Tuple (nb conformes, nb avec résultat attendu)
+    """
+    passed = total = 0
+    print(f"\n🕒 VÉRIFICATION DU PARSING DES HORAIRES ({len(fixtures)} textes)")
+    print("=" * 70)
+    for name, (text, expected) in sorted(fixtures.items()):
+        week, confidence = parse_opening_hours(text)
+        status = "  "
+        if expected is not None:
+            total += 1
+            ok = week == expected
+            passed += ok
+            status = "✅" if ok else "❌"
+        llm = " (LLM)" if confidence < MIN_CONFIDENCE and has_hours_evidence(text) else ""
+        print(f"{status} {name:<28} {len(week)} jours, confiance {confidence:.2f}{llm}")
+        if expected is not None and week != expected:
+            for day in DAYS:
+                if week.get(day) != expected.get(day):
+                    print(f"      {day}: obtenu {week.get(day)} attendu {expected.get(day)}")
+    print("=" * 70)
+    print(f"{passed}/{total} conformes")
+    return passed, total
+
+def benchmark_fixtures(fixtures, iterations=1000):
+    """
+    Mesure le temps de parsing et la part des textes qui nécessiteraient le LLM
+
+    Returns:
+        Dictionnaire {ms_per_parse, llm_ratio}
+    """
+    texts = [text for text, _ in fixtures.values()]
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            parse_opening_hours(text)
+    ms_per_parse = (time.perf_counter() - start_time) / (iterations * len(texts)) * 1000
+    needs_llm = sum(1 for text in texts
+                    if parse_opening_hours(text)[1] < MIN_CONFIDENCE and has_hours_evidence(text))
+    llm_ratio = needs_llm / len(texts)
+    print(f"\n📊 {len(texts)} textes x {iterations}: {ms_per_parse:.3f} ms par parsing, "
+          f"{needs_llm}/{len(texts)} ({llm_ratio:.0%}) nécessiteraient le LLM")
+    return {"ms_per_parse": ms_per_parse, "llm_ratio": llm_ratio}
+
+def main():
+    parser = argparse.ArgumentParser(description="Parsing déterministe des horaires d'ouverture")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = subparsers.add_parser("check", help="Comparer le parsing aux résultats attendus")
+    check_parser.add_argument("fixtures", nargs="?", help="Répertoire de <nom>.txt / <nom>.json (défaut: exemples intégrés)")
+    bench_parser = subparsers.add_parser("benchmark", help="Mesurer le temps de parsing et le besoin de LLM")
+    bench_parser.add_argument("fixtures", nargs="?", help="Répertoire de <nom>.txt (défaut: exemples intégrés)")
+    bench_parser.add_argument("--iterations", type=int, default=1000, help="Passes sur chaque texte (défaut: 1000)")
+
+    args = parser.parse_args()
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else dict(EXAMPLES)
+    if not fixtures:
+        print(f"❌ Aucun fichier .txt dans {args.fixtures}")
+        return
+    if args.command == "check":
+        passed, total = check_fixtures(fixtures)
+        if passed < total:
+            raise SystemExit(1)
+    else:
+        benchmark_fixtures(fixtures, iterations=max(1, args.iterations))
+
+if __name__ == "__main__":
+    main()
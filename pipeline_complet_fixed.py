@@ -17,14 +17,27 @@ import urllib.parse
 import base64
 import re
 import requests
+import asyncio
 import tempfile
 import argparse
 import functools
+import bisect
+import heapq
+import contextvars
+from contextlib import contextmanager
 import uuid
+import threading
+import queue
 from io import BytesIO
 from collections import OrderedDict, defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed, wait
+import multiprocessing
+try:
+    import httpx
+except ImportError:
+    httpx = None  # Balayage asynchrone indisponible: repli sur le balayage séquentiel
+from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 import openai
 import random
 from requests.auth import HTTPBasicAuth
@@ -38,6 +51,9 @@ from bson.objectid import ObjectId
 import sys
 import pandas as pd
 import hashlib
+import sqlite3
+import zlib
+import math
 
 # Selenium et outils web
 from selenium import webdriver
@@ -52,8 +68,26 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 from PIL import Image
 import pytesseract
 
-# Parsing HTML
-from bs4 import BeautifulSoup
+# Stockage des images par contenu (références au lieu d'URLs data inline)
+import image_store
+
+# Parsing HTML rapide (lxml/selectolax si disponibles, sans scripts ni styles)
+import html_parsing
+
+# Client HTTP BrightData partagé (keep-alive, nouvelles tentatives, limite par zone)
+import brightdata_client
+
+# File de travail durable partagée entre workers (baux, tentatives, échecs définitifs)
+import job_queue
+
+# Rapprochement des fiches d'un même restaurant (geohash + similarité des noms)
+import restaurant_dedup
+
+# Parsing déterministe des horaires d'ouverture (fr/en/ro), LLM en dernier recours
+import opening_hours as hours_parser
+
+# Index 2dsphere et requêtes de proximité sur les collections de producteurs
+import geo_queries
 
 # Configuration des API et paramètres
 # Clés API en dur pour le test
@@ -65,28 +99,154 @@ DB_NAME = "Restauration_Officielle"
 COLLECTION_NAME = "producers"
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")  # Clé API pour Google Maps
 NUM_THREADS = 4  # Nombre de threads par défaut pour le traitement parallèle
-MAPS_API_REQUEST_COUNT = 0  # Compteur de requêtes Google Maps API
 MAX_MAPS_API_REQUESTS = 500  # Limite quotidienne de requêtes Google Maps API
 MAX_RETRIES = 3
 TIMEOUT = 30
 DEBUG = False
 
+# Pool de connexions MongoDB partagé par tous les threads
+MONGO_MAX_POOL_SIZE = 20  # Nombre maximum de connexions ouvertes vers MongoDB
+MONGO_MIN_POOL_SIZE = 0  # Connexions maintenues ouvertes en permanence
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 10000  # Délai max pour trouver un serveur MongoDB
+EXISTENCE_CHECK_BATCH_SIZE = 1000  # Nombre de clés par requête $in lors de la vérification groupée
+BULK_WRITE_BATCH_SIZE = 100  # Nombre de documents par bulk_write
+BULK_WRITE_FLUSH_INTERVAL = 5.0  # Délai max (secondes) avant l'écriture d'un lot incomplet
+BULK_WRITE_MAX_QUEUE_SIZE = 1000  # Taille max de la file d'écriture (les workers attendent au-delà)
+USE_BULK_WRITE = True  # Écriture groupée par un thread dédié pendant les traitements parallèles
+
+# Pool de sessions Chrome réutilisées entre restaurants
+USE_DRIVER_POOL = True  # Réutiliser des sessions Chrome chaudes au lieu d'en lancer une par restaurant
+CHROME_RECYCLE_AFTER_PAGES = 50  # Redémarrer une session Chrome après ce nombre de restaurants
+
+# Délais max (secondes) des attentes sur conditions DOM dans Google Maps
+MAPS_READY_TIMEOUTS = {
+    "page_load": 10,     # document.readyState == "complete"
+    "place_title": 10,   # titre de la fiche (h1.DUwDvf)
+    "info_panel": 5,     # éléments d'information (adresse, téléphone, site...)
+    "hours_button": 3,   # bouton des horaires
+    "hours_table": 3,    # tableau des horaires après clic
+}
+
+# Découverte asynchrone via Google Maps Nearby Search
+NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+PLACES_QPS = 10  # Requêtes Nearby Search par seconde (toutes requêtes confondues)
+PLACES_CONCURRENCY = 8  # Requêtes Nearby Search simultanées
+NEXT_PAGE_TOKEN_DELAY = 2.0  # Délai avant qu'un next_page_token soit utilisable (secondes)
+NEARBY_OK_STATUSES = ("OK", "ZERO_RESULTS")  # Réponses complètes (mises en cache, cellule terminée)
+USE_ASYNC_DISCOVERY = httpx is not None  # Balayage concurrent de la grille au lieu de requêtes séquentielles
+DISCOVERY_STRATEGY = "quadtree"  # "quadtree" (subdivision adaptative) ou "grid" (grille fixe de 0.005°)
+QUADTREE_MIN_CELL_SIZE = 0.0025  # Côté minimum d'une cellule (degrés, ≈ 250 m) en dessous duquel on ne subdivise plus
+QUADTREE_PAGE_SIZE = 20  # Nombre de résultats d'une page Nearby Search pleine (signe de saturation)
+QUADTREE_STATE_FILE = "discovery_quadtree_state.json"  # Progression persistée pour reprendre un balayage
+QUADTREE_STATE_SAVE_INTERVAL = 5.0  # Secondes minimum entre deux sauvegardes de la progression
+USE_GEO_COVERAGE = True  # Découper d'emblée les cellules où producers compte déjà une page pleine (sans requête Nearby Search)
+SKIP_COVERED_CELLS = False  # Ne pas interroger les cellules minimales déjà couvertes par producers
+COVERED_CELL_MIN_PRODUCERS = 10  # Restaurants connus à partir desquels une cellule minimale est considérée couverte
+
+# OCR des captures Google Maps dans un pool de processus séparé du navigateur
+USE_OCR = True  # OCR du panneau d'informations pour compléter téléphone et horaires manquants
+OCR_WORKERS = os.cpu_count() or 2  # Processus Tesseract (indépendant du nombre de navigateurs)
+OCR_MAX_PENDING = 32  # Captures en attente d'OCR au-delà desquelles les workers navigateur patientent
+OCR_JOIN_TIMEOUT = 60  # Délai max (secondes) d'attente du résultat OCR avant la sauvegarde
+USE_LLM_STRUCTURING = False  # Structurer le texte OCR avec OpenAI (adresse, site, prix, catégorie...)
+LLM_BATCH_SIZE = 10  # Textes OCR de restaurants différents envoyés dans une même requête OpenAI
+LLM_BATCH_MAX_WAIT = 2.0  # Délai max (secondes) avant l'envoi d'un lot incomplet
+LLM_OCR_MAX_CHARS = 2000  # Caractères de texte OCR transmis par restaurant
+LLM_STRUCTURING_TIMEOUT = 180  # Attente max (secondes) du résultat LLM avant la sauvegarde
+OPENING_HOURS_LLM_FALLBACK = bool(OPENAI_API_KEY)  # Horaires compris en partie par le parser: repli OpenAI
+OPENING_HOURS_MIN_CONFIDENCE = hours_parser.MIN_CONFIDENCE  # Confiance du parser en dessous de laquelle le LLM est sollicité
+OCR_PANEL_CROP = (0, 0, 600, 1700)  # Zone du panneau latéral dans la capture (comme screenshot_panel)
+
+# Captures d'écran: gardées en mémoire, recadrées puis encodées une seule fois
+SCREENSHOT_FORMAT = "JPEG"  # Format stocké dans le champ image: "JPEG", "WEBP" ou "PNG"
+SCREENSHOT_QUALITY = 80  # Qualité JPEG/WebP (1-95)
+SCREENSHOT_MAX_SIZE = (800, 800)  # Dimensions max (px) de l'image stockée, ratio conservé
+
+# Images des documents: stockées par hash hors de MongoDB, le document garde une référence
+USE_IMAGE_STORE = image_store.IMAGE_STORE_ENABLED  # Désactivé par défaut (IMAGE_STORE_ENABLED=true ou --use-image-store)
+IMAGE_STORE_BACKEND = image_store.IMAGE_STORE_BACKEND  # "gridfs" ou "filesystem"
+IMAGE_FIELDS = ("photo", "photos", "images")  # Champs d'image des documents producers
+
+# Pipeline par étapes (navigateur → OCR → enrichissement → sauvegarde)
+USE_STAGED_PIPELINE = True  # Sinon: un thread exécute toutes les étapes d'un restaurant (--no-staged)
+PIPELINE_BROWSER_WORKERS = 4  # Sessions Chrome pilotées en parallèle
+PIPELINE_FETCH_WORKERS = 16  # Requêtes HTTP d'enrichissement (BrightData/Bing) simultanées
+PIPELINE_SAVE_WORKERS = 1  # Préparation des documents pour l'écrivain groupé
+PIPELINE_QUEUE_SIZE = 32  # Taille des files entre étapes (au-delà, l'étape amont attend)
+
+# Enrichissement par plateformes (Bing → TheFork + TripAdvisor en parallèle)
+PLATFORM_FETCH_CONCURRENCY = 16  # Extractions de plateformes simultanées, tous restaurants confondus
+ENRICHMENT_DEADLINE = 150  # Secondes par restaurant; au-delà on sauvegarde les résultats partiels
+ENRICH_PLATFORM_DETAILS = False  # Extraire aussi TheFork/TripAdvisor (--platform-details), sinon seulement les liens Bing
+
+# Rafraîchissement incrémental: chaque groupe de champs a sa date de collecte (fetched_at.<groupe>)
+REFRESH_FIELD_GROUPS = {
+    "rating": ("rating", "notes_globales", "reviews", "popular_times", "business_status"),
+    "opening_hours": ("opening_hours",),
+    "photos": ("photo", "photos", "images"),
+    "contact": ("phone_number", "international_phone_number", "website", "price_level", "description"),
+}
+REFRESH_TTLS = {  # Durée de validité de chaque groupe, en secondes
+    "rating": 24 * 3600,
+    "opening_hours": 7 * 24 * 3600,
+    "photos": 30 * 24 * 3600,
+    "contact": 30 * 24 * 3600,
+}
+REFRESH_BATCH_SIZE = 100  # Restaurants les plus périmés retraités par lancement (--refresh)
+
+# Configuration de la file de travail durable (--enqueue / --worker, plusieurs machines)
+JOB_QUEUE_COLLECTION = "restaurant_jobs"  # Collection de la file, dans la base DB_NAME
+JOB_LEASE_SECONDS = job_queue.JOB_LEASE_SECONDS  # Bail d'un restaurant réservé, prolongé tant qu'il est traité
+JOB_MAX_ATTEMPTS = job_queue.JOB_MAX_ATTEMPTS  # Tentatives avant de passer un restaurant en "failed"
+JOB_POLL_INTERVAL = 15  # Secondes entre deux réservations quand aucun restaurant n'est disponible
+
+# Configuration de la déduplication (restaurant_dedup.py)
+USE_DEDUP_INDEX = True  # Rattacher chaque restaurant sauvegardé ou découvert à une fiche existante similaire
+
+# Budget des API payantes: quota quotidien et débit (seau à jetons) par API
+# Sans daily_limit, l'API n'a qu'une limite de débit (quota fixé avec --api-limit API=N)
+API_BUDGET_FILE = "api_budget_usage.json"  # Consommation du jour, conservée entre deux lancements
+API_BUDGETS = {
+    "places": {"daily_limit": MAX_MAPS_API_REQUESTS, "rate": PLACES_QPS, "burst": PLACES_QPS},
+    "brightdata": {"rate": 2, "burst": 5},
+    "bing": {"rate": 1, "burst": 3},
+    "openai": {"rate": 3, "burst": 5},
+}
+# Part du quota quotidien que les appels secondaires ("low": pages suivantes) laissent aux autres
+API_PRIORITY_RESERVES = {"high": 0.0, "normal": 0.0, "low": 0.25}
+
 # Configurer OpenAI API
 openai.api_key = OPENAI_API_KEY
 
-# Variables globales pour statistiques de performance
-TIMING_STATS = defaultdict(list)
+# Variables globales (statistiques de performance: voir METRICS)
 DEBUG_MODE = False  # Mode debug avec logs détaillés
 USE_BRIGHTDATA = False  # Utilisation de BrightData pour contourner les mesures anti-bot
 BRIGHTDATA_ENABLED = True  # Si le service BrightData est activé
+BRIGHTDATA_CONCURRENCY = 8  # Requêtes BrightData simultanées par zone
 
-# Cache pour les résultats de recherche
-SEARCH_CACHE = {}
-HTML_CACHE = {}
-BING_SEARCH_CACHE = {}
+# Cache pour les résultats de recherche (SEARCH_CACHE, HTML_CACHE, BING_SEARCH_CACHE: voir TTLCache)
 MAX_CACHE_SIZE = 1000
 CACHE_TIMEOUT = 3600  # 1 heure en secondes
 
+# Cache persistant des réponses Google Maps Nearby Search
+NEARBY_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nearby_search_cache.sqlite")
+NEARBY_CACHE_TTL = 7 * 24 * 3600  # 7 jours en secondes (comme PlacesCache dans wellness.py)
+NEARBY_CACHE_MAX_SIZE = 50000  # Un balayage complet de Paris dépasse largement MAX_CACHE_SIZE
+USE_NEARBY_CACHE = True
+
+# Cache disque compressé des pages récupérées via BrightData (TheFork, TripAdvisor, Bing)
+HTML_DISK_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_cache.sqlite")
+HTML_DISK_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Taille compressée maximale avant éviction LRU
+HTML_CACHE_TTLS = {  # Durée de validité par plateforme, en secondes
+    "bing_search": 3 * 24 * 3600,
+    "lafourchette": 7 * 24 * 3600,
+    "thefork": 7 * 24 * 3600,
+    "tripadvisor": 14 * 24 * 3600,
+}
+HTML_CACHE_DEFAULT_TTL = 7 * 24 * 3600
+USE_HTML_DISK_CACHE = True
+HTML_CACHE_OFFLINE = False  # Rejouer uniquement depuis le cache disque (aucune requête BrightData)
+
 # Définition des catégories de restaurant pour Google Maps API
 RESTAURANT_CATEGORIES = {
     "restaurant", "cafe", "bar", "meal_takeaway", "bakery", "fast_food",
@@ -97,41 +257,869 @@ RESTAURANT_CATEGORIES = {
     "ice_cream_shop", "brewery", "pub"
 }
 
-# Ajouter la variable globale de cache pour les recherches Bing
-BING_SEARCH_CACHE = {}
+# =============================================
+# INSTRUMENTATION
+# =============================================
+
+class LatencyHistogram:
+    """
+    Histogramme de durées à buckets logarithmiques fixes
+    
+    Mémoire constante quel que soit le nombre d'appels (contrairement à une
+    liste de durées brutes); les quantiles sont estimés à la borne du bucket
+    (précision ~15%).
+    """
+    # Bornes de 1 ms à ~17 min, ratio 1.15 entre deux buckets
+    BOUNDS = [0.001 * 1.15 ** i for i in range(100)]
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+    
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.BOUNDS, seconds)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+    
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulated = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulated += bucket_count
+            if cumulated >= rank:
+                # Borne supérieure du bucket, sans dépasser le maximum observé
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+    
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "min": round(self.min or 0.0, 6),
+            "max": round(self.max, 6),
+            "p50": round(self.quantile(0.50), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+        }
+
+class MetricsRegistry:
+    """
+    Métriques de l'exécution, toujours actives et bornées en mémoire
+    
+    - histogrammes de durée par fonction (timing_decorator)
+    - compteurs étiquetés (erreurs, tentatives supplémentaires...)
+    - appels les plus lents avec leur identifiant de trace
+    
+    Exportables en JSON ou au format texte Prometheus pendant l'exécution.
+    """
+    SLOWEST_CALLS = 20
+    
+    def __init__(self):
+        self.histograms = defaultdict(LatencyHistogram)
+        self.counters = defaultdict(int)
+        self.slowest = []  # tas min de (durée, fonction, trace, restaurant)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+    
+    def observe(self, name, seconds, trace_id=None, label=None):
+        with self._lock:
+            self.histograms[name].observe(seconds)
+            entry = (seconds, name, trace_id or "", label or "")
+            if len(self.slowest) < self.SLOWEST_CALLS:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+    
+    def incr(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += amount
+    
+    def __bool__(self):
+        return bool(self.histograms)
+    
+    def snapshot(self):
+        """Copie cohérente des métriques (dictionnaire sérialisable en JSON)"""
+        with self._lock:
+            histograms = {name: hist.summary() for name, hist in self.histograms.items()}
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            slowest = [
+                {"seconds": round(seconds, 3), "function": name, "trace_id": trace_id, "restaurant": label}
+                for seconds, name, trace_id, label in sorted(self.slowest, reverse=True)
+            ]
+        # Compteurs tenus par les caches et le budget des API
+        for cache in opened_caches():
+            stats = cache.stats()
+            counters.append({"name": "cache_hits", "labels": {"cache": stats["name"]}, "value": stats["hits"]})
+            counters.append({"name": "cache_misses", "labels": {"cache": stats["name"]}, "value": stats["misses"]})
+        for api, row in API_BUDGET.snapshot().items():
+            counters.append({"name": "api_requests", "labels": {"api": api}, "value": row["used"]})
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "functions": histograms,
+            "counters": counters,
+            "slowest_calls": slowest,
+        }
+    
+    def to_prometheus(self, snapshot=None):
+        """Format texte d'exposition Prometheus"""
+        snapshot = snapshot or self.snapshot()
+        lines = [
+            "# HELP pipeline_function_seconds Durée des fonctions instrumentées",
+            "# TYPE pipeline_function_seconds summary",
+        ]
+        for name, summary in sorted(snapshot["functions"].items()):
+            for key, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+                lines.append(f'pipeline_function_seconds{{function="{name}",quantile="{quantile}"}} {summary[key]}')
+            lines.append(f'pipeline_function_seconds_sum{{function="{name}"}} {summary["sum"]}')
+            lines.append(f'pipeline_function_seconds_count{{function="{name}"}} {summary["count"]}')
+        declared = set()
+        # Les échantillons d'une même métrique doivent être consécutifs
+        for counter in sorted(snapshot["counters"], key=lambda c: c["name"]):
+            metric = f"pipeline_{counter['name']}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            labels = ",".join(f'{key}="{value}"' for key, value in counter["labels"].items())
+            lines.append(f"{metric}{{{labels}}} {counter['value']}")
+        lines.append(f"pipeline_uptime_seconds {snapshot['uptime_seconds']}")
+        return "\n".join(lines) + "\n"
+    
+    def export(self, path):
+        """Écrit les métriques (JSON si path finit par .json, sinon Prometheus) de façon atomique"""
+        snapshot = self.snapshot()
+        if path.endswith(".json"):
+            content = json.dumps(snapshot, indent=2, ensure_ascii=False)
+        else:
+            content = self.to_prometheus(snapshot)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+METRICS = MetricsRegistry()
+
+# Identifiant de trace du restaurant en cours (propagé entre threads par le pipeline)
+CURRENT_TRACE = contextvars.ContextVar("current_trace", default=(None, None))
+
+INTERNAL_KEYS = ("_trace_id", "_refresh_groups", "_job_id")  # Clés de suivi, jamais écrites telles quelles en base
+
+def carry_internal_keys(source, target):
+    """Recopie les clés internes d'un restaurant vers les données dérivées d'une étape"""
+    for key in INTERNAL_KEYS:
+        if key in source:
+            target.setdefault(key, source[key])
+    return target
+
+def new_trace_id():
+    return uuid.uuid4().hex[:12]
+
+def ensure_trace_id(item):
+    """Attribue un identifiant de trace à un restaurant (conservé dans la clé interne _trace_id)"""
+    if isinstance(item, dict):
+        return item.setdefault("_trace_id", new_trace_id())
+    return None
+
+def record_retry(operation):
+    """Compte une tentative supplémentaire (au-delà de la première) d'une opération"""
+    METRICS.incr("retries", operation=operation)
+
+METRICS_FILE = None  # Fichier d'export (.json ou .prom), None pour désactiver
+METRICS_EXPORT_INTERVAL = 15  # Secondes entre deux exports pendant l'exécution
+_METRICS_EXPORTER = None
+
+def start_metrics_exporter(path=None, interval=None):
+    """
+    Exporte périodiquement les métriques dans un fichier (lisible pendant un long balayage)
+    """
+    global _METRICS_EXPORTER
+    path = path or METRICS_FILE
+    interval = interval or METRICS_EXPORT_INTERVAL
+    if not path or _METRICS_EXPORTER is not None:
+        return
+    stop_event = threading.Event()
+    
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                METRICS.export(path)
+            except Exception as e:
+                print(f"⚠️ Export des métriques impossible: {e}")
+    
+    thread = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+    thread.start()
+    _METRICS_EXPORTER = (thread, stop_event, path)
+    print(f"📈 Métriques exportées toutes les {interval}s dans {path}")
+
+def stop_metrics_exporter():
+    """Arrête l'export périodique et écrit un dernier instantané"""
+    global _METRICS_EXPORTER
+    if _METRICS_EXPORTER is None:
+        return
+    thread, stop_event, path = _METRICS_EXPORTER
+    _METRICS_EXPORTER = None
+    stop_event.set()
+    try:
+        METRICS.export(path)
+    except Exception as e:
+        print(f"⚠️ Export des métriques impossible: {e}")
+
+atexit.register(stop_metrics_exporter)
 
 # Décorateur pour mesurer le temps d'exécution des fonctions
 def timing_decorator(func):
+    """
+    Mesure chaque appel dans l'histogramme de la fonction (toujours actif)
+    
+    Le détail des appels n'est affiché qu'en mode debug, préfixé par
+    l'identifiant de trace du restaurant.
+    """
+    name = func.__name__
+    
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        if not DEBUG_MODE:
+        start_time = time.perf_counter()
+        try:
             return func(*args, **kwargs)
-        
-        # Mesurer le temps pour cette fonction
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        
-        # Calculer la durée
-        duration = end_time - start_time
-        
-        # Récupérer le nom du restaurant si disponible dans les arguments
-        restaurant_name = None
-        for arg in args:
-            if isinstance(arg, dict) and arg.get("name"):
-                restaurant_name = arg["name"]
-                break
-        
-        # Afficher les informations de timing
-        log_prefix = f"[{restaurant_name}] " if restaurant_name else ""
-        print(f"⏱️ {log_prefix}{func.__name__}: {duration:.2f} secondes")
-        
-        # Stocker les stats
-        TIMING_STATS[func.__name__].append(duration)
-        
-        return result
+        except Exception:
+            METRICS.incr("errors", function=name)
+            raise
+        finally:
+            duration = time.perf_counter() - start_time
+            trace_id, restaurant_name = CURRENT_TRACE.get()
+            if restaurant_name is None:
+                # Récupérer le nom du restaurant si disponible dans les arguments
+                for arg in args:
+                    if isinstance(arg, dict) and arg.get("name"):
+                        restaurant_name = arg["name"]
+                        break
+            METRICS.observe(name, duration, trace_id=trace_id, label=restaurant_name)
+            
+            if DEBUG_MODE:
+                # Afficher les informations de timing
+                log_prefix = f"[{restaurant_name}] " if restaurant_name else ""
+                trace_suffix = f" (trace {trace_id})" if trace_id else ""
+                print(f"⏱️ {log_prefix}{name}: {duration:.2f} secondes{trace_suffix}")
     return wrapper
 
+# =============================================
+# CACHES
+# =============================================
+
+class TTLCache:
+    """
+    Cache en mémoire borné: expiration après ttl secondes et éviction LRU
+    au-delà de max_size entrées. Partageable entre threads.
+    """
+    def __init__(self, name, max_size=MAX_CACHE_SIZE, ttl=CACHE_TIMEOUT):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # clé -> (horodatage, valeur)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not (self.ttl and time.time() - entry[0] > self.ttl)
+    
+    def __getitem__(self, key):
+        value = self.get(key, _CACHE_MISS)
+        if value is _CACHE_MISS:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        self.set(key, value)
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def stats(self):
+        return {"name": self.name, "size": len(self._data), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class PersistentTTLCache:
+    """
+    Cache persistant (sqlite) de valeurs JSON avec expiration, éviction LRU
+    au-delà de max_size entrées et compteurs de hits/misses.
+    
+    Survit aux redémarrages: une relance sur les mêmes zones ne consomme
+    pas de quota tant que les entrées n'ont pas expiré.
+    """
+    def __init__(self, name, path, max_size=MAX_CACHE_SIZE, ttl=CACHE_TIMEOUT):
+        self.name = name
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, last_access)")
+        self._conn.commit()
+    
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.name, key)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.name, key))
+                self._conn.commit()
+                self.misses += 1
+                return default
+            self._conn.execute(
+                "UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, self.name, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+    
+    def set(self, key, value):
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self.name, key, payload, now, now)
+            )
+            # Éviction LRU au-delà de max_size entrées
+            count = self._conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.name,)).fetchone()[0]
+            if count > self.max_size:
+                excess = count - self.max_size
+                self._conn.execute(
+                    "DELETE FROM cache WHERE rowid IN ("
+                    " SELECT rowid FROM cache WHERE namespace = ? ORDER BY last_access ASC LIMIT ?)",
+                    (self.name, excess)
+                )
+                self.evictions += excess
+            self._conn.commit()
+    
+    def has(self, key):
+        """Indique si une entrée non expirée existe, sans toucher aux compteurs"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.name, key)
+            ).fetchone()
+        return row is not None and not (self.ttl and time.time() - row[0] > self.ttl)
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.name,)).fetchone()[0]
+    
+    def stats(self):
+        return {"name": self.name, "size": len(self), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class CompressedPageCache:
+    """
+    Cache persistant (sqlite) de pages compressées (zlib), avec une durée de
+    validité par plateforme, éviction LRU au-delà de max_bytes compressés et
+    compteurs de hits/misses.
+    
+    La durée de validité est appliquée à la lecture: modifier HTML_CACHE_TTLS
+    vaut aussi pour les pages déjà en cache.
+    """
+    def __init__(self, name, path, max_bytes=HTML_DISK_CACHE_MAX_BYTES, ttls=None, default_ttl=HTML_CACHE_DEFAULT_TTL):
+        self.name = name
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = ttls if ttls is not None else HTML_CACHE_TTLS
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY, platform TEXT, body BLOB NOT NULL,"
+            " raw_size INTEGER NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_access)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+    
+    def ttl_for(self, platform):
+        return self.ttls.get(platform, self.default_ttl)
+    
+    def get(self, key, default=None, allow_stale=False):
+        """
+        Args:
+            key: Clé de la page (URL + plateforme)
+            default: Valeur retournée si la page est absente ou expirée
+            allow_stale: Retourner aussi une page expirée (rejeu hors ligne)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, platform, created_at FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            body, platform, created_at = row
+            ttl = self.ttl_for(platform)
+            if ttl and now - created_at > ttl:
+                if not allow_stale:
+                    # Conservée jusqu'à l'éviction: utile pour un rejeu hors ligne
+                    self.misses += 1
+                    return default
+                self.stale_hits += 1
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(body).decode("utf-8"))
+    
+    def set(self, key, value, platform=None):
+        now = time.time()
+        raw = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        body = zlib.compress(raw, 6)
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, platform, body, raw_size, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, platform, body, len(raw), len(body), now, now)
+            )
+            self._bytes += len(body) - (previous[0] if previous else 0)
+            # Éviction LRU jusqu'à 90% de max_bytes pour ne pas évincer à chaque écriture
+            if self._bytes > self.max_bytes:
+                target = self.max_bytes * 0.9
+                while self._bytes > target:
+                    rows = self._conn.execute(
+                        "SELECT key, size FROM pages ORDER BY last_access ASC LIMIT 100"
+                    ).fetchall()
+                    if not rows:
+                        break
+                    for old_key, size in rows:
+                        self._conn.execute("DELETE FROM pages WHERE key = ?", (old_key,))
+                        self._bytes -= size
+                        self.evictions += 1
+                        if self._bytes <= target:
+                            break
+            self._conn.commit()
+    
+    def sample_pages(self, per_platform=20):
+        """
+        Pages en cache regroupées par plateforme (fixtures du benchmark de parsing)
+        
+        Returns:
+            Dictionnaire {plateforme: [html, ...]}
+        """
+        pages = defaultdict(list)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT platform, body FROM ("
+                " SELECT platform, body, ROW_NUMBER() OVER (PARTITION BY platform ORDER BY last_access DESC) AS rank"
+                " FROM pages) WHERE rank <= ?",
+                (per_platform,)
+            ).fetchall()
+        for platform, body in rows:
+            pages[platform or "autre"].append(json.loads(zlib.decompress(body).decode("utf-8")))
+        return dict(pages)
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    
+    def stats(self):
+        with self._lock:
+            count, raw_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0) FROM pages"
+            ).fetchone()
+        return {"name": self.name, "size": count, "max_size": f"{self.max_bytes // (1024 * 1024)}Mo",
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "stale_hits": self.stale_hits, "bytes": self._bytes, "raw_bytes": raw_size}
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_CACHE_MISS = object()
+
+# Caches en mémoire (bornés par MAX_CACHE_SIZE et CACHE_TIMEOUT)
+SEARCH_CACHE = TTLCache("search")
+HTML_CACHE = TTLCache("html")
+BING_SEARCH_CACHE = TTLCache("bing")
+
+# Cache persistant Nearby Search (ouvert à la première utilisation)
+NEARBY_CACHE = None
+NEARBY_CACHE_LOCK = threading.Lock()
+
+def get_nearby_cache():
+    """
+    Retourne le cache persistant des réponses Nearby Search (ou None s'il est désactivé)
+    """
+    global NEARBY_CACHE
+    if not USE_NEARBY_CACHE:
+        return None
+    if NEARBY_CACHE is None:
+        with NEARBY_CACHE_LOCK:
+            if NEARBY_CACHE is None:
+                try:
+                    NEARBY_CACHE = PersistentTTLCache("nearby", NEARBY_CACHE_FILE, max_size=NEARBY_CACHE_MAX_SIZE, ttl=NEARBY_CACHE_TTL)
+                except Exception as e:
+                    print(f"⚠️ Cache Nearby Search indisponible: {e}")
+                    return None
+    return NEARBY_CACHE
+
+def close_nearby_cache():
+    """Ferme la connexion sqlite du cache Nearby Search"""
+    global NEARBY_CACHE
+    with NEARBY_CACHE_LOCK:
+        if NEARBY_CACHE is not None:
+            NEARBY_CACHE.close()
+            NEARBY_CACHE = None
+
+atexit.register(close_nearby_cache)
+
+# Cache disque des pages BrightData (ouvert à la première utilisation)
+HTML_DISK_CACHE = None
+HTML_DISK_CACHE_LOCK = threading.Lock()
+
+def get_html_disk_cache():
+    """
+    Retourne le cache disque des pages BrightData (ou None s'il est désactivé)
+    """
+    global HTML_DISK_CACHE
+    if not USE_HTML_DISK_CACHE and not HTML_CACHE_OFFLINE:
+        return None
+    if HTML_DISK_CACHE is None:
+        with HTML_DISK_CACHE_LOCK:
+            if HTML_DISK_CACHE is None:
+                try:
+                    HTML_DISK_CACHE = CompressedPageCache("html_disk", HTML_DISK_CACHE_FILE)
+                except Exception as e:
+                    print(f"⚠️ Cache disque HTML indisponible: {e}")
+                    return None
+    return HTML_DISK_CACHE
+
+def close_html_disk_cache():
+    global HTML_DISK_CACHE
+    with HTML_DISK_CACHE_LOCK:
+        if HTML_DISK_CACHE is not None:
+            HTML_DISK_CACHE.close()
+            HTML_DISK_CACHE = None
+
+atexit.register(close_html_disk_cache)
+
+def opened_caches():
+    """Caches en mémoire et caches persistants ouverts pendant l'exécution"""
+    caches = [SEARCH_CACHE, HTML_CACHE, BING_SEARCH_CACHE]
+    for cache in (NEARBY_CACHE, HTML_DISK_CACHE):
+        if cache is not None:
+            caches.append(cache)
+    return caches
+
+def nearby_cache_key(lat, lng, radius, place_type, page=0):
+    """
+    Clé de cache d'une requête Nearby Search: (lat, lng, radius, type, page)
+    """
+    return f"{float(lat):.6f}|{float(lng):.6f}|{int(radius)}|{place_type}|{int(page)}"
+
+def print_cache_stats():
+    """Affiche les compteurs des caches utilisés pendant l'exécution"""
+    rows = [cache.stats() for cache in opened_caches()]
+    if not any(row["hits"] or row["misses"] for row in rows):
+        return
+    
+    print("\n🗄️ CACHES:")
+    print(f"{'CACHE':<10} | {'TAILLE':<12} | {'HITS':<8} | {'MISSES':<8} | {'ÉVICTIONS':<9}")
+    print("-" * 60)
+    for row in rows:
+        size = f"{row['size']}/{row['max_size']}"
+        print(f"{row['name']:<10} | {size:<12} | {row['hits']:<8} | {row['misses']:<8} | {row['evictions']:<9}")
+    for row in rows:
+        if row.get("raw_bytes"):
+            ratio = row["raw_bytes"] / max(1, row["bytes"])
+            print(f"   {row['name']}: {row['bytes'] / (1024 * 1024):.1f} Mo compressés "
+                  f"({ratio:.1f}x), {row['stale_hits']} pages expirées rejouées")
+
+# =============================================
+# BUDGET DES API
+# =============================================
+
+class TokenBucket:
+    """
+    Seau à jetons: autorise des rafales de capacity appels puis un débit
+    moyen de rate appels par seconde. Partageable entre threads.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def take(self, cost=1):
+        """
+        Consomme cost jetons si possible
+        
+        Returns:
+            0 si les jetons ont été pris, sinon le délai (secondes) avant d'en disposer
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return 0
+            return (cost - self.tokens) / self.rate
+
+class ApiBudgetManager:
+    """
+    Budget partagé des API payantes (Places, BrightData, Bing, OpenAI)
+    
+    Chaque API a un quota quotidien et un seau à jetons pour le débit.
+    La consommation du jour est persistée dans un fichier JSON pour survivre
+    aux redémarrages. Les appels de priorité "low" laissent une réserve du
+    quota aux appels normaux (voir API_PRIORITY_RESERVES).
+    Utilisable depuis des threads (acquire) comme depuis asyncio (acquire_async).
+    """
+    def __init__(self, budgets=None, state_file=API_BUDGET_FILE, save_interval=1.0):
+        self.state_file = state_file
+        self.save_interval = save_interval
+        self.limits = {}
+        self.buckets = {}
+        self.used = {}
+        self.denied = defaultdict(int)
+        self.day = datetime.now().strftime("%Y-%m-%d")
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self._dirty = False
+        for api, config in (budgets or API_BUDGETS).items():
+            self.configure(api, **config)
+        self._load()
+    
+    def configure(self, api, daily_limit=None, rate=None, burst=None):
+        """Définit ou modifie le quota quotidien et le débit d'une API"""
+        with self._lock:
+            if daily_limit is not None:
+                self.limits[api] = int(daily_limit)
+            if rate is not None:
+                self.buckets[api] = TokenBucket(rate, burst or rate)
+            self.used.setdefault(api, 0)
+    
+    def use_state_file(self, state_file):
+        """Change le fichier de consommation et recharge celle du jour"""
+        with self._lock:
+            self.state_file = state_file
+        self._load()
+    
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("day") == self.day:
+                for api, count in state.get("used", {}).items():
+                    self.used[api] = int(count)
+        except Exception as e:
+            print(f"⚠️ Impossible de lire la consommation des API ({self.state_file}): {e}")
+    
+    def save(self, force=False):
+        """Écrit la consommation du jour (au plus une fois par save_interval sauf si force)"""
+        if not self.state_file:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not self._dirty or (not force and now - self._last_save < self.save_interval):
+                return
+            state = {"day": self.day, "used": dict(self.used)}
+            self._dirty = False
+            self._last_save = now
+        try:
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            print(f"⚠️ Impossible d'enregistrer la consommation des API: {e}")
+    
+    def _roll_day(self):
+        # Nouveau jour: les quotas repartent de zéro
+        today = datetime.now().strftime("%Y-%m-%d")
+        if today != self.day:
+            self.day = today
+            self.used = {api: 0 for api in self.used}
+            self._dirty = True
+    
+    def remaining(self, api, priority="high"):
+        """Nombre d'appels encore autorisés aujourd'hui pour cette priorité"""
+        with self._lock:
+            self._roll_day()
+            limit = self.limits.get(api)
+            if limit is None:
+                return float("inf")
+            reserve = int(limit * API_PRIORITY_RESERVES.get(priority, 0.0))
+            return max(0, limit - reserve - self.used.get(api, 0))
+    
+    def spent(self, api):
+        """Nombre d'appels déjà consommés aujourd'hui"""
+        with self._lock:
+            self._roll_day()
+            return self.used.get(api, 0)
+    
+    def has_budget(self, api, priority="normal", cost=1):
+        return self.remaining(api, priority) >= cost
+    
+    def try_acquire(self, api, priority="normal", cost=1):
+        """
+        Tente de réserver cost appels sans attendre
+        
+        Returns:
+            0 si accordé, le délai à attendre si le débit est dépassé,
+            None si le quota quotidien (pour cette priorité) est épuisé
+        """
+        if not self.has_budget(api, priority, cost):
+            with self._lock:
+                self.denied[api] += 1
+            return None
+        bucket = self.buckets.get(api)
+        wait = bucket.take(cost) if bucket else 0
+        if wait:
+            return wait
+        with self._lock:
+            # Revérifier sous verrou: d'autres threads ont pu consommer entre-temps
+            limit = self.limits.get(api)
+            reserve = int(limit * API_PRIORITY_RESERVES.get(priority, 0.0)) if limit is not None else 0
+            if limit is not None and self.used.get(api, 0) + cost > limit - reserve:
+                self.denied[api] += 1
+                return None
+            self.used[api] = self.used.get(api, 0) + cost
+            self._dirty = True
+        self.save()
+        return 0
+    
+    def acquire(self, api, priority="normal", cost=1, timeout=None):
+        """
+        Réserve cost appels en attendant le débit si nécessaire (threads)
+        
+        Returns:
+            True si accordé, False si le quota est épuisé ou le délai dépassé
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait = self.try_acquire(api, priority, cost)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+    
+    async def acquire_async(self, api, priority="normal", cost=1, timeout=None):
+        """Équivalent de acquire pour asyncio (n'immobilise pas la boucle)"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait = self.try_acquire(api, priority, cost)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+    
+    def snapshot(self):
+        """Consommation courante par API: utilisés, quota, restants, refus"""
+        with self._lock:
+            self._roll_day()
+            return {
+                api: {
+                    "used": self.used.get(api, 0),
+                    "daily_limit": self.limits.get(api),
+                    "remaining": (max(0, self.limits[api] - self.used.get(api, 0))
+                                  if api in self.limits else None),
+                    "denied": self.denied.get(api, 0),
+                }
+                for api in sorted(set(self.limits) | set(self.used))
+            }
+
+API_BUDGET = ApiBudgetManager()
+atexit.register(lambda: API_BUDGET.save(force=True))
+
+def print_api_budget(only_if_used=False):
+    """Affiche la consommation du jour de chaque API"""
+    if only_if_used and not any(API_BUDGET.spent(api) for api in list(API_BUDGET.used)):
+        return
+    print(f"\n💳 BUDGET DES API ({API_BUDGET.day}):")
+    print(f"{'API':<12} | {'UTILISÉS':<9} | {'QUOTA':<7} | {'RESTANTS':<9} | {'REFUS':<6}")
+    print("-" * 55)
+    for api, row in API_BUDGET.snapshot().items():
+        # Pas de quota quotidien: seul le débit est limité
+        daily_limit = "-" if row["daily_limit"] is None else row["daily_limit"]
+        remaining = "-" if row["remaining"] is None else row["remaining"]
+        print(f"{api:<12} | {row['used']:<9} | {str(daily_limit):<7} | "
+              f"{str(remaining):<9} | {row['denied']:<6}")
+
 # Configuration du navigateur Chrome pour Selenium
 # Ne pas mettre dans une variable globale pour éviter les problèmes avec copy()
 @timing_decorator
@@ -145,21 +1133,131 @@ def get_chrome_options():
     options.add_argument("--lang=fr")  # Passer en français pour une meilleure extraction
     return options
 
+class MongoConnectionManager:
+    """
+    Gère un client MongoDB unique, partagé par tous les threads du pipeline.
+    
+    MongoClient est thread-safe et maintient son propre pool de connexions:
+    on le crée une seule fois (à la première utilisation) au lieu d'ouvrir
+    une connexion TLS vers Atlas pour chaque restaurant.
+    """
+    def __init__(self, uri, max_pool_size=MONGO_MAX_POOL_SIZE, min_pool_size=MONGO_MIN_POOL_SIZE):
+        self.uri = uri
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self._client = None
+        self._lock = threading.Lock()
+    
+    def configure(self, uri=None, max_pool_size=None, min_pool_size=None):
+        """
+        Modifie la configuration du pool (le client existant est fermé)
+        
+        Args:
+            uri: Nouvelle URI MongoDB (optionnelle)
+            max_pool_size: Taille maximale du pool de connexions (optionnelle)
+            min_pool_size: Taille minimale du pool de connexions (optionnelle)
+        """
+        with self._lock:
+            self._close_locked()
+            if uri:
+                self.uri = uri
+            if max_pool_size:
+                self.max_pool_size = max_pool_size
+            if min_pool_size is not None:
+                self.min_pool_size = min_pool_size
+    
+    def get_client(self):
+        """
+        Retourne le client partagé, en le créant à la première demande
+        
+        Returns:
+            Instance de MongoClient ou None si la connexion est impossible
+        """
+        client = self._client
+        if client is not None:
+            return client
+        
+        with self._lock:
+            if self._client is None:
+                try:
+                    client = MongoClient(
+                        self.uri,
+                        maxPoolSize=self.max_pool_size,
+                        minPoolSize=self.min_pool_size,
+                        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS
+                    )
+                    # Tester la connexion une seule fois, à l'initialisation
+                    client.admin.command("ping")
+                    self._client = client
+                    print(f"✅ Pool MongoDB initialisé (maxPoolSize={self.max_pool_size})")
+                except Exception as e:
+                    print(f"❌ Erreur lors de la connexion à MongoDB: {str(e)}")
+                    return None
+            return self._client
+    
+    def get_collection(self, db_name=DB_NAME, collection_name=COLLECTION_NAME):
+        """
+        Retourne une collection à partir du client partagé
+        
+        Returns:
+            Collection MongoDB ou None si la connexion est impossible
+        """
+        client = self.get_client()
+        if client is None:
+            return None
+        return client[db_name][collection_name]
+    
+    def close(self):
+        """Ferme le client partagé et toutes les connexions du pool"""
+        with self._lock:
+            self._close_locked()
+    
+    def _close_locked(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+                if DEBUG_MODE:
+                    print("🔌 Pool MongoDB fermé")
+            except Exception as e:
+                print(f"⚠️ Erreur lors de la fermeture du pool MongoDB: {str(e)}")
+            self._client = None
+
+# Gestionnaire de connexions global (initialisation paresseuse)
+MONGO_MANAGER = MongoConnectionManager(MONGODB_URI)
+atexit.register(MONGO_MANAGER.close)
+
 # Connexion à MongoDB
-@timing_decorator
 def get_mongo_client():
     """
-    Obtient une connexion à MongoDB
+    Obtient le client MongoDB partagé (pool de connexions)
+    
+    Le client ne doit pas être fermé par l'appelant: il est fermé
+    automatiquement à la fin du programme.
     """
-    try:
-        # Utiliser l'URI MongoDB Atlas
-        client = MongoClient(MONGODB_URI)
-        # Tester la connexion
-        client.server_info()
-        return client
-    except Exception as e:
-        print(f"❌ Erreur lors de la connexion à MongoDB: {str(e)}")
-        return None
+    return MONGO_MANAGER.get_client()
+
+def get_producers_collection():
+    """
+    Obtient la collection des restaurants à partir du client partagé
+    """
+    return MONGO_MANAGER.get_collection(DB_NAME, COLLECTION_NAME)
+
+IMAGE_STORE = None
+IMAGE_STORE_LOCK = threading.Lock()
+
+def get_restaurant_image_store():
+    """
+    Retourne le stockage d'images des restaurants (créé à la première utilisation)
+    
+    Le backend GridFS réutilise le client MongoDB partagé.
+    """
+    global IMAGE_STORE
+    if IMAGE_STORE is None:
+        with IMAGE_STORE_LOCK:
+            if IMAGE_STORE is None:
+                db = get_mongo_client()[DB_NAME] if IMAGE_STORE_BACKEND == "gridfs" else None
+                IMAGE_STORE = image_store.get_image_store(IMAGE_STORE_BACKEND, db=db)
+    return IMAGE_STORE
 
 # =============================================
 # ÉTAPE 1: RÉCUPÉRATION DES RESTAURANTS VIA GOOGLE MAPS API
@@ -194,90 +1292,643 @@ def generate_zones(divisions=5):
     
     return zones
 
-@timing_decorator
-def get_restaurants_in_zone(zone):
+def generate_grid_points(zone, step=0.005):
+    """
+    Génère les points de la grille de recherche d'une zone
+    
+    Args:
+        zone: Dictionnaire définissant les limites de la zone (lat_min, lat_max, lng_min, lng_max)
+        step: Espacement de la grille en degrés (0.005 ≈ 500 mètres)
+    
+    Returns:
+        Liste de tuples (lat, lng)
+    """
+    lat_min, lat_max = zone["lat_min"], zone["lat_max"]
+    lng_min, lng_max = zone["lng_min"], zone["lng_max"]
+    
+    lat_points = [lat_min + i * step for i in range(int((lat_max - lat_min) / step) + 1)]
+    lng_points = [lng_min + i * step for i in range(int((lng_max - lng_min) / step) + 1)]
+    
+    return [(lat, lng) for lat in lat_points for lng in lng_points]
+
+@timing_decorator
+def get_restaurants_in_zone(zone):
+    """
+    Récupère tous les restaurants dans une zone définie en utilisant Google Maps Nearby Search API
+    
+    Args:
+        zone: Dictionnaire définissant les limites de la zone (lat_min, lat_max, lng_min, lng_max)
+    
+    Returns:
+        Liste de restaurants avec leurs informations de base
+    """
+    # Vérifier si on a atteint la limite quotidienne
+    if not API_BUDGET.has_budget("places"):
+        print(f"⚠️ Limite quotidienne de l'API Google Maps atteinte ({MAX_MAPS_API_REQUESTS} requêtes)")
+        return []
+    
+    all_restaurants = []  # Liste pour stocker tous les résultats
+    
+    # Parcourir chaque point de la grille
+    for lat, lng in generate_grid_points(zone):
+        # Vérifier si on a atteint la limite
+        if not API_BUDGET.has_budget("places"):
+            print("⚠️ Limite quotidienne de l'API Google Maps atteinte pendant le traitement")
+            break
+            
+        url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={lat},{lng}&radius=200&type=restaurant&key={GOOGLE_MAPS_API_KEY}"
+        
+        try:
+            # Réponse en cache: aucune requête consommée
+            nearby_cache = get_nearby_cache()
+            cache_key = nearby_cache_key(lat, lng, 200, "restaurant", 0)
+            data = nearby_cache.get(cache_key) if nearby_cache is not None else None
+            if data is None:
+                if not API_BUDGET.acquire("places"):
+                    print("⚠️ Limite quotidienne de l'API Google Maps atteinte pendant le traitement")
+                    break
+                response = requests.get(url)
+                data = response.json()
+                if nearby_cache is not None and data.get("status") in NEARBY_OK_STATUSES:
+                    nearby_cache.set(cache_key, data)
+            
+            # Vérifiez si des résultats sont retournés
+            if 'results' in data:
+                # Filtrer les lieux pour inclure uniquement les catégories pertinentes
+                filtered_places = [
+                    place for place in data['results']
+                    if set(place.get("types", [])).intersection(RESTAURANT_CATEGORIES)
+                ]
+                all_restaurants.extend(filtered_places)
+            
+            # Récupérer le token pour la page suivante, s'il existe
+            next_page_token = data.get("next_page_token")
+            page_key = nearby_cache_key(lat, lng, 200, "restaurant", 1)
+            cached_page = nearby_cache.get(page_key) if nearby_cache is not None and next_page_token else None
+            if cached_page is not None:
+                data = cached_page
+                if 'results' in data:
+                    all_restaurants.extend(
+                        place for place in data['results']
+                        if set(place.get("types", [])).intersection(RESTAURANT_CATEGORIES)
+                    )
+            elif next_page_token and API_BUDGET.has_budget("places", priority="low"):
+                # Pause pour attendre que la page suivante soit prête
+                time.sleep(2)
+                url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?pagetoken={next_page_token}&key={GOOGLE_MAPS_API_KEY}"
+                # Les pages suivantes passent après les nouveaux points de la grille
+                if not API_BUDGET.acquire("places", priority="low"):
+                    continue
+                
+                response = requests.get(url)
+                data = response.json()
+                if nearby_cache is not None and data.get("status") in NEARBY_OK_STATUSES:
+                    nearby_cache.set(page_key, data)
+                
+                if 'results' in data:
+                    filtered_places = [
+                        place for place in data['results']
+                        if set(place.get("types", [])).intersection(RESTAURANT_CATEGORIES)
+                    ]
+                    all_restaurants.extend(filtered_places)
+        except Exception as e:
+            print(f"❌ Erreur Google Maps API: {e}")
+    
+    # Supprimer les doublons en utilisant place_id comme clé unique
+    unique_restaurants = {}
+    for restaurant in all_restaurants:
+        place_id = restaurant.get("place_id")
+        if place_id and place_id not in unique_restaurants:
+            unique_restaurants[place_id] = restaurant
+    
+    restaurants_list = list(unique_restaurants.values())
+    print(f"✅ {len(restaurants_list)} restaurants récupérés via Google Maps API dans la zone")
+    return restaurants_list
+
+# Marqueur de fin de balayage dans la file de sortie
+_SWEEP_DONE = object()
+
+class AsyncNearbySweeper:
+    """
+    Balaye des zones avec Google Maps Nearby Search de façon concurrente
+    
+    Les points de la grille sont interrogés en parallèle (nombre de requêtes
+    simultanées et débit limités), les pages suivantes sont planifiées comme
+    tâches différées au lieu de bloquer tout le balayage pendant 2 secondes,
+    et les lieux sont transmis dédupliqués dès leur arrivée.
+    """
+    def __init__(self, qps=PLACES_QPS, concurrency=PLACES_CONCURRENCY, radius=200,
+                 place_type="restaurant", step=0.005):
+        self.qps = qps
+        self.concurrency = concurrency
+        self.radius = radius
+        self.place_type = place_type
+        self.step = step
+        self.seen_place_ids = set()
+        self.requests_made = 0
+        self.cache_hits = 0
+    
+    def _budget_left(self, priority="normal"):
+        return API_BUDGET.has_budget("places", priority)
+    
+    async def _fetch(self, client, params, cache_key=None, priority="normal"):
+        # Réponse en cache persistant: ni quota ni attente de débit
+        nearby_cache = get_nearby_cache() if cache_key else None
+        if nearby_cache is not None:
+            cached = nearby_cache.get(cache_key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        
+        async with self._semaphore:
+            # Quota et débit vérifiés au dernier moment (les tâches sont créées en avance)
+            if not await API_BUDGET.acquire_async("places", priority):
+                return None
+            self.requests_made += 1
+            
+            try:
+                response = await client.get(NEARBY_SEARCH_URL, params=params, timeout=TIMEOUT)
+                data = response.json()
+            except Exception as e:
+                print(f"❌ Erreur Google Maps API: {e}")
+                return None
+        
+        if nearby_cache is not None and data.get("status") in NEARBY_OK_STATUSES:
+            nearby_cache.set(cache_key, data)
+        return data
+    
+    async def _query(self, client, params, out, tasks, origin=None, page=0):
+        cache_key = nearby_cache_key(*origin, page) if origin else None
+        # Les pages suivantes passent après les nouveaux points de la grille
+        priority = "low" if page else "normal"
+        data = await self._fetch(client, params, cache_key=cache_key, priority=priority)
+        if not data:
+            return
+        
+        for place in data.get("results", []):
+            if self._accept(place):
+                await out.put(place)
+        
+        # Page suivante: tâche différée, les autres points continuent pendant l'attente
+        next_page_token = data.get("next_page_token")
+        if next_page_token:
+            tasks.add(asyncio.create_task(self._follow_page(client, next_page_token, out, tasks, origin, page + 1)))
+    
+    def _accept(self, place):
+        # Filtrer les doublons et garder uniquement les catégories pertinentes
+        place_id = place.get("place_id")
+        if not place_id or place_id in self.seen_place_ids:
+            return False
+        if not set(place.get("types", [])).intersection(RESTAURANT_CATEGORIES):
+            return False
+        self.seen_place_ids.add(place_id)
+        return True
+    
+    async def _follow_page(self, client, next_page_token, out, tasks, origin=None, page=1):
+        # Inutile d'attendre l'activation du token si la page est déjà en cache
+        nearby_cache = get_nearby_cache() if origin else None
+        if not (nearby_cache is not None and nearby_cache.has(nearby_cache_key(*origin, page))):
+            await asyncio.sleep(NEXT_PAGE_TOKEN_DELAY)
+        await self._query(client, {"pagetoken": next_page_token, "key": GOOGLE_MAPS_API_KEY}, out, tasks, origin, page)
+    
+    async def stream(self, zones):
+        """
+        Générateur asynchrone des lieux trouvés dans les zones
+        
+        Args:
+            zones: Liste de zones (lat_min, lat_max, lng_min, lng_max)
+        
+        Yields:
+            Résultats bruts Nearby Search, dédupliqués par place_id
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # Le débit demandé s'applique au seau à jetons partagé de l'API Places
+        API_BUDGET.configure("places", rate=self.qps, burst=self.qps)
+        out = asyncio.Queue()
+        tasks = set()
+        
+        async def wait_all():
+            # La liste des tâches grandit avec les pages suivantes
+            while tasks:
+                pending = list(tasks)
+                await asyncio.gather(*pending, return_exceptions=True)
+                tasks.difference_update(pending)
+            await out.put(_SWEEP_DONE)
+        
+        async with httpx.AsyncClient() as client:
+            for zone in zones:
+                for lat, lng in generate_grid_points(zone, step=self.step):
+                    params = {
+                        "location": f"{lat},{lng}",
+                        "radius": self.radius,
+                        "type": self.place_type,
+                        "key": GOOGLE_MAPS_API_KEY
+                    }
+                    origin = (lat, lng, self.radius, self.place_type)
+                    tasks.add(asyncio.create_task(self._query(client, params, out, tasks, origin)))
+            
+            waiter = asyncio.create_task(wait_all())
+            try:
+                while True:
+                    place = await out.get()
+                    if place is _SWEEP_DONE:
+                        break
+                    yield place
+            finally:
+                # Arrêt anticipé (limite atteinte par l'appelant): annuler le reste
+                for task in list(tasks) + [waiter]:
+                    task.cancel()
+                await asyncio.gather(*tasks, waiter, return_exceptions=True)
+
+class AdaptiveQuadtreeSweeper(AsyncNearbySweeper):
+    """
+    Balayage adaptatif: chaque zone est interrogée en une seule requête
+    (rayon couvrant la cellule), puis découpée en 4 uniquement si la
+    réponse est saturée (page pleine de 20 résultats).
+    
+    Les zones vides (parcs, Seine...) coûtent une requête au lieu d'une
+    grille complète. L'état de chaque cellule (terminée ou découpée) et les
+    lieux trouvés sont sauvegardés dans state_file: un balayage repris
+    réutilise les cellules terminées sans refaire d'appels.
+    """
+    def __init__(self, qps=PLACES_QPS, concurrency=PLACES_CONCURRENCY, place_type="restaurant",
+                 min_cell_size=QUADTREE_MIN_CELL_SIZE, state_file=QUADTREE_STATE_FILE):
+        super().__init__(qps=qps, concurrency=concurrency, place_type=place_type)
+        self.min_cell_size = min_cell_size
+        self.state_file = state_file
+        self.places_file = self.places_file_for(state_file) if state_file else None
+        self.places = {}  # Lieux des cellules terminées (place_id -> résultat Nearby Search)
+        self._unsaved_places = []  # Lieux pas encore ajoutés à places_file
+        self._last_save = time.monotonic()
+        self._save_task = None
+        self.state = self._load_state()
+        self.cells_queried = 0
+        self.cells_split = 0
+        self.cells_resumed = 0
+        self.cells_presplit = 0
+        self.cells_skipped_covered = 0
+        self.cells_incomplete = 0
+    
+    @staticmethod
+    def places_file_for(state_file):
+        """Fichier des lieux trouvés, complété par ajouts (une ligne JSON par lieu)"""
+        return f"{os.path.splitext(state_file)[0]}.places.jsonl"
+    
+    def _load_state(self):
+        """
+        Charge la progression: l'état (statut et place_ids de chaque cellule)
+        et les lieux, écrits à part pour ne pas réécrire tous les lieux à chaque sauvegarde
+        """
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                # Ancien format: lieux dans l'état
+                self.places.update(state.pop("places", {}))
+                if self.places_file and os.path.exists(self.places_file):
+                    with open(self.places_file, "r", encoding="utf-8") as f:
+                        for line in f:
+                            line = line.strip()
+                            if line:
+                                place = json.loads(line)
+                                self.places[place["place_id"]] = place
+                print(f"♻️ Reprise du balayage: {len(state.get('cells', {}))} cellules déjà traitées")
+                return state
+            except Exception as e:
+                print(f"⚠️ État de balayage illisible ({self.state_file}), nouveau départ: {e}")
+                self.places = {}
+        return {"cells": {}}
+    
+    def _write_state(self, state_json, new_places):
+        # Les lieux d'abord: une cellule "done" de l'état ne doit référencer que des lieux déjà écrits
+        try:
+            if new_places:
+                with open(self.places_file, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(place, ensure_ascii=False) + "\n" for place in new_places)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(state_json)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            print(f"⚠️ Impossible de sauvegarder l'état du balayage: {e}")
+    
+    def _snapshot(self):
+        # Sérialisé dans la boucle d'événements: l'état n'est pas modifié pendant l'écriture
+        state_json = json.dumps(self.state, ensure_ascii=False)
+        new_places, self._unsaved_places = self._unsaved_places, []
+        self._last_save = time.monotonic()
+        return state_json, new_places
+    
+    def _schedule_save(self):
+        """Sauvegarde périodique (QUADTREE_STATE_SAVE_INTERVAL), écrite hors de la boucle d'événements"""
+        if not self.state_file or time.monotonic() - self._last_save < QUADTREE_STATE_SAVE_INTERVAL:
+            return
+        if self._save_task is not None and not self._save_task.done():
+            return
+        self._save_task = asyncio.create_task(asyncio.to_thread(self._write_state, *self._snapshot()))
+    
+    async def _flush_state(self):
+        """Dernière sauvegarde, après celle éventuellement en cours"""
+        if not self.state_file:
+            return
+        if self._save_task is not None:
+            await asyncio.gather(self._save_task, return_exceptions=True)
+        await asyncio.to_thread(self._write_state, *self._snapshot())
+    
+    @staticmethod
+    def cell_id(cell):
+        return "{lat_min:.6f},{lat_max:.6f},{lng_min:.6f},{lng_max:.6f}".format(**cell)
+    
+    @staticmethod
+    def split_cell(cell):
+        """Découpe une cellule en 4 sous-cellules"""
+        lat_mid = (cell["lat_min"] + cell["lat_max"]) / 2
+        lng_mid = (cell["lng_min"] + cell["lng_max"]) / 2
+        return [
+            {"lat_min": cell["lat_min"], "lat_max": lat_mid, "lng_min": cell["lng_min"], "lng_max": lng_mid},
+            {"lat_min": cell["lat_min"], "lat_max": lat_mid, "lng_min": lng_mid, "lng_max": cell["lng_max"]},
+            {"lat_min": lat_mid, "lat_max": cell["lat_max"], "lng_min": cell["lng_min"], "lng_max": lng_mid},
+            {"lat_min": lat_mid, "lat_max": cell["lat_max"], "lng_min": lng_mid, "lng_max": cell["lng_max"]},
+        ]
+    
+    @staticmethod
+    def cell_query(cell):
+        """
+        Centre et rayon (mètres) du cercle circonscrit à une cellule
+        """
+        lat = (cell["lat_min"] + cell["lat_max"]) / 2
+        lng = (cell["lng_min"] + cell["lng_max"]) / 2
+        half_height = (cell["lat_max"] - cell["lat_min"]) / 2 * 111320
+        half_width = (cell["lng_max"] - cell["lng_min"]) / 2 * 111320 * math.cos(math.radians(lat))
+        radius = min(50000, max(1, int(math.ceil(math.hypot(half_height, half_width)))))
+        return lat, lng, radius
+    
+    def _can_split(self, cell):
+        # Les deux côtés des sous-cellules doivent rester au-dessus du minimum
+        half_side = min(cell["lat_max"] - cell["lat_min"], cell["lng_max"] - cell["lng_min"]) / 2
+        return half_side >= self.min_cell_size
+    
+    async def _process_cell(self, client, cell, out, tasks):
+        cell_key = self.cell_id(cell)
+        cell_state = self.state["cells"].get(cell_key)
+        
+        # Cellule déjà traitée lors d'un balayage précédent
+        if cell_state and cell_state.get("status") == "split":
+            for child in self.split_cell(cell):
+                tasks.add(asyncio.create_task(self._process_cell(client, child, out, tasks)))
+            return
+        if cell_state and cell_state.get("status") == "done":
+            self.cells_resumed += 1
+            for place_id in cell_state.get("place_ids", []):
+                place = self.places.get(place_id)
+                if place and self._accept(place):
+                    await out.put(place)
+            return
+        
+        lat, lng, radius = self.cell_query(cell)
+        cache_key = nearby_cache_key(lat, lng, radius, self.place_type, 0)
+        
+        # Couverture connue (index 2dsphere de producers), sauf si la réponse est déjà en cache
+        nearby_cache = get_nearby_cache()
+        if not (nearby_cache is not None and nearby_cache.has(cache_key)):
+            known = await asyncio.to_thread(count_known_producers, cell)
+            if known is not None and known >= QUADTREE_PAGE_SIZE and self._can_split(cell):
+                # La page serait pleine: découper sans dépenser de requête
+                self.cells_presplit += 1
+                self.state["cells"][cell_key] = {"status": "split"}
+                self._schedule_save()
+                for child in self.split_cell(cell):
+                    tasks.add(asyncio.create_task(self._process_cell(client, child, out, tasks)))
+                return
+            if SKIP_COVERED_CELLS and known is not None and known >= COVERED_CELL_MIN_PRODUCERS and not self._can_split(cell):
+                # Non marquée "done": un balayage sans --skip-covered-cells l'interrogera
+                self.cells_skipped_covered += 1
+                return
+        
+        params = {
+            "location": f"{lat},{lng}",
+            "radius": radius,
+            "type": self.place_type,
+            "key": GOOGLE_MAPS_API_KEY
+        }
+        data = await self._fetch(client, params, cache_key=cache_key)
+        if data is None:
+            # Quota épuisé ou erreur réseau: la cellule sera retentée lors de la reprise
+            return
+        self.cells_queried += 1
+        if data.get("status") not in NEARBY_OK_STATUSES:
+            # OVER_QUERY_LIMIT, REQUEST_DENIED, INVALID_REQUEST...: non enregistrée, retentée à la reprise
+            self.cells_incomplete += 1
+            print(f"⚠️ Nearby Search {data.get('status')} pour la cellule {cell_key}: à retenter")
+            return
+        results = list(data.get("results", []))
+        next_page_token = data.get("next_page_token")
+        
+        # Page pleine: la cellule est saturée, on la découpe plutôt que de paginer
+        if len(results) >= QUADTREE_PAGE_SIZE and self._can_split(cell):
+            self.cells_split += 1
+            self.state["cells"][cell_key] = {"status": "split"}
+            self._schedule_save()
+            for child in self.split_cell(cell):
+                tasks.add(asyncio.create_task(self._process_cell(client, child, out, tasks)))
+            return
+        
+        # Cellule minimale saturée: récupérer les pages suivantes (jusqu'à 60 résultats)
+        page_number = 0
+        while next_page_token and not self._can_split(cell):
+            page_number += 1
+            page_key = nearby_cache_key(lat, lng, radius, self.place_type, page_number)
+            nearby_cache = get_nearby_cache()
+            if not (nearby_cache is not None and nearby_cache.has(page_key)):
+                await asyncio.sleep(NEXT_PAGE_TOKEN_DELAY)
+            page = await self._fetch(client, {"pagetoken": next_page_token, "key": GOOGLE_MAPS_API_KEY}, cache_key=page_key, priority="low")
+            if page is None or page.get("status") not in NEARBY_OK_STATUSES:
+                # Pagination interrompue (budget, réserve "low", token expiré): cellule incomplète
+                break
+            results.extend(page.get("results", []))
+            next_page_token = page.get("next_page_token")
+        
+        if next_page_token and not self._can_split(cell):
+            # Lieux déjà reçus transmis, mais la cellule n'est pas marquée terminée: retentée à la reprise
+            self.cells_incomplete += 1
+            for place in results:
+                if self._accept(place):
+                    await out.put(place)
+            return
+        
+        place_ids = []
+        for place in results:
+            place_id = place.get("place_id")
+            if not place_id:
+                continue
+            place_ids.append(place_id)
+            if place_id not in self.places:
+                self.places[place_id] = place
+                self._unsaved_places.append(place)
+        self.state["cells"][cell_key] = {"status": "done", "place_ids": place_ids}
+        self._schedule_save()
+        
+        for place in results:
+            if self._accept(place):
+                await out.put(place)
+    
+    async def stream(self, zones):
+        """
+        Générateur asynchrone des lieux trouvés, zones subdivisées à la demande
+        
+        Args:
+            zones: Liste de zones racines (lat_min, lat_max, lng_min, lng_max)
+        
+        Yields:
+            Résultats bruts Nearby Search, dédupliqués par place_id
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # Le débit demandé s'applique au seau à jetons partagé de l'API Places
+        API_BUDGET.configure("places", rate=self.qps, burst=self.qps)
+        out = asyncio.Queue()
+        tasks = set()
+        
+        async def wait_all():
+            # La liste des tâches grandit avec les subdivisions
+            while tasks:
+                pending = list(tasks)
+                await asyncio.gather(*pending, return_exceptions=True)
+                tasks.difference_update(pending)
+            await out.put(_SWEEP_DONE)
+        
+        async with httpx.AsyncClient() as client:
+            for zone in zones:
+                tasks.add(asyncio.create_task(self._process_cell(client, zone, out, tasks)))
+            
+            waiter = asyncio.create_task(wait_all())
+            try:
+                while True:
+                    place = await out.get()
+                    if place is _SWEEP_DONE:
+                        break
+                    yield place
+            finally:
+                for task in list(tasks) + [waiter]:
+                    task.cancel()
+                await asyncio.gather(*tasks, waiter, return_exceptions=True)
+                await self._flush_state()
+                # Comparaison avec la grille fixe (un appel par point, sans pagination)
+                grid_requests = sum(len(generate_grid_points(zone)) for zone in zones)
+                print(f"🌳 Balayage adaptatif: {self.cells_queried} cellules interrogées, "
+                      f"{self.cells_split} découpées, {self.cells_resumed} reprises du cache, "
+                      f"{self.cells_presplit} découpées d'après producers, {self.cells_skipped_covered} déjà couvertes, "
+                      f"{self.cells_incomplete} incomplètes à retenter "
+                      f"({self.requests_made} requêtes contre au moins {grid_requests} pour la grille fixe)")
+
+class _ScriptedQuadtreeSweeper(AdaptiveQuadtreeSweeper):
+    """Balayage adaptatif dont les réponses Nearby Search sont fournies d'avance (sans réseau)"""
+    def __init__(self, responses, **kwargs):
+        super().__init__(**kwargs)
+        self.responses = list(responses)
+    
+    async def _fetch(self, client, params, cache_key=None, priority="normal"):
+        # None: requête refusée (quota, réserve "low") ou erreur réseau
+        return self.responses.pop(0) if self.responses else None
+
+def check_quadtree_resume_rules():
+    """
+    Vérifie qu'une cellule n'est marquée "done" que si toutes ses pages sont complètes
+    
+    Scénarios joués sur une cellule minimale (non découpable), sans réseau ni
+    MongoDB: statut d'erreur, pagination interrompue (refus de budget, token
+    expiré) et pagination complète.
+    
+    Returns:
+        True si tous les scénarios sont conformes
+    """
+    global NEXT_PAGE_TOKEN_DELAY, USE_GEO_COVERAGE, USE_NEARBY_CACHE
+    full_page = {"status": "OK", "next_page_token": "token",
+                 "results": [{"place_id": f"p{i}", "types": ["restaurant"]} for i in range(QUADTREE_PAGE_SIZE)]}
+    last_page = {"status": "OK", "results": [{"place_id": "last", "types": ["restaurant"]}]}
+    scenarios = [
+        ("OVER_QUERY_LIMIT", [{"status": "OVER_QUERY_LIMIT", "results": []}], None),
+        ("REQUEST_DENIED", [{"status": "REQUEST_DENIED", "results": []}], None),
+        ("pagination refusée (budget)", [full_page], None),
+        ("token expiré (INVALID_REQUEST)", [full_page, {"status": "INVALID_REQUEST", "results": []}], None),
+        ("ZERO_RESULTS", [{"status": "ZERO_RESULTS", "results": []}], 0),
+        ("pagination complète", [full_page, last_page], QUADTREE_PAGE_SIZE + 1),
+    ]
+    # Cellule plus petite que le minimum: la pagination est suivie au lieu de découper
+    cell = {"lat_min": 48.85, "lat_max": 48.851, "lng_min": 2.35, "lng_max": 2.351}
+    saved = (NEXT_PAGE_TOKEN_DELAY, USE_GEO_COVERAGE, USE_NEARBY_CACHE)
+    NEXT_PAGE_TOKEN_DELAY, USE_GEO_COVERAGE, USE_NEARBY_CACHE = 0, False, False
+    work_dir = tempfile.mkdtemp(prefix="quadtree_check_")
+    passed = 0
+    try:
+        for name, responses, expected_places in scenarios:
+            state_file = os.path.join(work_dir, f"state_{passed}_{len(responses)}.json")
+            sweeper = _ScriptedQuadtreeSweeper(responses, state_file=state_file)
+            
+            async def run():
+                out, tasks = asyncio.Queue(), set()
+                await sweeper._process_cell(None, cell, out, tasks)
+                await sweeper._flush_state()
+            
+            asyncio.run(run())
+            with open(state_file, "r", encoding="utf-8") as f:
+                cell_state = json.load(f)["cells"].get(sweeper.cell_id(cell))
+            if expected_places is None:
+                ok = cell_state is None
+                detail = "non enregistrée" if ok else f"enregistrée {cell_state}"
+            else:
+                ok = cell_state is not None and cell_state.get("status") == "done" and len(cell_state["place_ids"]) == expected_places
+                detail = f"done, {expected_places} lieux" if ok else f"état inattendu {cell_state}"
+            passed += ok
+            print(f"{'✅' if ok else '❌'} {name:<32} {detail}")
+    finally:
+        NEXT_PAGE_TOKEN_DELAY, USE_GEO_COVERAGE, USE_NEARBY_CACHE = saved
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"{passed}/{len(scenarios)} scénarios conformes")
+    return passed == len(scenarios)
+
+def sweep_restaurants_async(zones, max_places=None, qps=None, concurrency=None, on_place=None):
     """
-    Récupère tous les restaurants dans une zone définie en utilisant Google Maps Nearby Search API
+    Récupère les restaurants de plusieurs zones avec le balayage concurrent
     
     Args:
-        zone: Dictionnaire définissant les limites de la zone (lat_min, lat_max, lng_min, lng_max)
+        zones: Liste de zones à balayer
+        max_places: Nombre maximum de lieux à récupérer (None = pas de limite)
+        qps: Débit maximum de requêtes (défaut: PLACES_QPS)
+        concurrency: Requêtes simultanées (défaut: PLACES_CONCURRENCY)
+        on_place: Fonction appelée pour chaque lieu dès son arrivée (optionnelle),
+                  exécutée hors de la boucle d'événements: elle peut bloquer (file pleine)
+                  sans suspendre les requêtes en cours ni la pagination
     
     Returns:
-        Liste de restaurants avec leurs informations de base
+        Liste des résultats bruts Nearby Search, dédupliqués par place_id
     """
-    global MAPS_API_REQUEST_COUNT
-    
-    # Vérifier si on a atteint la limite quotidienne
-    if MAPS_API_REQUEST_COUNT >= MAX_MAPS_API_REQUESTS:
-        print("⚠️ Limite quotidienne de l'API Google Maps atteinte (500 requêtes)")
-        return []
-    
-    lat_min, lat_max = zone["lat_min"], zone["lat_max"]
-    lng_min, lng_max = zone["lng_min"], zone["lng_max"]
-    
-    # Étape de la grille (en degrés) pour un espacement d'environ 500 m
-    step = 0.005  # Environ 500 mètres
-    
-    # Points latitudes et longitudes
-    lat_points = [lat_min + i * step for i in range(int((lat_max - lat_min) / step) + 1)]
-    lng_points = [lng_min + i * step for i in range(int((lng_max - lng_min) / step) + 1)]
-    
-    all_restaurants = []  # Liste pour stocker tous les résultats
-    
-    # Parcourir chaque point de la grille
-    for lat in lat_points:
-        for lng in lng_points:
-            # Vérifier si on a atteint la limite
-            if MAPS_API_REQUEST_COUNT >= MAX_MAPS_API_REQUESTS:
-                print("⚠️ Limite quotidienne de l'API Google Maps atteinte pendant le traitement")
+    if DISCOVERY_STRATEGY == "quadtree":
+        sweeper = AdaptiveQuadtreeSweeper(
+            qps=qps or PLACES_QPS,
+            concurrency=concurrency or PLACES_CONCURRENCY,
+            min_cell_size=QUADTREE_MIN_CELL_SIZE,
+            state_file=QUADTREE_STATE_FILE
+        )
+    else:
+        sweeper = AsyncNearbySweeper(qps=qps or PLACES_QPS, concurrency=concurrency or PLACES_CONCURRENCY)
+    
+    async def run():
+        places = []
+        async for place in sweeper.stream(zones):
+            places.append(place)
+            if on_place:
+                await asyncio.to_thread(on_place, place)
+            if max_places and len(places) >= max_places:
                 break
-                
-            url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={lat},{lng}&radius=200&type=restaurant&key={GOOGLE_MAPS_API_KEY}"
-            MAPS_API_REQUEST_COUNT += 1
-            
-            try:
-                response = requests.get(url)
-                data = response.json()
-                
-                # Vérifiez si des résultats sont retournés
-                if 'results' in data:
-                    # Filtrer les lieux pour inclure uniquement les catégories pertinentes
-                    filtered_places = [
-                        place for place in data['results']
-                        if set(place.get("types", [])).intersection(RESTAURANT_CATEGORIES)
-                    ]
-                    all_restaurants.extend(filtered_places)
-                
-                # Récupérer le token pour la page suivante, s'il existe
-                next_page_token = data.get("next_page_token")
-                if next_page_token and MAPS_API_REQUEST_COUNT < MAX_MAPS_API_REQUESTS:
-                    # Pause pour attendre que la page suivante soit prête
-                    time.sleep(2)
-                    url = f"https://maps.googleapis.com/maps/api/place/nearbysearch/json?pagetoken={next_page_token}&key={GOOGLE_MAPS_API_KEY}"
-                    MAPS_API_REQUEST_COUNT += 1
-                    
-                    response = requests.get(url)
-                    data = response.json()
-                    
-                    if 'results' in data:
-                        filtered_places = [
-                            place for place in data['results']
-                            if set(place.get("types", [])).intersection(RESTAURANT_CATEGORIES)
-                        ]
-                        all_restaurants.extend(filtered_places)
-            except Exception as e:
-                print(f"❌ Erreur Google Maps API: {e}")
-    
-    # Supprimer les doublons en utilisant place_id comme clé unique
-    unique_restaurants = {}
-    for restaurant in all_restaurants:
-        place_id = restaurant.get("place_id")
-        if place_id and place_id not in unique_restaurants:
-            unique_restaurants[place_id] = restaurant
+        return places
     
-    restaurants_list = list(unique_restaurants.values())
-    print(f"✅ {len(restaurants_list)} restaurants récupérés via Google Maps API dans la zone")
-    return restaurants_list
+    start_time = time.time()
+    places = asyncio.run(run())
+    print(f"✅ {len(places)} restaurants récupérés via Google Maps API en {time.time() - start_time:.1f}s "
+          f"({sweeper.requests_made} requêtes, {sweeper.cache_hits} réponses en cache)")
+    if not sweeper._budget_left():
+        print("⚠️ Limite quotidienne de l'API Google Maps atteinte pendant le balayage")
+    return places
 
 def convert_nearby_to_restaurant(place):
     """
@@ -352,6 +2003,16 @@ def get_all_paris_restaurants(max_zones=None):
         zones = zones[:max_zones]
         print(f"ℹ️ Traitement limité à {max_zones} zones sur {len(zones)} disponibles")
     
+    if USE_ASYNC_DISCOVERY:
+        # Balayage concurrent de toutes les zones, borné par le débit et le quota
+        print(f"📍 Balayage concurrent de {len(zones)} zones")
+        zone_restaurants = sweep_restaurants_async(zones)
+        formatted_restaurants = [convert_nearby_to_restaurant(place) for place in zone_restaurants]
+        all_restaurants = [r for r in formatted_restaurants if is_valid_restaurant(r)]
+        print(f"📊 Total: {len(all_restaurants)} restaurants uniques récupérés via Google Maps API")
+        print(f"📊 Requêtes Google Maps API utilisées: {API_BUDGET.spent('places')}/{MAX_MAPS_API_REQUESTS}")
+        return all_restaurants
+    
     for i, zone in enumerate(zones):
         print(f"📍 Traitement de la zone {i+1}/{len(zones)}")
         zone_restaurants = get_restaurants_in_zone(zone)
@@ -365,14 +2026,14 @@ def get_all_paris_restaurants(max_zones=None):
         all_restaurants.extend(valid_restaurants)
         
         # Vérifier si on a atteint la limite quotidienne
-        if MAPS_API_REQUEST_COUNT >= MAX_MAPS_API_REQUESTS:
+        if not API_BUDGET.has_budget("places"):
             print("⚠️ Limite quotidienne de l'API Google Maps atteinte, arrêt du traitement de zones")
             break
         
         time.sleep(2)  # Pause pour éviter de surcharger l'API
     
     print(f"📊 Total: {len(all_restaurants)} restaurants uniques récupérés via Google Maps API")
-    print(f"📊 Requêtes Google Maps API utilisées: {MAPS_API_REQUEST_COUNT}/{MAX_MAPS_API_REQUESTS}")
+    print(f"📊 Requêtes Google Maps API utilisées: {API_BUDGET.spent('places')}/{MAX_MAPS_API_REQUESTS}")
     
     return all_restaurants
 
@@ -381,14 +2042,10 @@ def is_restaurant_in_mongodb(name, maps_url=None, place_id=None):
     Vérifie si un restaurant existe déjà dans MongoDB
     """
     try:
-        client = get_mongo_client()
-        if not client:
+        collection = get_producers_collection()
+        if collection is None:
             print("❌ Impossible de se connecter à MongoDB")
             return False
-            
-        # Utiliser la bonne base de données
-        db = client[DB_NAME]
-        collection = db[COLLECTION_NAME]
         
         print(f"🔍 Vérification dans MongoDB pour: {name}")
         print(f"  Base de données: {DB_NAME}")
@@ -411,8 +2068,6 @@ def is_restaurant_in_mongodb(name, maps_url=None, place_id=None):
             print(f"  ✅ Restaurant trouvé dans MongoDB (ID: {exists.get('_id')})")
         else:
             print(f"  ❌ Restaurant non trouvé dans MongoDB")
-            
-        client.close()
         
         return exists is not None
     except Exception as e:
@@ -420,34 +2075,228 @@ def is_restaurant_in_mongodb(name, maps_url=None, place_id=None):
         traceback.print_exc()
         return False
 
-def convert_to_12h_format(time_str):
-    """Convertit une heure au format 24h en format 12h AM/PM"""
+# Index MongoDB déjà vérifiés pendant cette exécution
+_PRODUCERS_INDEXES_READY = False
+_PRODUCERS_INDEXES_LOCK = threading.Lock()
+_PRODUCERS_GEO_INDEX_READY = False
+
+def ensure_producers_indexes():
+    """
+    Crée (si nécessaire) les index utilisés par les vérifications d'existence
+    
+    Returns:
+        True si les index sont disponibles, False sinon
+    """
+    global _PRODUCERS_INDEXES_READY, _PRODUCERS_GEO_INDEX_READY
+    
+    if _PRODUCERS_INDEXES_READY:
+        return True
+    
+    with _PRODUCERS_INDEXES_LOCK:
+        if _PRODUCERS_INDEXES_READY:
+            return True
+        
+        collection = get_producers_collection()
+        if collection is None:
+            return False
+        
+        try:
+            # create_index est idempotent: sans effet si l'index existe déjà
+            collection.create_index([("place_id", ASCENDING)])
+            collection.create_index([("name", ASCENDING)])
+            collection.create_index([("maps_url", ASCENDING)])
+            _PRODUCERS_INDEXES_READY = True
+            if DEBUG_MODE:
+                print("✅ Index MongoDB place_id/name/maps_url vérifiés")
+        except Exception as e:
+            print(f"⚠️ Impossible de créer les index MongoDB: {str(e)}")
+        
+        # Index 2dsphere séparé: des coordonnées invalides ne doivent pas bloquer les autres index
+        _PRODUCERS_GEO_INDEX_READY = geo_queries.ensure_geo_index(collection, "gps_coordinates")
+        
+        return _PRODUCERS_INDEXES_READY
+
+def count_known_producers(cell):
+    """
+    Nombre de restaurants déjà présents dans producers pour une cellule du balayage
+    
+    Args:
+        cell: Cellule {lat_min, lat_max, lng_min, lng_max}
+    
+    Returns:
+        Nombre de restaurants, ou None si l'information n'est pas disponible
+        (option désactivée, MongoDB injoignable ou index 2dsphere absent)
+    """
+    if not USE_GEO_COVERAGE or not ensure_producers_indexes() or not _PRODUCERS_GEO_INDEX_READY:
+        return None
+    collection = get_producers_collection()
+    if collection is None:
+        return None
     try:
-        # Nettoyer l'entrée
-        time_str = time_str.strip().replace("h", ":").replace("H", ":")
-        if ":" not in time_str:
-            time_str = time_str.zfill(4)
-            time_str = f"{time_str[:2]}:{time_str[2:]}"
-        
-        # Parsing de l'heure
-        hour = int(time_str.split(":")[0])
-        minute = int(time_str.split(":")[1]) if ":" in time_str else 0
-        
-        # Conversion en format 12h
-        if hour == 0:
-            return f"12:{minute:02d} AM"
-        elif hour < 12:
-            return f"{hour}:{minute:02d} AM"
-        elif hour == 12:
-            return f"12:{minute:02d} PM"
+        return geo_queries.count_within_box(collection, cell["lat_min"], cell["lat_max"],
+                                            cell["lng_min"], cell["lng_max"], field="gps_coordinates")
+    except Exception as e:
+        print(f"⚠️ Couverture géographique indisponible: {str(e)}")
+        return None
+
+DEDUP_INDEX = None
+DEDUP_INDEX_LOCK = threading.Lock()
+
+def get_dedup_index():
+    """
+    Index de déduplication des restaurants, chargé depuis MongoDB à la première demande
+    
+    Returns:
+        Instance de restaurant_dedup.DedupIndex ou None (désactivé ou MongoDB injoignable)
+    """
+    global DEDUP_INDEX
+    if not USE_DEDUP_INDEX:
+        return None
+    with DEDUP_INDEX_LOCK:
+        if DEDUP_INDEX is None:
+            collection = get_producers_collection()
+            if collection is None:
+                return None
+            start_time = time.time()
+            try:
+                DEDUP_INDEX = restaurant_dedup.DedupIndex.from_collection(collection)
+                print(f"✅ Index de déduplication: {len(DEDUP_INDEX)} restaurants ({time.time() - start_time:.1f}s)")
+            except Exception as e:
+                print(f"⚠️ Index de déduplication indisponible: {str(e)}")
+                return None
+        return DEDUP_INDEX
+
+def resolve_duplicate_restaurant(restaurant):
+    """
+    Identifiant du document existant qui désigne le même restaurant
+    
+    Args:
+        restaurant: Restaurant du pipeline (lat/lon ou latitude/longitude) ou document normalisé
+    
+    Returns:
+        _id du document existant, ou None si le restaurant est nouveau
+    """
+    index = get_dedup_index()
+    if index is None:
+        return None
+    lat, lon = restaurant_dedup.doc_coordinates(restaurant)
+    return index.resolve(restaurant.get("name"), lat, lon, restaurant.get("address"),
+                         doc_id=restaurant.get("_id") or restaurant.get("place_id"))
+
+def _chunks(items, size):
+    """Découpe une liste en sous-listes de taille maximale size"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def fetch_existing_restaurant_keys(restaurants, batch_size=EXISTENCE_CHECK_BATCH_SIZE):
+    """
+    Récupère en quelques requêtes $in les clés des restaurants déjà en base
+    
+    Args:
+        restaurants: Liste de restaurants candidats
+        batch_size: Nombre maximum de valeurs par requête $in
+    
+    Returns:
+        Dictionnaire de sets: "place_id" -> {(name, place_id)},
+        "maps_url" -> {(name, maps_url)}, "name" -> {name}
+        ou None si MongoDB est indisponible
+    """
+    collection = get_producers_collection()
+    if collection is None:
+        return None
+    
+    ensure_producers_indexes()
+    
+    place_ids = set()
+    names = set()
+    for restaurant in restaurants:
+        place_id = restaurant.get("place_id")
+        if place_id:
+            place_ids.add(place_id)
         else:
-            return f"{hour-12}:{minute:02d} PM"
-    except:
-        return time_str
+            # Sans place_id, la vérification se fait sur le nom (et maps_url)
+            names.add(restaurant.get("name", ""))
+    
+    known = {"place_id": set(), "maps_url": set(), "name": set()}
+    projection = {"_id": 0, "name": 1, "place_id": 1, "maps_url": 1}
+    
+    for field, values in [("place_id", sorted(place_ids)), ("name", sorted(names))]:
+        for chunk in _chunks(values, batch_size):
+            for doc in collection.find({field: {"$in": chunk}}, projection):
+                name = doc.get("name")
+                if doc.get("place_id"):
+                    known["place_id"].add((name, doc["place_id"]))
+                if doc.get("maps_url"):
+                    known["maps_url"].add((name, doc["maps_url"]))
+                known["name"].add(name)
+    
+    return known
 
-def extract_opening_hours_thefork(soup):
+def filter_existing_restaurants(restaurants, batch_size=EXISTENCE_CHECK_BATCH_SIZE):
     """
-    Extrait les horaires depuis TheFork avec le nouveau format
+    Retire de la liste les restaurants déjà présents dans MongoDB
+    
+    Même règle que is_restaurant_in_mongodb (nom + place_id, sinon nom + maps_url,
+    sinon nom seul), mais en filtrant en mémoire après une récupération groupée.
+    
+    Args:
+        restaurants: Liste de restaurants candidats
+        batch_size: Nombre maximum de valeurs par requête $in
+    
+    Returns:
+        Liste des restaurants absents de MongoDB
+    """
+    if not restaurants:
+        return []
+    
+    start_time = time.time()
+    try:
+        known = fetch_existing_restaurant_keys(restaurants, batch_size=batch_size)
+    except Exception as e:
+        print(f"❌ Erreur lors de la vérification groupée MongoDB: {str(e)}")
+        traceback.print_exc()
+        known = None
+    
+    if known is None:
+        # Même comportement que is_restaurant_in_mongodb en cas d'erreur: rien n'est ignoré
+        print("⚠️ Vérification groupée impossible, aucun restaurant ignoré")
+        return list(restaurants)
+    
+    remaining = []
+    for restaurant in restaurants:
+        name = restaurant.get("name", "")
+        place_id = restaurant.get("place_id")
+        maps_url = restaurant.get("maps_url")
+        
+        if place_id:
+            exists = (name, place_id) in known["place_id"]
+        elif maps_url:
+            exists = (name, maps_url) in known["maps_url"]
+        else:
+            exists = name in known["name"]
+        
+        # Même restaurant déjà en base sous un autre identifiant (custom_, nom différent)
+        if not exists and resolve_duplicate_restaurant(restaurant) is not None:
+            METRICS.incr("dedup_matches", where="discovery")
+            exists = True
+        
+        if not exists:
+            remaining.append(restaurant)
+    
+    if DEBUG_MODE:
+        print(f"⏱️ Vérification groupée de {len(restaurants)} restaurants: {time.time() - start_time:.2f} secondes")
+    
+    return remaining
+
+def thefork_hours_lines(soup):
+    """
+    Lignes d'horaires TheFork ("Mercredi : 12:00 - 14:30 / 19:00 - 22:30")
+    
+    Args:
+        soup: BeautifulSoup object de la page TheFork
+    
+    Returns:
+        Liste des lignes, une par jour affiché
     """
     horaires = []
     
@@ -469,56 +2318,27 @@ def extract_opening_hours_thefork(soup):
                  for j in ["aujourd'hui", "today"])]
         
         if heures:
-            # Nettoyer et formater les heures
-            clean_hours = []
-            for h in heures:
-                if "-" in h:
-                    clean_hours.append(h)
-            if clean_hours:
-                horaires.append(f"{jour_fr} : {' / '.join(clean_hours)}")
+            horaires.append(f"{jour_fr} : {' / '.join(heures)}")
     
-    return format_opening_hours(horaires)
+    return horaires
+
+def extract_opening_hours_thefork(soup):
+    """
+    Extrait les horaires depuis TheFork avec le nouveau format
+    """
+    return format_opening_hours(thefork_hours_lines(soup))
 
 def extract_opening_hours_tripadvisor(soup):
     """
     Extrait les horaires depuis TripAdvisor avec le nouveau format
     """
-    horaires = []
-    days_order = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
-    
     # Chercher les horaires dans différents formats possibles
     hours_div = soup.find("div", class_=lambda x: x and "hours" in x.lower())
     if not hours_div:
-        return format_opening_hours([])  # Retourner format standard si pas trouvé
-    
-    # Extraire le texte et nettoyer
-    hours_text = hours_div.get_text(" ", strip=True)
-    
-    # Parser chaque jour
-    current_day = None
-    for line in hours_text.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Détecter le jour
-        for day in days_order:
-            if line.lower().startswith(day.lower()):
-                current_day = day
-                # Extraire les heures
-                hours_part = line[len(day):].strip(" :")
-                if hours_part:
-                    horaires.append(f"{current_day} : {hours_part}")
-                break
-    
-    # Trier les jours dans l'ordre
-    sorted_hours = []
-    for day in days_order:
-        matching_hours = [h for h in horaires if h.startswith(day)]
-        if matching_hours:
-            sorted_hours.append(matching_hours[0])
+        return []
     
-    return format_opening_hours(sorted_hours)
+    # Une ligne par élément: jours et plages ("Lun - Ven", "12:00 - 14:30") sont associés par le parser
+    return format_opening_hours(hours_div.get_text("\n", strip=True))
 
 def extract_images_and_menus(soup):
     """
@@ -576,7 +2396,7 @@ def extract_platform_data(url, platform, name=None):
         return {}
     
     # Parser le HTML
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = html_parsing.make_soup(html)
     
     # Extraire les données selon la plateforme
     data = {}
@@ -606,59 +2426,9 @@ def extract_opening_hours_structured(soup):
     
     Returns:
         Liste des horaires au format MongoDB ["Monday: 9:00 AM – 11:00 PM", etc.]
+        (jours absents de la page: "Not specified"), vide si aucun horaire n'est trouvé
     """
-    # Ordre standard des jours pour MongoDB
-    days_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
-    # Mapping français -> anglais
-    fr_to_en = {
-        "lundi": "Monday",
-        "mardi": "Tuesday", 
-        "mercredi": "Wednesday",
-        "jeudi": "Thursday", 
-        "vendredi": "Friday",
-        "samedi": "Saturday",
-        "dimanche": "Sunday"
-    }
-    
-    # Initialiser les horaires par défaut
-    formatted_hours = {day: f"{day}: Not specified" for day in days_order}
-    
-    # Extraire les horaires depuis les balises data-testid
-    for tag in soup.select('div[data-testid^="interval-line-"]'):
-        # Exemple : "interval-line-wednesday" -> "wednesday"
-        testid = tag.get("data-testid")
-        jour = testid.replace("interval-line-", "")
-        
-        # Extraire les heures en ignorant les mentions "aujourd'hui"
-        heures = []
-        for div in tag.find_all("div"):
-            text = div.get_text(strip=True)
-            if text and not any(x in text.lower() for x in ["aujourd'hui", "today"]):
-                # Nettoyer et formater l'heure
-                if "-" in text:
-                    try:
-                        start, end = text.split("-")
-                        # Convertir en format 12h
-                        start_time = convert_to_12h_format(start.strip())
-                        end_time = convert_to_12h_format(end.strip())
-                        heures.append(f"{start_time} – {end_time}")
-                    except:
-                        continue
-        
-        if heures:
-            # Convertir le jour en anglais
-            en_day = None
-            for fr_day, en_day_name in fr_to_en.items():
-                if fr_day in jour.lower():
-                    en_day = en_day_name
-                    break
-            
-            if en_day:
-                formatted_hours[en_day] = f"{en_day}: {' / '.join(heures)}"
-    
-    # Retourner les horaires dans l'ordre standard
-    return [formatted_hours[day] for day in days_order]
+    return parse_opening_hours_text(thefork_hours_lines(soup))
 
 def extract_thefork_data(lafourchette_url, restaurant_name=None):
     """
@@ -692,8 +2462,8 @@ def extract_thefork_data(lafourchette_url, restaurant_name=None):
             print(f"{log_prefix}❌ Erreur lors de l'extraction des données LaFourchette: Pas de HTML récupéré")
             return {}
         
-        # Parser le HTML avec BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        # Parser le HTML (backend rapide, scripts et styles ignorés)
+        soup = html_parsing.make_soup(html)
         
         # Initialiser le dictionnaire de résultats
         result = {
@@ -709,32 +2479,7 @@ def extract_thefork_data(lafourchette_url, restaurant_name=None):
         # Extraire les horaires d'ouverture (plusieurs méthodes possibles)
         hours_container = soup.find('div', class_=lambda c: c and ('timeslots' in c.lower() or 'hours' in c.lower() or 'horaires' in c.lower()))
         if hours_container:
-            days_fr = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
-            days_en = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            all_days = days_fr + days_en
-            
-            formatted_hours = []
-            day_elements = hours_container.find_all(['div', 'p', 'li', 'span'], text=lambda t: t and any(day.lower() in t.lower() for day in all_days))
-            
-            if day_elements:
-                for day_el in day_elements:
-                    day_text = day_el.get_text(strip=True)
-                    if day_text and any(day.lower() in day_text.lower() for day in all_days):
-                        formatted_hours.append(day_text)
-            
-            if not formatted_hours:
-                # Méthode alternative: extraire tout le texte des horaires
-                hours_text = hours_container.get_text(strip=True)
-                if hours_text:
-                    # Diviser par des séparateurs communs
-                    for separator in [',', '.', ';', '\n']:
-                        if separator in hours_text:
-                            formatted_hours = [part.strip() for part in hours_text.split(separator) if part.strip()]
-                            break
-                    
-                    if not formatted_hours:
-                        formatted_hours = [hours_text]
-            
+            formatted_hours = parse_opening_hours_text(hours_container.get_text("\n", strip=True))
             result["opening_hours"] = formatted_hours
             print(f"{log_prefix}✅ Horaires extraits: {len(formatted_hours)} entrées")
         
@@ -865,7 +2610,8 @@ def extract_tripadvisor_data(tripadvisor_url, restaurant_name=None):
             print(f"{log_prefix}❌ Erreur lors de l'extraction des données TripAdvisor: Pas de HTML récupéré")
             return {}
             
-        soup = BeautifulSoup(html, 'html.parser')
+        # Parser le HTML (backend rapide, scripts et styles ignorés)
+        soup = html_parsing.make_soup(html)
         
         result = {
             "photos": [],
@@ -925,6 +2671,98 @@ def extract_tripadvisor_data(tripadvisor_url, restaurant_name=None):
         traceback.print_exc()
         return {}
 
+def merge_platform_data(structured_data, thefork_data, tripadvisor_data):
+    """
+    Fusionne les données de TheFork et TripAdvisor dans les données du restaurant
+    
+    Args:
+        structured_data: Données existantes du restaurant
+        thefork_data: Données extraites de LaFourchette ({} si absentes)
+        tripadvisor_data: Données extraites de TripAdvisor ({} si absentes)
+    
+    Returns:
+        Copie des données complétée (priorité: TheFork, puis TripAdvisor).
+        Les champs déjà renseignés (Google Maps, OCR) ne sont pas remplacés.
+    """
+    merged_data = structured_data.copy()
+    
+    # Compléter les horaires si absents (priorité: TheFork, puis TripAdvisor)
+    if not merged_data.get('opening_hours'):
+        if thefork_data.get('opening_hours'):
+            merged_data['opening_hours'] = thefork_data['opening_hours']
+            print(f"✅ Horaires extraits de LaFourchette: {len(thefork_data['opening_hours'])} entrées")
+        elif tripadvisor_data.get('opening_hours'):
+            merged_data['opening_hours'] = tripadvisor_data['opening_hours']
+            print(f"✅ Horaires extraits de TripAdvisor: {len(tripadvisor_data['opening_hours'])} entrées")
+    
+    # Compléter le téléphone si absent
+    if not merged_data.get('phone_number'):
+        if thefork_data.get('phone_number'):
+            merged_data['phone_number'] = thefork_data['phone_number']
+            print(f"✅ Téléphone extrait de LaFourchette: {thefork_data['phone_number']}")
+        elif tripadvisor_data.get('phone_number'):
+            merged_data['phone_number'] = tripadvisor_data['phone_number']
+            print(f"✅ Téléphone extrait de TripAdvisor: {tripadvisor_data['phone_number']}")
+        if merged_data.get('phone_number') and not merged_data.get('international_phone_number'):
+            merged_data['international_phone_number'] = merged_data['phone_number']
+    
+    # Compléter le site web si absent
+    if not merged_data.get('website'):
+        if thefork_data.get('website'):
+            merged_data['website'] = thefork_data['website']
+            print(f"✅ Site web extrait de LaFourchette: {thefork_data['website']}")
+        elif tripadvisor_data.get('website'):
+            merged_data['website'] = tripadvisor_data['website']
+            print(f"✅ Site web extrait de TripAdvisor: {tripadvisor_data['website']}")
+    
+    # Mettre à jour la note si non définie
+    if merged_data.get('rating', 0) == 0:
+        if thefork_data.get('rating', 0) > 0:
+            merged_data['rating'] = thefork_data['rating']
+            print(f"✅ Note extraite de LaFourchette: {thefork_data['rating']}")
+        elif tripadvisor_data.get('rating', 0) > 0:
+            merged_data['rating'] = tripadvisor_data['rating']
+            print(f"✅ Note extraite de TripAdvisor: {tripadvisor_data['rating']}")
+    
+    # Mettre à jour le niveau de prix si non défini
+    if not merged_data.get('price_level') and thefork_data.get('price_level'):
+        merged_data['price_level'] = thefork_data['price_level']
+        print(f"✅ Niveau de prix extrait de LaFourchette: {thefork_data['price_level']}")
+    
+    # Mettre à jour la description si non définie
+    if not merged_data.get('description') and thefork_data.get('description'):
+        merged_data['description'] = thefork_data['description']
+        print(f"✅ Description extraite de LaFourchette: {len(thefork_data['description'])} caractères")
+    
+    # Compléter les photos (celles déjà présentes restent en tête)
+    photos = []
+    
+    # D'abord les photos de TheFork
+    if thefork_data.get('photos'):
+        photos.extend(thefork_data['photos'])
+        print(f"✅ Photos extraites de LaFourchette: {len(thefork_data['photos'])}")
+    
+    # Ensuite les photos de TripAdvisor
+    if tripadvisor_data.get('photos'):
+        photos.extend(tripadvisor_data['photos'])
+        print(f"✅ Photos extraites de TripAdvisor: {len(tripadvisor_data['photos'])}")
+    
+    # Mise à jour des photos seulement si nous en avons trouvé
+    if photos:
+        existing = list(merged_data.get('photos') or [])
+        if merged_data.get('photo') and not existing:
+            existing = [merged_data['photo']]
+        # Supprimer les doublons et limiter le nombre total de photos
+        merged_data['photos'] = list(dict.fromkeys(existing + photos))[:10]
+        
+        # Utiliser la première photo comme photo principale si elle n'existe pas
+        if not merged_data.get('photo'):
+            merged_data['photo'] = merged_data['photos'][0]
+        
+        print(f"✅ Total de photos après fusion: {len(merged_data.get('photos', []))}")
+    
+    return merged_data
+
 @timing_decorator
 def enrich_with_platforms(structured_data, name, address):
     """
@@ -967,82 +2805,7 @@ def enrich_with_platforms(structured_data, name, address):
             tripadvisor_data = extract_tripadvisor_data(tripadvisor_url, restaurant_name=name)
         
         # Fusionner les données
-        merged_data = structured_data.copy()
-        
-        # Mettre à jour les horaires (priorité: TheFork, puis TripAdvisor)
-        if thefork_data.get('opening_hours'):
-            merged_data['opening_hours'] = thefork_data['opening_hours']
-            print(f"✅ Horaires extraits de LaFourchette: {len(thefork_data['opening_hours'])} entrées")
-        elif tripadvisor_data.get('opening_hours'):
-            merged_data['opening_hours'] = tripadvisor_data['opening_hours']
-            print(f"✅ Horaires extraits de TripAdvisor: {len(tripadvisor_data['opening_hours'])} entrées")
-        
-        # Mettre à jour le téléphone
-        if thefork_data.get('phone_number'):
-            merged_data['phone_number'] = thefork_data['phone_number']
-            merged_data['international_phone_number'] = thefork_data['phone_number']
-            print(f"✅ Téléphone extrait de LaFourchette: {thefork_data['phone_number']}")
-        elif tripadvisor_data.get('phone_number'):
-            merged_data['phone_number'] = tripadvisor_data['phone_number']
-            merged_data['international_phone_number'] = tripadvisor_data['phone_number']
-            print(f"✅ Téléphone extrait de TripAdvisor: {tripadvisor_data['phone_number']}")
-        
-        # Mettre à jour le site web
-        if thefork_data.get('website'):
-            merged_data['website'] = thefork_data['website']
-            print(f"✅ Site web extrait de LaFourchette: {thefork_data['website']}")
-        elif tripadvisor_data.get('website'):
-            merged_data['website'] = tripadvisor_data['website']
-            print(f"✅ Site web extrait de TripAdvisor: {tripadvisor_data['website']}")
-        
-        # Mettre à jour la note si non définie
-        if merged_data.get('rating', 0) == 0:
-            if thefork_data.get('rating', 0) > 0:
-                merged_data['rating'] = thefork_data['rating']
-                print(f"✅ Note extraite de LaFourchette: {thefork_data['rating']}")
-            elif tripadvisor_data.get('rating', 0) > 0:
-                merged_data['rating'] = tripadvisor_data['rating']
-                print(f"✅ Note extraite de TripAdvisor: {tripadvisor_data['rating']}")
-        
-        # Mettre à jour le niveau de prix si non défini
-        if not merged_data.get('price_level') and thefork_data.get('price_level'):
-            merged_data['price_level'] = thefork_data['price_level']
-            print(f"✅ Niveau de prix extrait de LaFourchette: {thefork_data['price_level']}")
-        
-        # Mettre à jour la description si non définie
-        if not merged_data.get('description') and thefork_data.get('description'):
-            merged_data['description'] = thefork_data['description']
-            print(f"✅ Description extraite de LaFourchette: {len(thefork_data['description'])} caractères")
-        
-        # Mettre à jour les photos (priorité aux photos de TheFork et TripAdvisor)
-        photos = []
-        
-        # D'abord les photos de TheFork
-        if thefork_data.get('photos'):
-            photos.extend(thefork_data['photos'])
-            print(f"✅ Photos extraites de LaFourchette: {len(thefork_data['photos'])}")
-        
-        # Ensuite les photos de TripAdvisor
-        if tripadvisor_data.get('photos'):
-            photos.extend(tripadvisor_data['photos'])
-            print(f"✅ Photos extraites de TripAdvisor: {len(tripadvisor_data['photos'])}")
-        
-        # Supprimer les doublons et limiter le nombre total de photos
-        photos = list(dict.fromkeys(photos))[:10]
-        
-        # Mise à jour des photos seulement si nous en avons trouvé
-        if photos:
-            # Si nous avons une photo principale mais pas de photos
-            if merged_data.get('photo') and not merged_data.get('photos'):
-                merged_data['photos'] = [merged_data['photo']] + photos
-            else:
-                merged_data['photos'] = photos
-            
-            # Utiliser la première photo comme photo principale si elle n'existe pas
-            if not merged_data.get('photo') and photos:
-                merged_data['photo'] = photos[0]
-            
-            print(f"✅ Total de photos après fusion: {len(merged_data.get('photos', []))}")
+        merged_data = merge_platform_data(structured_data, thefork_data, tripadvisor_data)
         
         # Traçage
         print(f"✅ Enrichissement terminé pour {name}")
@@ -1064,19 +2827,22 @@ def extract_with_brightdata(url, name=None, platform=None):
     print(f"[{name}] 🌐 Scraping {platform} via BrightData...")
     
     try:
-        # Configuration BrightData
-        brightdata_url = f"http://{BRIGHTDATA_TOKEN}:@brd.superproxy.io:22225"
-        proxies = {
-            "http": brightdata_url,
-            "https": brightdata_url
-        }
-        
-        # Requête avec BrightData
-        response = requests.get(url, proxies=proxies, timeout=120)
-        response.raise_for_status()
+        def within_budget():
+            if not API_BUDGET.acquire("brightdata"):
+                print(f"⚠️ [{name}] Quota BrightData épuisé, {platform} ignoré")
+                return False
+            return True
         
-        # Parsing avec BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Requête avec BrightData (super proxy, connexions réutilisées)
+        html = get_brightdata_client().proxy_get(
+            url,
+            timeout=120,
+            before_attempt=within_budget,
+            on_retry=lambda zone: record_retry("extract_with_brightdata"),
+            log_prefix=f"[{name}] "
+        )
+        if html is None:
+            return None
         
         # Extraction selon la plateforme
         if platform == 'thefork' or 'lafourchette' in url:
@@ -1088,41 +2854,169 @@ def extract_with_brightdata(url, name=None, platform=None):
         print(f"❌ [{name}] Erreur BrightData pour {platform}: {str(e)}")
         return None
 
+def has_field_value(value):
+    """Indique si une valeur collectée est exploitable (ni vide ni nulle)"""
+    return value not in (None, "", 0, [], {})
+
+def fetched_field_groups(normalized_data):
+    """Groupes de champs (REFRESH_FIELD_GROUPS) pour lesquels des valeurs ont été collectées"""
+    return [group for group, fields in REFRESH_FIELD_GROUPS.items()
+            if any(has_field_value(normalized_data.get(field)) for field in fields)]
+
+def build_restaurant_upsert(normalized_data):
+    """
+    Construit le filtre et la mise à jour d'upsert pour un restaurant normalisé
+    
+    created_at n'est écrit qu'à l'insertion; fetched_at.<groupe> date chaque
+    groupe de champs collecté. Pour un rafraîchissement (clé interne
+    _refresh_groups), seuls les champs des groupes périmés ayant une valeur
+    sont écrits: les champs encore valides restent intacts.
+    
+    Args:
+        normalized_data: Données issues de normalize_restaurant_data
+    
+    Returns:
+        Tuple (filtre, document de mise à jour)
+    """
+    # Stocker l'ID et le retirer de l'ensemble de données pour l'update
+    doc_id = normalized_data.get("_id")
+    now = datetime.now()
+    
+    # Créer une copie pour l'update sans modifier le champ _id
+    update_data = normalized_data.copy()
+    update_data.pop("_id", None)
+    update_data.pop("created_at", None)
+    refresh_groups = update_data.get("_refresh_groups")
+    for key in INTERNAL_KEYS:
+        update_data.pop(key, None)
+    
+    groups = fetched_field_groups(update_data)
+    if refresh_groups is not None:
+        # Un groupe périmé retraité est daté même sans valeur (ex: pas de photos):
+        # il ne sera reconsidéré qu'après sa durée de validité
+        groups = [group for group in refresh_groups if group in REFRESH_FIELD_GROUPS]
+        refreshed_fields = {field for group in groups for field in REFRESH_FIELD_GROUPS[group]}
+        update_data = {field: value for field, value in update_data.items()
+                       if field in refreshed_fields and has_field_value(value)}
+    for group in groups:
+        update_data[f"fetched_at.{group}"] = now
+    update_data["updated_at"] = now
+    
+    # Place_id est utilisé comme clé si disponible, sinon utiliser le nom
+    if doc_id:
+        identifier = {"_id": doc_id}
+    else:
+        identifier = {"name": normalized_data["name"]}
+    
+    return identifier, {"$set": update_data, "$setOnInsert": {"created_at": now}}
+
+@timing_decorator
+def select_stale_restaurants(limit=None, ttls=None):
+    """
+    Sélectionne les restaurants les plus périmés pour un rafraîchissement incrémental
+    
+    La péremption d'un restaurant est le maximum, sur les groupes de champs,
+    de l'âge de fetched_at.<groupe> divisé par la durée de validité du groupe
+    (un groupe jamais daté compte comme collecté en 1970).
+    
+    Args:
+        limit: Nombre maximum de restaurants (défaut: REFRESH_BATCH_SIZE)
+        ttls: Durées de validité par groupe en secondes (défaut: REFRESH_TTLS)
+    
+    Returns:
+        Liste de restaurants prêts pour le pipeline, avec leurs groupes périmés (_refresh_groups)
+    """
+    limit = limit or REFRESH_BATCH_SIZE
+    ttls = ttls or REFRESH_TTLS
+    collection = get_producers_collection()
+    if collection is None:
+        print("❌ Impossible de se connecter à MongoDB")
+        return []
+    
+    now = datetime.now()
+    never = datetime(1970, 1, 1)
+    ratios = {
+        group: {"$divide": [{"$subtract": [now, {"$ifNull": [f"$fetched_at.{group}", never]}]}, ttl * 1000]}
+        for group, ttl in ttls.items()
+    }
+    pipeline = [
+        {"$project": {"name": 1, "address": 1, "place_id": 1, "maps_url": 1, "gps_coordinates": 1,
+                      "staleness": ratios}},
+        {"$addFields": {"max_staleness": {"$max": [f"$staleness.{group}" for group in ratios]}}},
+        {"$match": {"max_staleness": {"$gte": 1}}},
+        {"$sort": {"max_staleness": -1}},
+        {"$limit": limit},
+    ]
+    
+    restaurants = []
+    for doc in collection.aggregate(pipeline, allowDiskUse=True):
+        coordinates = (doc.get("gps_coordinates") or {}).get("coordinates") or [None, None]
+        lon, lat = (coordinates + [None, None])[:2]
+        restaurants.append({
+            "name": doc.get("name", ""),
+            "address": doc.get("address", ""),
+            "place_id": doc.get("place_id") or doc.get("_id"),
+            "maps_url": doc.get("maps_url"),
+            "lat": lat if lat else None,
+            "lon": lon if lon else None,
+            "_refresh_groups": sorted(group for group, ratio in doc.get("staleness", {}).items() if ratio >= 1),
+        })
+    return restaurants
+
 @timing_decorator
 def save_to_mongodb(restaurant_data):
     """
     Sauvegarde les données du restaurant dans MongoDB
+    
+    Si un écrivain groupé (BULK_WRITER) est actif, le document est simplement
+    mis en file d'attente et écrit en lot par le thread d'écriture.
     """
     try:
+        # Récupérer le texte OCR calculé en parallèle pendant la navigation
+        join_restaurant_ocr(restaurant_data)
+        join_restaurant_structuring(restaurant_data)
+        
         # Normaliser les données
         normalized_data = normalize_restaurant_data(restaurant_data)
+        # Rafraîchissement et acquittement de la file suivent le document jusqu'à l'écriture
+        carry_internal_keys(restaurant_data, normalized_data)
+        
+        # Fiche existante du même restaurant sous un autre identifiant: mise à jour au lieu d'un doublon
+        duplicate_id = resolve_duplicate_restaurant(normalized_data)
+        if duplicate_id is not None and duplicate_id != normalized_data["_id"]:
+            print(f"🔗 {normalized_data['name']}: rattaché à la fiche existante {duplicate_id}")
+            METRICS.incr("dedup_matches", where="save")
+            if restaurant_dedup.is_custom_id(normalized_data["place_id"]):
+                normalized_data["place_id"] = duplicate_id
+            normalized_data["_id"] = duplicate_id
+        index = get_dedup_index()
+        if index is not None:
+            lat, lon = restaurant_dedup.doc_coordinates(normalized_data)
+            index.add(normalized_data["_id"], normalized_data["name"], lat, lon, normalized_data["address"])
+        
+        # Sortir les images inline du document: il ne garde que leurs références
+        if USE_IMAGE_STORE:
+            try:
+                image_store.externalize_images(normalized_data, IMAGE_FIELDS, get_restaurant_image_store())
+            except Exception as e:
+                print(f"⚠️ {normalized_data['name']}: images conservées inline ({str(e)})")
         
-        # Connexion à MongoDB Atlas en utilisant la variable globale
-        client = MongoClient(MONGODB_URI)
-        db = client[DB_NAME]
-        collection = db[COLLECTION_NAME]
-        
-        # Stocker l'ID et le retirer de l'ensemble de données pour l'update
-        doc_id = normalized_data.get("_id")
+        # Écriture différée et groupée si l'écrivain est démarré
+        writer = BULK_WRITER
+        if writer is not None and writer.is_running():
+            return writer.submit(normalized_data)
         
-        # Créer une copie pour l'update sans modifier le champ _id
-        update_data = normalized_data.copy()
-        if "_id" in update_data:
-            del update_data["_id"]
+        # Collection issue du pool de connexions partagé
+        collection = get_producers_collection()
+        if collection is None:
+            print(f"❌ {normalized_data['name']}: Impossible de se connecter à MongoDB")
+            return False
         
         # Utiliser update_one avec upsert=True pour éviter les doublons
-        # Place_id est utilisé comme clé si disponible, sinon utiliser le nom
-        if doc_id:
-            identifier = {"_id": doc_id}
-        else:
-            identifier = {"name": normalized_data["name"]}
+        identifier, update = build_restaurant_upsert(normalized_data)
         
         # Insérer ou mettre à jour le restaurant
-        result = collection.update_one(
-            identifier,
-            {"$set": update_data},
-            upsert=True
-        )
+        result = collection.update_one(identifier, update, upsert=True)
         
         if result.acknowledged:
             if result.matched_count > 0:
@@ -1138,9 +3032,185 @@ def save_to_mongodb(restaurant_data):
         print(f"❌ Erreur lors de la sauvegarde dans MongoDB: {str(e)}")
         traceback.print_exc()
         return False
-    finally:
-        if 'client' in locals():
-            client.close()
+
+class MongoBulkWriter:
+    """
+    Thread d'écriture MongoDB alimenté par les workers du pipeline
+    
+    Les workers déposent des documents normalisés dans une file; le thread
+    les regroupe en opérations UpdateOne(upsert) envoyées par bulk_write
+    (ordered=False) dès que le lot est plein ou que la fenêtre de temps expire.
+    
+    on_flushed(written, failed), si fourni, est appelé après chaque lot avec
+    les documents effectivement écrits et les couples (document, erreur) en
+    échec (ex: acquittement de la file de travail une fois la donnée en base).
+    """
+    _STOP = object()
+    
+    def __init__(self, batch_size=BULK_WRITE_BATCH_SIZE, flush_interval=BULK_WRITE_FLUSH_INTERVAL,
+                 max_queue_size=BULK_WRITE_MAX_QUEUE_SIZE, on_flushed=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flushed = on_flushed
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.thread = None
+        self.stats = {"submitted": 0, "batches": 0, "upserted": 0, "matched": 0, "failed": 0}
+        self.failures = []  # [(nom du restaurant, message d'erreur)]
+        self._stats_lock = threading.Lock()
+    
+    def start(self):
+        """Démarre le thread d'écriture"""
+        if self.is_running():
+            return self
+        self.thread = threading.Thread(target=self._run, name="mongo-bulk-writer", daemon=True)
+        self.thread.start()
+        print(f"✅ Écriture MongoDB groupée activée (lots de {self.batch_size}, {self.flush_interval}s max)")
+        return self
+    
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    def submit(self, normalized_data):
+        """
+        Met un document normalisé en file d'attente (bloque si la file est pleine)
+        
+        Returns:
+            True si le document a été accepté
+        """
+        if not self.is_running():
+            return False
+        self.queue.put(normalized_data)
+        with self._stats_lock:
+            self.stats["submitted"] += 1
+        if DEBUG_MODE:
+            print(f"📥 {normalized_data.get('name')}: En attente d'écriture groupée")
+        return True
+    
+    def close(self, timeout=None):
+        """
+        Vide la file, écrit les derniers lots et arrête le thread
+        
+        Returns:
+            Dictionnaire des statistiques d'écriture
+        """
+        if self.is_running():
+            self.queue.put(self._STOP)
+            self.thread.join(timeout)
+        return self.stats
+    
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.time())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            
+            if item is self._STOP:
+                self._flush(batch)
+                return
+            
+            if item is not None:
+                if not batch:
+                    deadline = time.time() + self.flush_interval
+                batch.append(item)
+            
+            if batch and (len(batch) >= self.batch_size or time.time() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+    
+    def _flush(self, batch):
+        if not batch:
+            return
+        
+        operations = []
+        for doc in batch:
+            identifier, update = build_restaurant_upsert(doc)
+            operations.append(UpdateOne(identifier, update, upsert=True))
+        
+        upserted = matched = 0
+        failed_docs = []  # [(document, message d'erreur)]
+        try:
+            collection = get_producers_collection()
+            if collection is None:
+                raise ConnectionError("Impossible de se connecter à MongoDB")
+            result = collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_count
+            matched = result.matched_count
+        except BulkWriteError as e:
+            # En mode non ordonné, les autres opérations du lot sont quand même appliquées
+            details = e.details or {}
+            upserted = details.get("nUpserted", 0)
+            matched = details.get("nMatched", 0)
+            for error in details.get("writeErrors", []):
+                failed_docs.append((batch[error.get("index", 0)], error.get("errmsg", "Erreur inconnue")))
+        except Exception as e:
+            failed_docs = [(doc, str(e)) for doc in batch]
+        failures = [(doc.get("name"), message) for doc, message in failed_docs]
+        
+        with self._stats_lock:
+            self.stats["batches"] += 1
+            self.stats["upserted"] += upserted
+            self.stats["matched"] += matched
+            self.stats["failed"] += len(failures)
+            self.failures.extend(failures)
+        
+        print(f"💾 Lot MongoDB écrit: {len(batch)} documents ({upserted} ajoutés, {matched} mis à jour, {len(failures)} échecs)")
+        for name, message in failures:
+            print(f"❌ {name}: Échec de la sauvegarde dans MongoDB: {message}")
+        
+        if self.on_flushed is not None:
+            failed_ids = {id(doc) for doc, _ in failed_docs}
+            try:
+                self.on_flushed([doc for doc in batch if id(doc) not in failed_ids], failed_docs)
+            except Exception as e:
+                print(f"⚠️ Erreur après l'écriture du lot: {str(e)}")
+                traceback.print_exc()
+
+# Écrivain groupé actif (None = écriture directe document par document)
+BULK_WRITER = None
+
+def start_bulk_writer(batch_size=None, flush_interval=None, on_flushed=None):
+    """
+    Démarre l'écrivain MongoDB groupé utilisé par save_to_mongodb
+    
+    Args:
+        batch_size: Taille des lots (défaut: BULK_WRITE_BATCH_SIZE)
+        flush_interval: Délai max avant écriture d'un lot incomplet (défaut: BULK_WRITE_FLUSH_INTERVAL)
+        on_flushed: Rappel après chaque lot (documents écrits, documents en échec)
+    """
+    global BULK_WRITER
+    if BULK_WRITER is None or not BULK_WRITER.is_running():
+        BULK_WRITER = MongoBulkWriter(
+            batch_size=batch_size or BULK_WRITE_BATCH_SIZE,
+            flush_interval=flush_interval or BULK_WRITE_FLUSH_INTERVAL,
+            on_flushed=on_flushed
+        ).start()
+    return BULK_WRITER
+
+def stop_bulk_writer():
+    """
+    Vide et arrête l'écrivain groupé, puis affiche le bilan des écritures
+    
+    Returns:
+        Dictionnaire des statistiques ou None si aucun écrivain n'était actif
+    """
+    global BULK_WRITER
+    writer = BULK_WRITER
+    if writer is None:
+        return None
+    
+    BULK_WRITER = None
+    stats = writer.close()
+    print(f"📊 Écriture groupée: {stats['submitted']} documents, {stats['batches']} lots, "
+          f"{stats['upserted']} ajoutés, {stats['matched']} mis à jour, {stats['failed']} échecs")
+    return stats
+
+# Vider la file d'écriture même en cas d'arrêt anticipé
+atexit.register(stop_bulk_writer)
 
 # Fonction pour vérifier si un restaurant existe sur Google Maps
 @timing_decorator
@@ -1173,7 +3243,7 @@ def verify_restaurant_on_maps(name, address, lat=None, lon=None, place_id=None):
             
         print(f"🔍 Recherche de {name} ({address}) sur Google Maps")
         
-        with ChromeSessionManager() as session:
+        with chrome_session() as session:
             # Utiliser le driver de la session et non la session elle-même
             driver = session.driver
             
@@ -1216,67 +3286,208 @@ def verify_restaurant_on_maps(name, address, lat=None, lon=None, place_id=None):
         return None
 
 @timing_decorator
-def process_restaurant(restaurant):
+def prepare_maps_data(restaurant):
+    """
+    Étape 1: données Google Maps d'un restaurant (API si disponibles, sinon navigateur)
+    
+    Args:
+        restaurant: Dictionnaire du restaurant
+    
+    Returns:
+        Données Maps (name, address, maps_url, place_id, latitude, longitude, rating) ou None
+    """
+    name = restaurant.get("name", "")
+    address = restaurant.get("address", "")
+    place_id = restaurant.get("place_id", "")
+    lat = restaurant.get("lat")
+    lon = restaurant.get("lon")
+    rating = restaurant.get("rating", 0)
+    
+    # Si nous avons déjà toutes les informations nécessaires depuis l'API Google Maps
+    if place_id and lat is not None and lon is not None:
+        print(f"[{name}] ✅ Utilisation des données Google Maps API existantes")
+        # Créer directement les données à partir des informations de l'API
+        return {
+            "name": name,
+            "address": address,
+            "maps_url": f"https://www.google.com/maps/place/?q=place_id:{place_id}",
+            "place_id": place_id,
+            "latitude": lat,
+            "longitude": lon,
+            "rating": rating
+        }
+    
+    # Sinon, vérifier sur Google Maps via le navigateur en transmettant les informations disponibles
+    print(f"[{name}] 🔍 Vérification sur Google Maps...")
+    maps_data = verify_restaurant_on_maps(
+        name=name, 
+        address=address,
+        lat=lat,
+        lon=lon,
+        place_id=place_id
+    )
+    
+    if not maps_data:
+        # Si la recherche sur Maps a échoué mais qu'on a déjà les coordonnées, créer une fiche minimale
+        if lat is not None and lon is not None:
+            print(f"[{name}] ⚠️ Création d'une fiche minimale avec les coordonnées disponibles")
+            maps_data = {
+                "name": name,
+                "address": address,
+                "maps_url": f"https://www.google.com/maps/search/{lat},{lon}",
+                "place_id": place_id or restaurant_dedup.stable_restaurant_id(name, address, lat, lon),
+                "latitude": lat,
+                "longitude": lon,
+                "rating": rating
+            }
+        else:
+            print(f"❌ {name}: Non trouvé sur Google Maps")
+            return None
+    
+    return maps_data
+
+_PLATFORM_EXECUTOR = None
+_PLATFORM_EXECUTOR_LOCK = threading.Lock()
+
+def get_platform_executor():
+    """
+    Pool partagé des extractions de plateformes (Bing, TheFork, TripAdvisor)
+    
+    Borne le nombre total de requêtes d'enrichissement en vol, quel que soit
+    le nombre de restaurants enrichis en même temps.
+    """
+    global _PLATFORM_EXECUTOR
+    with _PLATFORM_EXECUTOR_LOCK:
+        if _PLATFORM_EXECUTOR is None:
+            _PLATFORM_EXECUTOR = ThreadPoolExecutor(max_workers=PLATFORM_FETCH_CONCURRENCY,
+                                                    thread_name_prefix="platform")
+        return _PLATFORM_EXECUTOR
+
+def close_platform_executor():
+    global _PLATFORM_EXECUTOR
+    with _PLATFORM_EXECUTOR_LOCK:
+        if _PLATFORM_EXECUTOR is not None:
+            # Les extractions dépassant l'échéance sont abandonnées
+            _PLATFORM_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            _PLATFORM_EXECUTOR = None
+
+atexit.register(close_platform_executor)
+
+def submit_platform_task(func, *args, **kwargs):
+    """Soumet une extraction au pool partagé en conservant la trace du restaurant"""
+    context = contextvars.copy_context()
+    return get_platform_executor().submit(context.run, func, *args, **kwargs)
+
+def wait_platform_tasks(futures, deadline, name=None):
+    """
+    Attend des extractions jusqu'à l'échéance du restaurant
+    
+    Args:
+        futures: Dictionnaire {plateforme: future}
+        deadline: Échéance (time.time())
+        name: Nom du restaurant (pour les logs)
+    
+    Returns:
+        Dictionnaire {plateforme: résultat} des extractions terminées à temps
+    """
+    if not futures:
+        return {}
+    done, not_done = wait(list(futures.values()), timeout=max(0, deadline - time.time()))
+    results = {}
+    for platform, future in futures.items():
+        if future in not_done:
+            # Le résultat sera ignoré: on sauvegarde ce qui est disponible
+            future.cancel()
+            METRICS.incr("enrichment_timeouts", platform=platform)
+            print(f"[{name}] ⏰ {platform}: échéance d'enrichissement dépassée, résultat partiel")
+            continue
+        try:
+            results[platform] = future.result()
+        except Exception as e:
+            METRICS.incr("errors", function=f"enrich_{platform}")
+            print(f"[{name}] ❌ Erreur d'extraction {platform}: {str(e)}")
+    return results
+
+@timing_decorator
+def enrich_restaurant_data(restaurant_data, deadline=None):
+    """
+    Étape 3: enrichissement avec les plateformes externes (si BrightData est activé)
+    
+    La recherche Bing fournit les liens, puis (avec --platform-details)
+    TheFork et TripAdvisor sont extraits en parallèle: la durée tend vers celle de la plateforme la plus
+    lente plutôt que vers leur somme. Passée l'échéance, les résultats
+    partiels sont conservés.
+    
+    Args:
+        restaurant_data: Données du restaurant
+        deadline: Échéance (time.time()), par défaut maintenant + ENRICHMENT_DEADLINE
+    
+    Returns:
+        Les données du restaurant, complétées en place
+    """
+    if not USE_BRIGHTDATA:
+        return restaurant_data
+    
+    name = restaurant_data.get("name")
+    deadline = deadline or time.time() + ENRICHMENT_DEADLINE
+    print(f"[{name}] 🌐 Enrichissement avec les plateformes externes...")
+    
+    # Les liens sont nécessaires avant d'interroger les plateformes
+    links = wait_platform_tasks(
+        {"bing": submit_platform_task(search_links_bing, name, restaurant_data.get("address"))},
+        deadline, name
+    )
+    platform_links = links.get("bing")
+    if not platform_links:
+        return restaurant_data
+    restaurant_data["platform_links"] = platform_links
+    if not ENRICH_PLATFORM_DETAILS:
+        return restaurant_data
+    
+    futures = {}
+    thefork_url = platform_links.get("lafourchette")
+    if thefork_url and validate_platform_link(thefork_url, "lafourchette"):
+        futures["thefork"] = submit_platform_task(extract_thefork_data, thefork_url, restaurant_name=name)
+    tripadvisor_url = platform_links.get("tripadvisor")
+    if tripadvisor_url and validate_platform_link(tripadvisor_url, "tripadvisor"):
+        futures["tripadvisor"] = submit_platform_task(extract_tripadvisor_data, tripadvisor_url, restaurant_name=name)
+    
+    details = wait_platform_tasks(futures, deadline, name)
+    if details:
+        merged_data = merge_platform_data(restaurant_data, details.get("thefork") or {}, details.get("tripadvisor") or {})
+        restaurant_data.update(merged_data)
+    return restaurant_data
+
+def process_restaurant(restaurant, check_existing=True):
     """
     Traite un restaurant complet avec toutes les étapes
+    
+    Args:
+        restaurant: Dictionnaire du restaurant
+        check_existing: Si False, ne vérifie pas la présence en base
+                        (déjà faite par une vérification groupée)
     """
+    # Toutes les mesures faites pendant ce traitement portent la trace du restaurant
+    trace_id = ensure_trace_id(restaurant)
+    trace_token = CURRENT_TRACE.set((trace_id, restaurant.get("name")))
     try:
         name = restaurant.get("name", "")
         address = restaurant.get("address", "")
         place_id = restaurant.get("place_id", "")
-        lat = restaurant.get("lat")
-        lon = restaurant.get("lon")
-        rating = restaurant.get("rating", 0)
         
         print(f"\n{'='*50}")
-        print(f"Traitement de: {name}, {address}")
+        print(f"Traitement de: {name}, {address} (trace {trace_id})")
         print(f"{'='*50}\n")
         
         # Vérifier si le restaurant existe déjà dans MongoDB
-        if is_restaurant_in_mongodb(name, restaurant.get("maps_url"), place_id):
+        if check_existing and is_restaurant_in_mongodb(name, restaurant.get("maps_url"), place_id):
             print(f"⚠️ {name}: Déjà dans MongoDB, on passe au suivant")
             return True
-            
-        # Si nous avons déjà toutes les informations nécessaires depuis l'API Google Maps
-        if place_id and lat is not None and lon is not None:
-            print(f"[{name}] ✅ Utilisation des données Google Maps API existantes")
-            # Créer directement les données à partir des informations de l'API
-            maps_data = {
-                "name": name,
-                "address": address,
-                "maps_url": f"https://www.google.com/maps/place/?q=place_id:{place_id}",
-                "place_id": place_id,
-                "latitude": lat,
-                "longitude": lon,
-                "rating": rating
-            }
-        else:
-            # Sinon, vérifier sur Google Maps via le navigateur en transmettant les informations disponibles
-            print(f"[{name}] 🔍 Vérification sur Google Maps...")
-            maps_data = verify_restaurant_on_maps(
-                name=name, 
-                address=address,
-                lat=lat,
-                lon=lon,
-                place_id=place_id
-            )
-            
-            if not maps_data:
-                # Si la recherche sur Maps a échoué mais qu'on a déjà les coordonnées, créer une fiche minimale
-                if lat is not None and lon is not None:
-                    print(f"[{name}] ⚠️ Création d'une fiche minimale avec les coordonnées disponibles")
-                    maps_data = {
-                        "name": name,
-                        "address": address,
-                        "maps_url": f"https://www.google.com/maps/search/{lat},{lon}",
-                        "place_id": place_id if place_id else f"custom_{hashlib.md5(name.encode()).hexdigest()[:10]}_{name.replace(' ', '_')}",
-                        "latitude": lat,
-                        "longitude": lon,
-                        "rating": rating
-                    }
-                else:
-                    print(f"❌ {name}: Non trouvé sur Google Maps")
-                    return False
+        
+        # Étape 1: Données Google Maps
+        maps_data = prepare_maps_data(restaurant)
+        if not maps_data:
+            return False
             
         # Étape 2: Capture des screenshots et extraction des données additionnelles
         print(f"[{name}] 📸 Capture des données visuelles...")
@@ -1284,13 +3495,10 @@ def process_restaurant(restaurant):
         if not restaurant_data:
             print(f"❌ {name}: Échec de l'extraction des données visuelles")
             return False
+        carry_internal_keys(restaurant, restaurant_data)
             
         # Étape 3: Enrichissement avec les plateformes externes
-        if USE_BRIGHTDATA:
-            print(f"[{name}] 🌐 Enrichissement avec les plateformes externes...")
-            platform_links = search_links_bing(name, address)
-            if platform_links:
-                restaurant_data["platform_links"] = platform_links
+        enrich_restaurant_data(restaurant_data)
         
         # Étape 4: Sauvegarde en MongoDB
         print(f"[{name}] 💾 Sauvegarde en MongoDB...")
@@ -1306,118 +3514,653 @@ def process_restaurant(restaurant):
         traceback.print_exc()
         return False
     finally:
+        CURRENT_TRACE.reset(trace_token)
         print(f"\n{'='*50}\n")
 
 @timing_decorator
-def process_restaurants_with_threadpool(restaurants, num_threads=NUM_THREADS, skip_existing=True):
+def process_restaurants_with_threadpool(restaurants, num_threads=NUM_THREADS, skip_existing=True):
+    """
+    Traite une liste de restaurants en parallèle avec un pool de threads
+    
+    Args:
+        restaurants: Liste de restaurants à traiter
+        num_threads: Nombre de threads à utiliser
+        skip_existing: Si True, ignore les restaurants déjà en base
+    
+    Returns:
+        Tuple (nb_success, nb_total)
+    """
+    # Étapes découplées (navigateur, OCR, HTTP, écriture) dimensionnées séparément
+    if USE_STAGED_PIPELINE:
+        return process_restaurants_staged(restaurants, skip_existing=skip_existing)
+    
+    if not restaurants:
+        print("❌ Aucun restaurant à traiter")
+        return 0, 0
+    
+    # Vérifier les restaurants déjà en base si demandé (requêtes $in groupées)
+    if skip_existing:
+        print("🔍 Vérification des restaurants déjà en base...")
+        restaurants_to_process = filter_existing_restaurants(restaurants)
+        
+        skipped = len(restaurants) - len(restaurants_to_process)
+        print(f"📊 {skipped}/{len(restaurants)} restaurants déjà en base, ignorés")
+        
+        restaurants = restaurants_to_process
+    
+    if not restaurants:
+        print("✅ Tous les restaurants sont déjà en base, rien à faire")
+        return 0, 0
+    
+    # Les workers déposent leurs documents, un thread dédié les écrit par lots
+    if USE_BULK_WRITE:
+        start_bulk_writer()
+    
+    # Créer un pool de threads et soumettre les tâches
+    # (inutile de revérifier un par un ce que la vérification groupée a déjà filtré)
+    thread_pool = ThreadPoolExecutor(max_workers=num_threads)
+    future_to_restaurant = {
+        thread_pool.submit(process_restaurant, restaurant, check_existing=not skip_existing): restaurant
+        for restaurant in restaurants
+    }
+    
+    # Suivi du progrès et résultats
+    completed = 0
+    success = 0
+    total = len(future_to_restaurant)
+    
+    print("\n" + "=" * 50)
+    
+    # Traiter les résultats au fur et à mesure
+    for future in as_completed(future_to_restaurant):
+        restaurant = future_to_restaurant[future]
+        name = restaurant.get("name", "Inconnu")
+        
+        try:
+            result = future.result()
+            if result:
+                success += 1
+                print(f"✅ {name}: Traitement réussi")
+            else:
+                print(f"❌ {name}: Échec du traitement")
+        except Exception as e:
+            print(f"❌ {name}: Erreur lors du traitement: {str(e)}")
+        
+        completed += 1
+        print(f"\r📊 Progrès: {completed}/{total} restaurants traités ({success} réussis)", end="")
+    
+    thread_pool.shutdown()
+    
+    # Écrire les derniers lots avant de conclure
+    bulk_stats = stop_bulk_writer()
+    if bulk_stats and bulk_stats["failed"]:
+        success = max(0, success - bulk_stats["failed"])
+    
+    print(f"\n\n🎉 Traitement terminé: {success}/{total} restaurants traités avec succès")
+    
+    return success, total
+
+# =============================================
+# PIPELINE PAR ÉTAPES
+# =============================================
+
+# Marqueur d'arrêt transmis d'une étape à la suivante
+_STAGE_STOP = object()
+
+class PipelineStage:
+    """
+    Étape du pipeline: une file bornée en entrée et workers threads dédiés
+    
+    La fonction de l'étape reçoit un élément et renvoie l'élément transmis à
+    l'étape suivante, ou None pour l'écarter (restaurant non trouvé, échec...).
+    on_result(item, ok, error), si fourni, est appelé pour chaque élément
+    écarté et pour chaque élément sorti de la dernière étape.
+    """
+    def __init__(self, name, func, workers, queue_size=None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size or PIPELINE_QUEUE_SIZE)
+        self.next_stage = None
+        self.on_result = None
+        self._threads = []
+        self._finished_workers = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "processed": 0,
+            "dropped": 0,
+            "errors": 0,
+            "busy_seconds": 0.0,
+            "blocked_seconds": 0.0,  # Attente de place dans la file aval (contre-pression)
+            "max_queue": 0,
+        }
+    
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"stage-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def put(self, item):
+        self.queue.put(item)
+        with self._lock:
+            self.stats["max_queue"] = max(self.stats["max_queue"], self.queue.qsize())
+    
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STAGE_STOP:
+                break
+            
+            start_time = time.time()
+            trace_id = ensure_trace_id(item)
+            trace_token = CURRENT_TRACE.set((trace_id, item.get("name") if isinstance(item, dict) else None))
+            error = None
+            try:
+                result = self.func(item)
+                outcome = "processed" if result is not None else "dropped"
+            except Exception as e:
+                print(f"❌ Étape {self.name}: {str(e)}")
+                traceback.print_exc()
+                result = None
+                outcome = "errors"
+                error = f"{self.name}: {str(e)}"
+            finally:
+                CURRENT_TRACE.reset(trace_token)
+            # Le restaurant garde ses clés internes (trace, rafraîchissement, file) d'une étape à l'autre
+            if isinstance(result, dict) and result is not item:
+                carry_internal_keys(item, result)
+            if self.on_result is not None and (result is None or self.next_stage is None):
+                try:
+                    self.on_result(item if result is None else result, result is not None,
+                                   error or (f"{self.name}: écarté" if result is None else None))
+                except Exception as e:
+                    print(f"⚠️ Étape {self.name}: erreur du suivi des résultats: {str(e)}")
+            METRICS.observe(f"stage_{self.name}", time.time() - start_time, trace_id=trace_id)
+            with self._lock:
+                self.stats[outcome] += 1
+                self.stats["busy_seconds"] += time.time() - start_time
+            
+            if result is not None and self.next_stage is not None:
+                wait_start = time.time()
+                self.next_stage.put(result)
+                with self._lock:
+                    self.stats["blocked_seconds"] += time.time() - wait_start
+        
+        # Le dernier worker à s'arrêter propage l'arrêt à l'étape suivante
+        with self._lock:
+            self._finished_workers += 1
+            last = self._finished_workers == self.workers
+        if last and self.next_stage is not None:
+            for _ in range(self.next_stage.workers):
+                self.next_stage.put(_STAGE_STOP)
+
+class StagedPipeline:
+    """
+    Enchaîne des étapes reliées par des files bornées
+    
+    Chaque étape a son propre nombre de workers: on dimensionne l'étape
+    goulot (navigateurs, OCR, HTTP, écriture) au lieu d'un unique --threads.
+    Quand une file est pleine, l'étape amont attend (contre-pression) au
+    lieu d'accumuler des restaurants en mémoire.
+    """
+    def __init__(self, stages, on_result=None):
+        self.stages = stages
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.next_stage = downstream
+        for stage in stages:
+            stage.on_result = on_result
+        self.submitted = 0
+        self.feed_blocked_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+    
+    def run(self, items):
+        """
+        Fait passer les éléments dans toutes les étapes
+        
+        Args:
+            items: Itérable (éventuellement un générateur alimenté par la découverte)
+        
+        Returns:
+            Nombre d'éléments sortis de la dernière étape
+        """
+        self.started_at = time.time()
+        for stage in self.stages:
+            stage.start()
+        
+        first = self.stages[0]
+        try:
+            for item in items:
+                wait_start = time.time()
+                first.put(item)
+                self.feed_blocked_seconds += time.time() - wait_start
+                self.submitted += 1
+        finally:
+            for _ in range(first.workers):
+                first.put(_STAGE_STOP)
+            for stage in self.stages:
+                stage.join()
+            self.finished_at = time.time()
+        
+        return self.stages[-1].stats["processed"]
+    
+    def print_stats(self):
+        """Affiche débit, occupation et contre-pression de chaque étape"""
+        elapsed = max(1e-6, (self.finished_at or time.time()) - (self.started_at or time.time()))
+        print(f"\n🏭 PIPELINE PAR ÉTAPES ({self.submitted} restaurants en entrée, {elapsed:.1f}s):")
+        print(f"{'ÉTAPE':<8} | {'WORKERS':<7} | {'TRAITÉS':<7} | {'ÉCARTÉS':<7} | {'ERREURS':<7} | "
+              f"{'DÉBIT/MIN':<9} | {'OCCUPATION':<10} | {'BLOQUÉ AVAL':<11} | {'FILE MAX':<8}")
+        print("-" * 100)
+        bottleneck, max_occupancy = None, -1.0
+        for stage in self.stages:
+            stats = stage.stats
+            occupancy = stats["busy_seconds"] / (stage.workers * elapsed)
+            if occupancy > max_occupancy:
+                bottleneck, max_occupancy = stage.name, occupancy
+            print(f"{stage.name:<8} | {stage.workers:<7} | {stats['processed']:<7} | {stats['dropped']:<7} | "
+                  f"{stats['errors']:<7} | {stats['processed'] * 60 / elapsed:<9.1f} | {occupancy:<10.0%} | "
+                  f"{stats['blocked_seconds']:<11.1f} | {stats['max_queue']:<8}")
+        if bottleneck:
+            print(f"🐢 Étape la plus chargée: {bottleneck} ({max_occupancy:.0%} d'occupation) - augmenter ses workers en priorité")
+
+def stage_browse(restaurant):
+    """Étape navigateur: données Maps, captures et planification de l'OCR"""
+    name = restaurant.get("name", "")
+    maps_data = prepare_maps_data(restaurant)
+    if not maps_data:
+        return None
+    print(f"[{name}] 📸 Capture des données visuelles...")
+    restaurant_data = process_restaurant_with_maps_screenshots(maps_data)
+    if not restaurant_data:
+        print(f"❌ {name}: Échec de l'extraction des données visuelles")
+    return restaurant_data
+
+def stage_ocr(restaurant_data):
+    """Étape OCR: attend le résultat du pool de processus et complète le document"""
+    join_restaurant_ocr(restaurant_data)
+    return restaurant_data
+
+def stage_save(restaurant_data):
+    """Étape sauvegarde: document transmis à l'écrivain groupé"""
+    name = restaurant_data.get("name")
+    if save_to_mongodb(restaurant_data):
+        print(f"✅ {name}: Traitement réussi")
+        return restaurant_data
+    print(f"❌ {name}: Échec de la sauvegarde MongoDB")
+    return None
+
+@timing_decorator
+def process_restaurants_staged(restaurants, skip_existing=True, browser_workers=None,
+                               ocr_workers=None, fetch_workers=None, save_workers=None,
+                               on_result=None, on_flushed=None):
     """
-    Traite une liste de restaurants en parallèle avec un pool de threads
+    Traite les restaurants avec le pipeline navigateur → OCR → enrichissement → sauvegarde
     
     Args:
-        restaurants: Liste de restaurants à traiter
-        num_threads: Nombre de threads à utiliser
+        restaurants: Liste ou générateur de restaurants (la découverte peut alimenter le pipeline)
         skip_existing: Si True, ignore les restaurants déjà en base
+        browser_workers: Sessions Chrome en parallèle (défaut: PIPELINE_BROWSER_WORKERS)
+        ocr_workers: Résultats OCR attendus en parallèle (défaut: OCR_WORKERS)
+        fetch_workers: Requêtes d'enrichissement simultanées (défaut: PIPELINE_FETCH_WORKERS)
+        save_workers: Workers de sauvegarde (défaut: PIPELINE_SAVE_WORKERS)
+        on_result: Rappel (restaurant, succès, erreur) en sortie de pipeline ou à l'abandon
+        on_flushed: Rappel de l'écrivain groupé après chaque lot écrit
     
     Returns:
         Tuple (nb_success, nb_total)
     """
-    if not restaurants:
-        print("❌ Aucun restaurant à traiter")
-        return 0, 0
+    if isinstance(restaurants, list):
+        if not restaurants:
+            print("❌ Aucun restaurant à traiter")
+            return 0, 0
+        # Vérification groupée ($in) plutôt que restaurant par restaurant
+        if skip_existing:
+            print("🔍 Vérification des restaurants déjà en base...")
+            restaurants_to_process = filter_existing_restaurants(restaurants)
+            print(f"📊 {len(restaurants) - len(restaurants_to_process)}/{len(restaurants)} restaurants déjà en base, ignorés")
+            restaurants = restaurants_to_process
+            skip_existing = False
+        if not restaurants:
+            print("✅ Tous les restaurants sont déjà en base, rien à faire")
+            return 0, 0
+    
+    def browse(restaurant):
+        # Flux de découverte: vérification au fil de l'eau
+        if skip_existing and is_restaurant_in_mongodb(restaurant.get("name", ""), restaurant.get("maps_url"),
+                                                      restaurant.get("place_id", "")):
+            print(f"⚠️ {restaurant.get('name', '')}: Déjà dans MongoDB, on passe au suivant")
+            return None
+        return stage_browse(restaurant)
     
-    # Vérifier les restaurants déjà en base si demandé
-    if skip_existing:
-        print("🔍 Vérification des restaurants déjà en base...")
-        restaurants_to_process = []
-        
-        for restaurant in restaurants:
-            name = restaurant.get("name", "")
-            maps_url = restaurant.get("maps_url", None)
-            place_id = restaurant.get("place_id", None)
-            
-            if not is_restaurant_in_mongodb(name, maps_url, place_id):
-                restaurants_to_process.append(restaurant)
-        
-        skipped = len(restaurants) - len(restaurants_to_process)
-        print(f"📊 {skipped}/{len(restaurants)} restaurants déjà en base, ignorés")
-        
-        restaurants = restaurants_to_process
+    stages = [PipelineStage("browse", browse, browser_workers or PIPELINE_BROWSER_WORKERS)]
+    if USE_OCR:
+        stages.append(PipelineStage("ocr", stage_ocr, ocr_workers or OCR_WORKERS))
+    if USE_BRIGHTDATA:
+        stages.append(PipelineStage("enrich", enrich_restaurant_data, fetch_workers or PIPELINE_FETCH_WORKERS))
+    stages.append(PipelineStage("save", stage_save, save_workers or PIPELINE_SAVE_WORKERS))
     
-    if not restaurants:
-        print("✅ Tous les restaurants sont déjà en base, rien à faire")
-        return 0, 0
+    print("🏭 Pipeline: " + " → ".join(f"{stage.name} x{stage.workers}" for stage in stages))
     
-    # Créer un pool de threads et soumettre les tâches
-    thread_pool = ThreadPoolExecutor(max_workers=num_threads)
-    future_to_restaurant = {
-        thread_pool.submit(process_restaurant, restaurant): restaurant
-        for restaurant in restaurants
-    }
+    if USE_BULK_WRITE:
+        start_bulk_writer(on_flushed=on_flushed)
+    pipeline = StagedPipeline(stages, on_result=on_result)
+    try:
+        success = pipeline.run(restaurants)
+    finally:
+        bulk_stats = stop_bulk_writer()
+    if bulk_stats and bulk_stats["failed"]:
+        success = max(0, success - bulk_stats["failed"])
     
-    # Suivi du progrès et résultats
-    completed = 0
-    success = 0
-    total = len(future_to_restaurant)
+    pipeline.print_stats()
+    print(f"\n🎉 Traitement terminé: {success}/{pipeline.submitted} restaurants traités avec succès")
+    return success, pipeline.submitted
+
+def stream_discovered_restaurants(zones, max_places=None):
+    """
+    Générateur des lieux trouvés par le balayage asynchrone, rendus dès leur découverte
     
-    print("\n" + "=" * 50)
+    Le balayage tourne dans un thread dédié; quand le pipeline est saturé,
+    la file pleine suspend la lecture des lieux (contre-pression) sans bloquer
+    la boucle d'événements: les requêtes en cours et les pages suivantes continuent.
+    """
+    found = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
     
-    # Traiter les résultats au fur et à mesure
-    for future in as_completed(future_to_restaurant):
-        restaurant = future_to_restaurant[future]
-        name = restaurant.get("name", "Inconnu")
-        
+    def discover():
         try:
-            result = future.result()
-            if result:
-                success += 1
-                print(f"✅ {name}: Traitement réussi")
-            else:
-                print(f"❌ {name}: Échec du traitement")
+            sweep_restaurants_async(zones, max_places=max_places, on_place=found.put)
         except Exception as e:
-            print(f"❌ {name}: Erreur lors du traitement: {str(e)}")
-        
-        completed += 1
-        print(f"\r📊 Progrès: {completed}/{total} restaurants traités ({success} réussis)", end="")
+            print(f"❌ Erreur pendant la découverte: {str(e)}")
+            traceback.print_exc()
+        finally:
+            found.put(_SWEEP_DONE)
+    
+    threading.Thread(target=discover, name="stage-discover", daemon=True).start()
+    while True:
+        place = found.get()
+        if place is _SWEEP_DONE:
+            return
+        yield place
+
+# =============================================
+# FILE DE TRAVAIL DURABLE
+# =============================================
+
+JOB_QUEUE = None
+JOB_QUEUE_LOCK = threading.Lock()
+
+def get_job_queue():
+    """
+    File de travail des restaurants (collection JOB_QUEUE_COLLECTION), partagée par tous les workers
     
-    thread_pool.shutdown()
+    Returns:
+        Instance de job_queue.MongoJobQueue ou None si MongoDB est injoignable
+    """
+    global JOB_QUEUE
+    with JOB_QUEUE_LOCK:
+        if JOB_QUEUE is None:
+            collection = MONGO_MANAGER.get_collection(DB_NAME, JOB_QUEUE_COLLECTION)
+            if collection is None:
+                return None
+            JOB_QUEUE = job_queue.MongoJobQueue(collection, lease_seconds=JOB_LEASE_SECONDS,
+                                                max_attempts=JOB_MAX_ATTEMPTS)
+        return JOB_QUEUE
+
+def restaurant_job_key(restaurant):
+    """Clé d'un restaurant dans la file: place_id, sinon nom et adresse"""
+    if restaurant.get("place_id"):
+        return restaurant["place_id"]
+    name = (restaurant.get("name") or "").strip().lower()
+    if not name:
+        return None
+    return f"{name}|{(restaurant.get('address') or '').strip().lower()}"
+
+@timing_decorator
+def enqueue_restaurants(restaurants, skip_existing=False, requeue_done=False):
+    """
+    Met des restaurants dans la file durable au lieu de les traiter
     
-    print(f"\n\n🎉 Traitement terminé: {success}/{total} restaurants traités avec succès")
+    Un restaurant déjà présent dans la file n'est pas ajouté une seconde
+    fois, sauf avec requeue_done: s'il est terminé (ou en échec définitif),
+    il est remis en attente avec le nouveau payload.
     
-    return success, total
+    Args:
+        restaurants: Liste ou générateur de restaurants (ex: flux de la découverte)
+        skip_existing: Si True, ignore les restaurants déjà en base
+        requeue_done: Si True, remet en attente les restaurants déjà traités (--refresh)
+    
+    Returns:
+        Nombre de restaurants ajoutés ou remis en attente
+    """
+    jobs = get_job_queue()
+    if jobs is None:
+        print("❌ Impossible de se connecter à MongoDB")
+        return 0
+    
+    seen = added = 0
+    
+    def enqueue_chunk(chunk):
+        nonlocal seen, added
+        seen += len(chunk)
+        if skip_existing:
+            chunk = filter_existing_restaurants(chunk)
+        # La trace est propre à un traitement: seule la clé de rafraîchissement est conservée
+        payloads = [{key: value for key, value in restaurant.items() if key not in ("_trace_id", "_job_id")}
+                    for restaurant in chunk]
+        added += jobs.enqueue(payloads, key_func=restaurant_job_key, requeue_done=requeue_done)
+        print(f"📥 File de travail: {added} restaurants ajoutés ({seen} reçus)")
+    
+    chunk = []
+    for restaurant in restaurants:
+        chunk.append(restaurant)
+        if len(chunk) >= job_queue.JOB_ENQUEUE_BATCH_SIZE:
+            enqueue_chunk(chunk)
+            chunk = []
+    if chunk:
+        enqueue_chunk(chunk)
+    
+    print(f"✅ {added}/{seen} restaurants mis en file ({seen - added} déjà présents ou ignorés)")
+    return added
+
+@timing_decorator
+def drain_job_queue(max_jobs=None):
+    """
+    Traite les restaurants de la file durable jusqu'à ce qu'elle soit vide
+    
+    Plusieurs processus, sur plusieurs machines, peuvent vider la même file.
+    Chaque restaurant est réservé (bail) avant d'entrer dans le pipeline par
+    étapes; le bail est prolongé tant qu'il est en cours de traitement. Un
+    restaurant n'est acquitté qu'une fois écrit en base (après le lot de
+    l'écrivain groupé): un worker qui plante laisse expirer ses baux et ses
+    restaurants sont repris par les autres. Un restaurant en échec est remis
+    en file jusqu'à JOB_MAX_ATTEMPTS tentatives, puis passe en "failed".
+    
+    Args:
+        max_jobs: Nombre maximum de restaurants à réserver (None = toute la file)
+    
+    Returns:
+        Dictionnaire {done, retried, failed, lost}
+    """
+    jobs = get_job_queue()
+    if jobs is None:
+        print("❌ Impossible de se connecter à MongoDB")
+        return None
+    
+    in_flight = {}  # _job_id -> nom du restaurant, baux à prolonger
+    lock = threading.Lock()
+    outcome = {"done": 0, "retried": 0, "failed": 0, "lost": 0}
+    stop_heartbeat = threading.Event()
+    
+    def finish(restaurant, ok, error=None):
+        job_id = restaurant.get("_job_id")
+        with lock:
+            if job_id not in in_flight:
+                return
+            in_flight.pop(job_id)
+        try:
+            state = (job_queue.DONE if jobs.complete(job_id) else None) if ok else jobs.fail(job_id, error)
+        except Exception as e:
+            # Le bail expirera et le restaurant sera repris
+            print(f"⚠️ {restaurant.get('name')}: état de la file non mis à jour ({str(e)})")
+            state = None
+        key = {job_queue.DONE: "done", job_queue.PENDING: "retried", job_queue.FAILED: "failed"}.get(state, "lost")
+        with lock:
+            outcome[key] += 1
+        METRICS.incr("job_queue", state=key)
+        if key == "failed":
+            print(f"❌ {restaurant.get('name')}: abandonné après {JOB_MAX_ATTEMPTS} tentatives ({error})")
+        elif key == "lost":
+            print(f"⚠️ {restaurant.get('name')}: bail perdu (repris par un autre worker)")
+    
+    def on_result(restaurant, ok, error):
+        # Avec l'écrivain groupé, un restaurant sauvegardé est acquitté une fois son lot écrit
+        writer = BULK_WRITER
+        if ok and writer is not None and writer.is_running():
+            return
+        finish(restaurant, ok, error)
+    
+    def on_flushed(written, failed):
+        for doc in written:
+            finish(doc, True)
+        for doc, message in failed:
+            finish(doc, False, f"save: {message}")
+    
+    def heartbeat():
+        while not stop_heartbeat.wait(max(1, JOB_LEASE_SECONDS / 3)):
+            with lock:
+                job_ids = list(in_flight)
+            try:
+                jobs.extend(job_ids)
+            except Exception as e:
+                print(f"⚠️ Prolongation des baux impossible: {str(e)}")
+    
+    def leased_restaurants():
+        leased = 0
+        while max_jobs is None or leased < max_jobs:
+            count = PIPELINE_BROWSER_WORKERS if max_jobs is None else min(PIPELINE_BROWSER_WORKERS, max_jobs - leased)
+            found = jobs.lease(count)
+            if not found:
+                with lock:
+                    busy = bool(in_flight)
+                # Restaurants différés après un échec ou réservés par un worker qui peut planter:
+                # on reste disponible jusqu'à ce que la file soit entièrement traitée
+                if not busy and not jobs.has_unfinished():
+                    return
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+            for job in found:
+                restaurant = dict(job["payload"])
+                restaurant["_job_id"] = job["_id"]
+                with lock:
+                    in_flight[job["_id"]] = restaurant.get("name")
+                leased += 1
+                yield restaurant
+    
+    print(f"🧵 Worker {jobs.worker_id}: file {DB_NAME}.{JOB_QUEUE_COLLECTION} "
+          f"(bail {JOB_LEASE_SECONDS}s, {JOB_MAX_ATTEMPTS} tentatives max)")
+    threading.Thread(target=heartbeat, name="job-queue-heartbeat", daemon=True).start()
+    try:
+        process_restaurants_staged(leased_restaurants(), skip_existing=False,
+                                   on_result=on_result, on_flushed=on_flushed)
+    finally:
+        stop_heartbeat.set()
+        # Arrêt anticipé: les restaurants encore réservés sont rendus sans compter de tentative
+        with lock:
+            remaining = list(in_flight)
+            in_flight.clear()
+        if remaining:
+            released = jobs.release(remaining)
+            print(f"↩️ {released} restaurants rendus à la file")
+    
+    print(f"📊 File de travail: {outcome['done']} traités, {outcome['retried']} à retenter, "
+          f"{outcome['failed']} en échec définitif, {outcome['lost']} baux perdus")
+    return outcome
+
+def print_job_queue_status():
+    """Affiche le nombre de restaurants par état et les derniers échecs définitifs"""
+    jobs = get_job_queue()
+    if jobs is None:
+        print("❌ Impossible de se connecter à MongoDB")
+        return
+    counts = jobs.counts()
+    print(f"\n📋 FILE DE TRAVAIL ({DB_NAME}.{JOB_QUEUE_COLLECTION}):")
+    for state in job_queue.STATES:
+        print(f"   {state:<8}: {counts.get(state, 0)}")
+    failures = jobs.recent_failures()
+    if failures:
+        print("   Derniers échecs définitifs:")
+        for job in failures:
+            print(f"   ❌ {job.get('payload', {}).get('name', job['_id'])} "
+                  f"({job.get('attempts', 0)} tentatives): {job.get('last_error')}")
 
 def print_timing_stats():
     """Affiche les statistiques de timing pour aider à identifier les goulots d'étranglement"""
-    if not TIMING_STATS:
+    if not METRICS:
+        print_readiness_stats()
+        print_cache_stats()
+        print_api_budget(only_if_used=True)
         return
     
+    snapshot = METRICS.snapshot()
     print("\n📊 STATISTIQUES DE PERFORMANCE:")
-    print("=" * 80)
-    print(f"{'FONCTION':<40} | {'APPELS':<6} | {'MOYENNE (s)':<12} | {'MIN (s)':<10} | {'MAX (s)':<10}")
-    print("-" * 80)
+    print("=" * 100)
+    print(f"{'FONCTION':<40} | {'APPELS':<6} | {'MOY (s)':<8} | {'P50 (s)':<8} | {'P95 (s)':<8} | {'P99 (s)':<8} | {'MAX (s)':<8}")
+    print("-" * 100)
     
-    for func_name, times in sorted(TIMING_STATS.items(), key=lambda x: sum(x[1])/len(x[1]) if x[1] else 0, reverse=True):
-        if not times:
-            continue
-        avg_time = sum(times) / len(times)
-        min_time = min(times)
-        max_time = max(times)
-        print(f"{func_name:<40} | {len(times):<6} | {avg_time:<12.2f} | {min_time:<10.2f} | {max_time:<10.2f}")
+    for func_name, summary in sorted(snapshot["functions"].items(), key=lambda x: x[1]["sum"], reverse=True):
+        print(f"{func_name:<40} | {summary['count']:<6} | {summary['avg']:<8.2f} | {summary['p50']:<8.2f} | "
+              f"{summary['p95']:<8.2f} | {summary['p99']:<8.2f} | {summary['max']:<8.2f}")
     
-    print("=" * 80)
-    print("Les fonctions sont triées par temps moyen d'exécution (du plus lent au plus rapide)")
+    print("=" * 100)
+    print("Les fonctions sont triées par temps cumulé (du plus coûteux au moins coûteux)")
     print("Ces statistiques vous aideront à identifier les goulots d'étranglement du pipeline")
+    
+    events = [c for c in snapshot["counters"] if c["name"] in ("errors", "retries") and c["value"]]
+    if events:
+        print("\n🔁 Erreurs et nouvelles tentatives:")
+        for counter in events:
+            labels = ", ".join(f"{key}={value}" for key, value in counter["labels"].items())
+            print(f"   {counter['name']:<8} {labels:<50} {counter['value']}")
+    
+    if snapshot["slowest_calls"]:
+        print("\n🐢 Appels les plus lents:")
+        for call in snapshot["slowest_calls"][:10]:
+            trace = f" trace={call['trace_id']}" if call["trace_id"] else ""
+            restaurant = f" [{call['restaurant']}]" if call["restaurant"] else ""
+            print(f"   {call['seconds']:>8.2f}s {call['function']}{restaurant}{trace}")
+    
+    print_readiness_stats()
+    print_cache_stats()
+    print_api_budget(only_if_used=True)
 
 def parse_args():
     """
     Parse les arguments en ligne de commande
     """
-    global DEBUG_MODE, NUM_THREADS, USE_BRIGHTDATA, BRIGHTDATA_ENABLED
+    global DEBUG_MODE, NUM_THREADS, USE_BRIGHTDATA, BRIGHTDATA_ENABLED, USE_BULK_WRITE, BULK_WRITE_BATCH_SIZE
+    global USE_DRIVER_POOL, CHROME_RECYCLE_AFTER_PAGES
+    global USE_ASYNC_DISCOVERY, PLACES_QPS, PLACES_CONCURRENCY
+    global DISCOVERY_STRATEGY, QUADTREE_MIN_CELL_SIZE, QUADTREE_STATE_FILE, USE_GEO_COVERAGE, SKIP_COVERED_CELLS
+    global USE_NEARBY_CACHE, MAX_CACHE_SIZE
+    global USE_HTML_DISK_CACHE, HTML_DISK_CACHE_MAX_BYTES, HTML_CACHE_OFFLINE
+    global API_BUDGET_FILE, MAX_MAPS_API_REQUESTS
+    global USE_OCR, OCR_WORKERS, USE_IMAGE_STORE, IMAGE_STORE_BACKEND
+    global USE_STAGED_PIPELINE, PIPELINE_BROWSER_WORKERS, PIPELINE_FETCH_WORKERS, PIPELINE_QUEUE_SIZE
+    global SCREENSHOT_FORMAT, SCREENSHOT_QUALITY, SCREENSHOT_MAX_SIZE
+    global METRICS_FILE, METRICS_EXPORT_INTERVAL, BRIGHTDATA_CONCURRENCY
+    global PLATFORM_FETCH_CONCURRENCY, ENRICHMENT_DEADLINE, ENRICH_PLATFORM_DETAILS
+    global REFRESH_BATCH_SIZE, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, USE_DEDUP_INDEX
+    global USE_LLM_STRUCTURING, LLM_BATCH_SIZE
     
     parser = argparse.ArgumentParser(description="Pipeline de collecte et traitement des restaurants")
     
     # Ajouter des options de ligne de commande
     parser.add_argument("--debug", action="store_true", help="Activer le mode debug avec logs détaillés")
-    parser.add_argument("--threads", type=int, default=NUM_THREADS, help=f"Nombre de threads (défaut: {NUM_THREADS})")
+    parser.add_argument("--threads", type=int, default=None, help=f"Nombre de threads; avec le pipeline par étapes, sessions Chrome si --browsers est absent (défaut: {NUM_THREADS})")
     parser.add_argument("--max", type=int, default=None, help="Nombre maximum de restaurants à traiter")
     parser.add_argument("--start", type=int, default=0, help="Index de départ pour le traitement des restaurants")
     parser.add_argument("--brightdata", action="store_true", help="Utiliser BrightData pour contourner les mesures anti-bot")
@@ -1430,14 +4173,151 @@ def parse_args():
     parser.add_argument("--zones", type=int, default=None, help="Nombre de zones géographiques à traiter")
     parser.add_argument("--max-restaurants", type=int, default=None, help="Nombre maximum de restaurants à traiter")
     parser.add_argument("--test-area", action="store_true", help="Utiliser une petite zone de test")
+    # Options MongoDB
+    parser.add_argument("--mongo-uri", type=str, default=None, help="URI MongoDB à utiliser à la place de l'URI par défaut")
+    parser.add_argument("--mongo-pool-size", type=int, default=MONGO_MAX_POOL_SIZE, help=f"Taille maximale du pool de connexions MongoDB (défaut: {MONGO_MAX_POOL_SIZE})")
+    parser.add_argument("--no-bulk-write", action="store_true", help="Écrire chaque restaurant immédiatement au lieu de grouper les écritures")
+    parser.add_argument("--bulk-batch-size", type=int, default=BULK_WRITE_BATCH_SIZE, help=f"Nombre de documents par écriture groupée (défaut: {BULK_WRITE_BATCH_SIZE})")
+    parser.add_argument("--no-driver-pool", action="store_true", help="Lancer une session Chrome par restaurant au lieu de réutiliser un pool")
+    parser.add_argument("--driver-recycle-after", type=int, default=CHROME_RECYCLE_AFTER_PAGES, help=f"Redémarrer chaque session Chrome après N restaurants (défaut: {CHROME_RECYCLE_AFTER_PAGES})")
+    parser.add_argument("--sync-discovery", action="store_true", help="Balayer la grille Nearby Search séquentiellement (ancien comportement)")
+    parser.add_argument("--places-qps", type=float, default=PLACES_QPS, help=f"Requêtes Nearby Search par seconde (défaut: {PLACES_QPS})")
+    parser.add_argument("--places-concurrency", type=int, default=PLACES_CONCURRENCY, help=f"Requêtes Nearby Search simultanées (défaut: {PLACES_CONCURRENCY})")
+    parser.add_argument("--discovery-strategy", choices=["quadtree", "grid"], default=DISCOVERY_STRATEGY, help=f"Stratégie de balayage Nearby Search (défaut: {DISCOVERY_STRATEGY})")
+    parser.add_argument("--quadtree-min-cell", type=float, default=QUADTREE_MIN_CELL_SIZE, help=f"Côté minimum d'une cellule en degrés (défaut: {QUADTREE_MIN_CELL_SIZE})")
+    parser.add_argument("--quadtree-state", type=str, default=QUADTREE_STATE_FILE, help=f"Fichier de reprise du balayage adaptatif (défaut: {QUADTREE_STATE_FILE})")
+    parser.add_argument("--no-geo-coverage", action="store_true", help="Ne pas découper les cellules d'après les restaurants déjà présents dans producers")
+    parser.add_argument("--skip-covered-cells", action="store_true", help=f"Ne pas interroger les cellules minimales comptant déjà {COVERED_CELL_MIN_PRODUCERS} restaurants dans producers")
+    parser.add_argument("--reset-discovery", action="store_true", help="Ignorer l'état sauvegardé et recommencer le balayage adaptatif")
+    parser.add_argument("--no-nearby-cache", action="store_true", help="Ne pas utiliser le cache persistant des réponses Nearby Search")
+    parser.add_argument("--no-html-cache", action="store_true", help="Ne pas conserver les pages BrightData (TheFork, TripAdvisor, Bing) sur disque")
+    parser.add_argument("--html-cache-max-mb", type=int, default=HTML_DISK_CACHE_MAX_BYTES // (1024 * 1024), help="Taille maximale du cache disque des pages, en Mo compressés")
+    parser.add_argument("--offline", action="store_true", help="Rejouer les pages depuis le cache disque sans aucune requête BrightData (mise au point des parsers)")
+    parser.add_argument("--cache-size", type=int, default=MAX_CACHE_SIZE, help=f"Nombre maximum d'entrées par cache (défaut: {MAX_CACHE_SIZE})")
+    parser.add_argument("--screenshot-format", choices=["jpeg", "webp", "png"], default=SCREENSHOT_FORMAT.lower(), help=f"Format des images stockées (défaut: {SCREENSHOT_FORMAT.lower()})")
+    parser.add_argument("--screenshot-quality", type=int, default=SCREENSHOT_QUALITY, help=f"Qualité JPEG/WebP des images stockées (défaut: {SCREENSHOT_QUALITY})")
+    parser.add_argument("--screenshot-max-size", type=int, default=max(SCREENSHOT_MAX_SIZE), help=f"Côté maximum (px) des images stockées (défaut: {max(SCREENSHOT_MAX_SIZE)})")
+    parser.add_argument("--use-image-store", action="store_true", help="Remplacer les images base64 des documents par des références vers le stockage d'images")
+    parser.add_argument("--image-store", choices=["filesystem", "gridfs"], default=IMAGE_STORE_BACKEND, help=f"Backend du stockage d'images (défaut: {IMAGE_STORE_BACKEND})")
+    parser.add_argument("--no-staged", action="store_true", help="Exécuter toutes les étapes d'un restaurant dans un même thread (--threads)")
+    parser.add_argument("--browsers", type=int, default=None, help=f"Sessions Chrome en parallèle dans le pipeline (défaut: --threads, sinon {PIPELINE_BROWSER_WORKERS})")
+    parser.add_argument("--fetchers", type=int, default=PIPELINE_FETCH_WORKERS, help=f"Requêtes d'enrichissement simultanées (défaut: {PIPELINE_FETCH_WORKERS})")
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE, help=f"Taille des files entre étapes (défaut: {PIPELINE_QUEUE_SIZE})")
+    parser.add_argument("--no-ocr", action="store_true", help="Ne pas passer le panneau Google Maps à l'OCR")
+    parser.add_argument("--ocr-workers", type=int, default=OCR_WORKERS, help=f"Processus OCR parallèles (défaut: {OCR_WORKERS})")
+    parser.add_argument("--llm-structuring", action="store_true", help="Structurer le texte OCR avec OpenAI (adresse, site, prix, catégorie) pour compléter les champs manquants")
+    parser.add_argument("--llm-batch-size", type=int, default=LLM_BATCH_SIZE, help=f"Restaurants structurés par requête OpenAI (défaut: {LLM_BATCH_SIZE}, 1 = une requête par restaurant)")
+    parser.add_argument("--api-budget", action="store_true", help="Afficher la consommation du jour de chaque API puis quitter")
+    parser.add_argument("--api-budget-file", type=str, default=API_BUDGET_FILE, help=f"Fichier de consommation quotidienne des API (défaut: {API_BUDGET_FILE})")
+    parser.add_argument("--api-limit", action="append", default=[], metavar="API=N", help="Quota quotidien d'une API (places, brightdata, bing, openai), ex: --api-limit places=800")
+    parser.add_argument("--brightdata-concurrency", type=int, default=BRIGHTDATA_CONCURRENCY, help=f"Requêtes BrightData simultanées par zone (défaut: {BRIGHTDATA_CONCURRENCY})")
+    parser.add_argument("--platform-concurrency", type=int, default=PLATFORM_FETCH_CONCURRENCY, help=f"Extractions Bing/TheFork/TripAdvisor simultanées, tous restaurants confondus (défaut: {PLATFORM_FETCH_CONCURRENCY})")
+    parser.add_argument("--enrich-deadline", type=int, default=ENRICHMENT_DEADLINE, help=f"Secondes d'enrichissement par restaurant avant sauvegarde des résultats partiels (défaut: {ENRICHMENT_DEADLINE})")
+    parser.add_argument("--platform-details", action="store_true", help="Extraire aussi les pages TheFork et TripAdvisor (jusqu'à 2 requêtes BrightData de plus par restaurant)")
+    parser.add_argument("--metrics-file", type=str, default=METRICS_FILE, help="Exporter les métriques pendant l'exécution (.json, sinon format Prometheus)")
+    parser.add_argument("--metrics-interval", type=int, default=METRICS_EXPORT_INTERVAL, help=f"Secondes entre deux exports des métriques (défaut: {METRICS_EXPORT_INTERVAL})")
+    parser.add_argument("--refresh", type=int, nargs="?", const=REFRESH_BATCH_SIZE, default=None, metavar="N", help=f"Rafraîchir les N restaurants les plus périmés (défaut: {REFRESH_BATCH_SIZE}) au lieu d'un balayage")
+    parser.add_argument("--refresh-ttl", action="append", default=[], metavar="GROUPE=HEURES", help=f"Durée de validité d'un groupe de champs ({', '.join(REFRESH_FIELD_GROUPS)}), ex: --refresh-ttl rating=12")
+    parser.add_argument("--enqueue", action="store_true", help="Mettre les restaurants (fichier, zones, zone de test, --refresh) dans la file durable au lieu de les traiter")
+    parser.add_argument("--worker", type=int, nargs="?", const=0, default=None, metavar="N", help="Traiter la file durable jusqu'à ce qu'elle soit vide (au plus N restaurants); lançable sur plusieurs machines")
+    parser.add_argument("--queue-status", action="store_true", help="Afficher l'état de la file durable puis quitter")
+    parser.add_argument("--requeue-failed", action="store_true", help="Remettre en attente les restaurants de la file en échec définitif")
+    parser.add_argument("--lease-seconds", type=int, default=JOB_LEASE_SECONDS, help=f"Bail d'un restaurant réservé avant reprise par un autre worker (défaut: {JOB_LEASE_SECONDS})")
+    parser.add_argument("--max-attempts", type=int, default=JOB_MAX_ATTEMPTS, help=f"Tentatives par restaurant avant échec définitif (défaut: {JOB_MAX_ATTEMPTS})")
+    parser.add_argument("--no-dedup", action="store_true", help="Ne pas rattacher les restaurants aux fiches existantes similaires (nom proche à moins de 80 m)")
+    parser.add_argument("--merge-duplicates", action="store_true", help="Fusionner les doublons déjà présents dans producers puis quitter")
+    parser.add_argument("--merge-dry-run", action="store_true", help="Avec --merge-duplicates: afficher les doublons sans rien modifier")
+    parser.add_argument("--benchmark-parsing", action="store_true", help="Comparer les backends de parsing sur les pages du cache disque (TheFork, TripAdvisor, Bing)")
+    parser.add_argument("--check-discovery", action="store_true", help="Vérifier hors ligne les règles de reprise du balayage adaptatif (cellules incomplètes non marquées terminées)")
+    parser.add_argument("--benchmark-mongo", action="store_true", help="Comparer connexion par appel et pool partagé (ex: --mongo-uri mongodb://localhost:27017)")
+    parser.add_argument("--benchmark-iterations", type=int, default=50, help="Nombre d'itérations pour les benchmarks")
     
     args = parser.parse_args()
+    threads_given = args.threads is not None
+    if not threads_given:
+        args.threads = NUM_THREADS
     
     # Mettre à jour les variables globales selon les arguments
     DEBUG_MODE = args.debug
     NUM_THREADS = args.threads
-    USE_BRIGHTDATA = args.brightdata
-    BRIGHTDATA_ENABLED = args.brightdata
+    # Le mode hors ligne rejoue l'enrichissement BrightData depuis le cache disque
+    USE_BRIGHTDATA = args.brightdata or args.offline
+    BRIGHTDATA_ENABLED = USE_BRIGHTDATA
+    USE_BULK_WRITE = not args.no_bulk_write
+    BULK_WRITE_BATCH_SIZE = args.bulk_batch_size
+    USE_DRIVER_POOL = not args.no_driver_pool
+    CHROME_RECYCLE_AFTER_PAGES = max(1, args.driver_recycle_after)
+    USE_ASYNC_DISCOVERY = not args.sync_discovery
+    if USE_ASYNC_DISCOVERY and httpx is None:
+        print("⚠️ Module httpx non disponible: balayage séquentiel utilisé (pip install httpx pour le balayage concurrent)")
+        USE_ASYNC_DISCOVERY = False
+    PLACES_QPS = max(0.1, args.places_qps)
+    PLACES_CONCURRENCY = max(1, args.places_concurrency)
+    SCREENSHOT_FORMAT = args.screenshot_format.upper()
+    SCREENSHOT_QUALITY = min(95, max(1, args.screenshot_quality))
+    SCREENSHOT_MAX_SIZE = (max(1, args.screenshot_max_size), max(1, args.screenshot_max_size))
+    USE_IMAGE_STORE = USE_IMAGE_STORE or args.use_image_store
+    IMAGE_STORE_BACKEND = args.image_store
+    USE_STAGED_PIPELINE = not args.no_staged
+    # Le pipeline par étapes n'a pas de threads "tout-en-un": --threads règle les sessions Chrome
+    if args.browsers is not None:
+        PIPELINE_BROWSER_WORKERS = max(1, args.browsers)
+        if threads_given and USE_STAGED_PIPELINE:
+            print(f"⚠️ --threads ignoré par le pipeline par étapes: {PIPELINE_BROWSER_WORKERS} sessions Chrome (--browsers)")
+    elif threads_given:
+        PIPELINE_BROWSER_WORKERS = max(1, args.threads)
+    PIPELINE_FETCH_WORKERS = max(1, args.fetchers)
+    PIPELINE_QUEUE_SIZE = max(1, args.queue_size)
+    USE_OCR = not args.no_ocr
+    OCR_WORKERS = max(1, args.ocr_workers)
+    USE_LLM_STRUCTURING = args.llm_structuring and USE_OCR
+    LLM_BATCH_SIZE = max(1, args.llm_batch_size)
+    BRIGHTDATA_CONCURRENCY = max(1, args.brightdata_concurrency)
+    PLATFORM_FETCH_CONCURRENCY = max(1, args.platform_concurrency)
+    ENRICHMENT_DEADLINE = max(1, args.enrich_deadline)
+    ENRICH_PLATFORM_DETAILS = args.platform_details
+    METRICS_FILE = args.metrics_file
+    METRICS_EXPORT_INTERVAL = max(1, args.metrics_interval)
+    API_BUDGET_FILE = args.api_budget_file
+    API_BUDGET.use_state_file(API_BUDGET_FILE)
+    API_BUDGET.configure("places", rate=PLACES_QPS, burst=PLACES_QPS)
+    for spec in args.api_limit:
+        api, _, limit = spec.partition("=")
+        if not limit.isdigit():
+            parser.error(f"--api-limit attend API=N, reçu: {spec}")
+        API_BUDGET.configure(api.strip(), daily_limit=int(limit))
+        if api.strip() == "places":
+            MAX_MAPS_API_REQUESTS = int(limit)
+    for spec in args.refresh_ttl:
+        group, _, hours = spec.partition("=")
+        if group.strip() not in REFRESH_FIELD_GROUPS or not hours.replace(".", "", 1).isdigit():
+            parser.error(f"--refresh-ttl attend GROUPE=HEURES avec GROUPE parmi {', '.join(REFRESH_FIELD_GROUPS)}, reçu: {spec}")
+        REFRESH_TTLS[group.strip()] = float(hours) * 3600
+    if args.refresh is not None:
+        REFRESH_BATCH_SIZE = max(1, args.refresh)
+    JOB_LEASE_SECONDS = max(30, args.lease_seconds)
+    JOB_MAX_ATTEMPTS = max(1, args.max_attempts)
+    USE_DEDUP_INDEX = not args.no_dedup
+    USE_NEARBY_CACHE = not args.no_nearby_cache
+    USE_HTML_DISK_CACHE = not args.no_html_cache
+    HTML_DISK_CACHE_MAX_BYTES = max(1, args.html_cache_max_mb) * 1024 * 1024
+    HTML_CACHE_OFFLINE = args.offline
+    MAX_CACHE_SIZE = max(1, args.cache_size)
+    for cache in (SEARCH_CACHE, HTML_CACHE, BING_SEARCH_CACHE):
+        cache.max_size = MAX_CACHE_SIZE
+    DISCOVERY_STRATEGY = args.discovery_strategy
+    QUADTREE_MIN_CELL_SIZE = args.quadtree_min_cell
+    QUADTREE_STATE_FILE = args.quadtree_state
+    USE_GEO_COVERAGE = not args.no_geo_coverage
+    SKIP_COVERED_CELLS = args.skip_covered_cells
+    if args.reset_discovery:
+        for state_file in (QUADTREE_STATE_FILE, AdaptiveQuadtreeSweeper.places_file_for(QUADTREE_STATE_FILE)):
+            if os.path.exists(state_file):
+                os.remove(state_file)
+                print(f"🗑️ État de balayage supprimé: {state_file}")
+    
+    # Configurer le pool MongoDB partagé (le client reste créé à la première utilisation)
+    MONGO_MANAGER.configure(uri=args.mongo_uri, max_pool_size=args.mongo_pool_size)
     
     return args
 
@@ -1451,28 +4331,118 @@ def main():
     """
     global USE_BRIGHTDATA, BRIGHTDATA_ENABLED
     
-    # Créer les dossiers nécessaires
-    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
-    
     # Enregistrer la fonction de nettoyage
     atexit.register(cleanup_temp_dirs)
     
     # Parser les arguments
     args = parse_args()
     
+    # Consommation des API: permet de dimensionner un lancement
+    if args.api_budget:
+        print_api_budget()
+        return
+    
+    # Afficher les statistiques de performance en fin d'exécution
+    atexit.register(print_timing_stats)
+    start_metrics_exporter()
+    
     # Configurer les options en fonction des arguments
-    USE_BRIGHTDATA = args.brightdata
-    BRIGHTDATA_ENABLED = args.brightdata
+    USE_BRIGHTDATA = args.brightdata or args.offline
+    BRIGHTDATA_ENABLED = USE_BRIGHTDATA
     DEBUG_MODE = args.debug
     
+    # Vérification hors ligne du balayage adaptatif (réponses simulées)
+    if args.check_discovery:
+        if not check_quadtree_resume_rules():
+            raise SystemExit(1)
+        return
+    
+    # Mode benchmark MongoDB: mesure puis quitte
+    if args.benchmark_mongo:
+        benchmark_mongodb_connections(iterations=args.benchmark_iterations, num_threads=args.threads)
+        return
+    
+    # Mode benchmark parsing: pages déjà récupérées, aucune requête réseau
+    if args.benchmark_parsing:
+        disk_cache = get_html_disk_cache()
+        pages = disk_cache.sample_pages() if disk_cache is not None else {}
+        if not pages:
+            print(f"❌ Aucune page dans le cache disque ({HTML_DISK_CACHE_FILE}): lancer d'abord un enrichissement BrightData")
+            return
+        # Un parsing de page rendue coûte bien plus qu'un aller-retour MongoDB: 10x moins de passes
+        html_parsing.benchmark_parsing(pages, iterations=max(1, args.benchmark_iterations // 10))
+        return
+    
+    # Fusion des doublons existants (traitement par lots, sans collecte)
+    if args.merge_duplicates:
+        collection = get_producers_collection()
+        if collection is None:
+            print("❌ Impossible de se connecter à MongoDB")
+            return
+        stats = restaurant_dedup.merge_duplicates(collection, dry_run=args.merge_dry_run)
+        print(f"✅ {stats['groups']} groupes de doublons, {stats['removed']} documents "
+              f"{'à supprimer' if args.merge_dry_run else 'supprimés'} sur {stats['documents']}")
+        return
+    
+    # Index MongoDB (existence et 2dsphere) vérifiés dès le démarrage
+    ensure_producers_indexes()
+    
+    # File de travail durable: état, reprise des échecs, worker
+    if args.queue_status or args.requeue_failed:
+        if args.requeue_failed:
+            jobs = get_job_queue()
+            if jobs is not None:
+                print(f"↩️ {jobs.requeue_failed()} restaurants en échec remis en attente")
+        print_job_queue_status()
+        return
+    if args.worker is not None:
+        drain_job_queue(max_jobs=args.worker or None)
+        print_job_queue_status()
+        return
+    
     # Vérifier le contenu de MongoDB avant de commencer
     check_mongodb_content()
     
+    # Rafraîchissement incrémental: seuls les restaurants (et champs) périmés sont retraités
+    if args.refresh is not None:
+        print(f"\n📋 Rafraîchissement des {REFRESH_BATCH_SIZE} restaurants les plus périmés")
+        print("   Validité: " + ", ".join(f"{group} {ttl / 3600:g}h" for group, ttl in REFRESH_TTLS.items()))
+        restaurants = select_stale_restaurants(limit=REFRESH_BATCH_SIZE)
+        if not restaurants:
+            print("✅ Aucun restaurant périmé, rien à rafraîchir")
+            return
+        stale_counts = defaultdict(int)
+        for restaurant in restaurants:
+            for group in restaurant["_refresh_groups"]:
+                stale_counts[group] += 1
+        print(f"🔄 {len(restaurants)} restaurants à rafraîchir (" +
+              ", ".join(f"{group}: {count}" for group, count in sorted(stale_counts.items())) + ")")
+        if args.enqueue:
+            # Les restaurants déjà rafraîchis par la file sont "done": les remettre en attente
+            enqueue_restaurants(restaurants, requeue_done=True)
+            return
+        process_restaurants_with_threadpool(restaurants, num_threads=args.threads, skip_existing=False)
+        return
+    
     # Traitement spécial pour le mode test-area
     if args.test_area:
         print("\n📋 Mode zone de test activé")
         test_zone = get_small_test_area()
-        restaurants = get_restaurants_in_zone(test_zone)
+        if args.enqueue:
+            if USE_ASYNC_DISCOVERY:
+                enqueue_restaurants(stream_discovered_restaurants([test_zone], max_places=args.max_restaurants))
+            else:
+                enqueue_restaurants(get_restaurants_in_zone(test_zone)[:args.max_restaurants])
+            return
+        if USE_ASYNC_DISCOVERY and USE_STAGED_PIPELINE:
+            # Les restaurants entrent dans le pipeline dès leur découverte
+            process_restaurants_staged(stream_discovered_restaurants([test_zone], max_places=args.max_restaurants),
+                                       skip_existing=False)
+            return
+        if USE_ASYNC_DISCOVERY:
+            restaurants = sweep_restaurants_async([test_zone], max_places=args.max_restaurants)
+        else:
+            restaurants = get_restaurants_in_zone(test_zone)
         
         # Limiter si nécessaire
         if args.max_restaurants:
@@ -1490,17 +4460,34 @@ def main():
         limited_zones = zones[:args.zones]
         
         all_restaurants = []
-        for i, zone in enumerate(limited_zones):
-            print(f"📍 Traitement de la zone {i+1}/{len(limited_zones)}")
-            zone_restaurants = get_restaurants_in_zone(zone)
-            all_restaurants.extend(zone_restaurants)
-            
-            if args.max_restaurants and len(all_restaurants) >= args.max_restaurants:
-                all_restaurants = all_restaurants[:args.max_restaurants]
-                print(f"🔄 Nombre de restaurants limité à {args.max_restaurants} - arrêt du traitement de zones")
-                break
+        if args.enqueue and USE_ASYNC_DISCOVERY:
+            # Les restaurants découverts sont mis en file au fil du balayage
+            enqueue_restaurants(stream_discovered_restaurants(limited_zones, max_places=args.max_restaurants),
+                                skip_existing=args.skip_existing)
+            return
+        if USE_ASYNC_DISCOVERY and USE_STAGED_PIPELINE:
+            # Découverte et traitement se recouvrent: le pipeline consomme le balayage au fil de l'eau
+            process_restaurants_staged(stream_discovered_restaurants(limited_zones, max_places=args.max_restaurants),
+                                       skip_existing=args.skip_existing)
+            return
+        if USE_ASYNC_DISCOVERY:
+            # Balayage concurrent, arrêté dès que la limite de restaurants est atteinte
+            all_restaurants = sweep_restaurants_async(limited_zones, max_places=args.max_restaurants)
+        else:
+            for i, zone in enumerate(limited_zones):
+                print(f"📍 Traitement de la zone {i+1}/{len(limited_zones)}")
+                zone_restaurants = get_restaurants_in_zone(zone)
+                all_restaurants.extend(zone_restaurants)
+                
+                if args.max_restaurants and len(all_restaurants) >= args.max_restaurants:
+                    all_restaurants = all_restaurants[:args.max_restaurants]
+                    print(f"🔄 Nombre de restaurants limité à {args.max_restaurants} - arrêt du traitement de zones")
+                    break
                 
         print(f"✅ Total de {len(all_restaurants)} restaurants récupérés dans {len(limited_zones)} zones")
+        if args.enqueue:
+            enqueue_restaurants(all_restaurants, skip_existing=args.skip_existing)
+            return
         process_restaurants_with_threadpool(all_restaurants, num_threads=args.threads, skip_existing=args.skip_existing)
         return
     
@@ -1533,17 +4520,27 @@ def main():
         end_idx = total_restaurants
         
     restaurants_to_process = restaurants[start_idx:end_idx]
+    if args.enqueue:
+        enqueue_restaurants(restaurants_to_process, skip_existing=args.skip_existing)
+        return
     print(f"🔄 Traitement de {len(restaurants_to_process)} restaurants (#{start_idx} à #{end_idx-1})")
     
     # Traiter les restaurants
     start_time = time.time()
     
-    if args.threads > 1:
+    if USE_STAGED_PIPELINE:
+        success_count, _ = process_restaurants_staged(restaurants_to_process, skip_existing=False)
+    elif args.threads > 1:
         print(f"⚙️ Utilisation de {args.threads} threads parallèles")
+        if USE_BULK_WRITE:
+            start_bulk_writer()
         with ThreadPoolExecutor(max_workers=args.threads) as executor:
             results = list(executor.map(process_restaurant, restaurants_to_process))
         
         success_count = sum(1 for r in results if r)
+        bulk_stats = stop_bulk_writer()
+        if bulk_stats:
+            success_count = max(0, success_count - bulk_stats["failed"])
     else:
         print("⚙️ Traitement séquentiel")
         success_count = 0
@@ -1566,9 +4563,10 @@ def test_mongodb_results(restaurant_name):
     Teste et affiche les résultats d'un restaurant dans MongoDB
     """
     try:
-        client = get_mongo_client()
-        db = client[DB_NAME]
-        collection = db[COLLECTION_NAME]
+        collection = get_producers_collection()
+        if collection is None:
+            print("❌ Impossible de se connecter à MongoDB")
+            return
         
         # Rechercher le restaurant
         restaurant = collection.find_one({"name": restaurant_name})
@@ -1612,25 +4610,71 @@ def test_mongodb_results(restaurant_name):
         
     except Exception as e:
         print(f"❌ Erreur lors de la vérification MongoDB: {str(e)}")
-    finally:
-        client.close()
+
+def benchmark_mongodb_connections(iterations=50, num_threads=NUM_THREADS):
+    """
+    Compare l'ancien schéma (une connexion par vérification) au pool partagé
+    
+    À lancer contre une instance locale (ex: mongod sur localhost) pour ne pas
+    solliciter Atlas: --benchmark-mongo --mongo-uri mongodb://localhost:27017
+    
+    Args:
+        iterations: Nombre de vérifications à effectuer pour chaque mode
+        num_threads: Nombre de threads simulant les workers du pipeline
+    
+    Returns:
+        Dictionnaire {mode: durée totale en secondes}
+    """
+    uri = MONGO_MANAGER.uri
+    print(f"\n⏱️ Benchmark MongoDB sur {uri.split('@')[-1]} ({iterations} requêtes, {num_threads} threads)")
+    
+    query = {"name": "__benchmark__", "place_id": "__benchmark__"}
+    
+    def connect_per_call(_):
+        # Reproduit l'ancien comportement: connexion, test, requête, fermeture
+        client = MongoClient(uri, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+        try:
+            client.server_info()
+            client[DB_NAME][COLLECTION_NAME].find_one(query)
+        finally:
+            client.close()
+    
+    def pooled(_):
+        get_producers_collection().find_one(query)
+    
+    results = {}
+    for label, func in [("connexion par appel", connect_per_call), ("pool partagé", pooled)]:
+        try:
+            if func is pooled and get_producers_collection() is None:
+                print("❌ Impossible d'initialiser le pool MongoDB")
+                return results
+            start_time = time.time()
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                list(executor.map(func, range(iterations)))
+            elapsed = time.time() - start_time
+            results[label] = elapsed
+            print(f"  {label:<22}: {elapsed:.2f}s au total, {elapsed / iterations * 1000:.1f} ms/requête")
+        except Exception as e:
+            print(f"❌ Erreur pendant le benchmark ({label}): {str(e)}")
+            return results
+    
+    if results.get("pool partagé"):
+        speedup = results["connexion par appel"] / results["pool partagé"]
+        print(f"📊 Gain du pool partagé: x{speedup:.1f}")
+    
+    return results
 
 # Configuration globale
 DEBUG_MODE = False  # Mode debug avec logs détaillés
 USE_BRIGHTDATA = False  # Utilisation de BrightData pour contourner les mesures anti-bot
 MAX_MAPS_API_REQUESTS = 500  # Limite quotidienne de requêtes Google Maps API
-MAPS_API_REQUEST_COUNT = 0  # Compteur de requêtes Google Maps API
 NUM_THREADS = 4  # Nombre de threads par défaut pour le traitement parallèle
 
 # Timeout pour les opérations réseau
 NETWORK_TIMEOUT = 30  # Timeout en secondes pour les requêtes réseau
 
-# Dictionnaire global pour stocker les statistiques de timing
-TIMING_STATS = defaultdict(list)
-
-# Dossier pour les captures d'écran
+# Dossier des captures d'écran conservées en mode debug (créé à la première écriture)
 SCREENSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screenshots")
-os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 
 # Fonction pour nettoyer les répertoires temporaires
 def cleanup_temp_directories():
@@ -1679,12 +4723,15 @@ class ChromeSessionManager:
     """
     Gère une session Chrome pour les interactions avec les sites web
     """
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, user_data_dir=None):
         self.driver = None
         self.service = None
         self.temp_dir = None
         self.headless = headless
         self.max_retries = 3
+        # Profil Chrome imposé (réutilisé par le pool pour conserver les cookies)
+        self.user_data_dir = user_data_dir
+        self.pages_loaded = 0
     
     def __enter__(self):
         """Démarre une session Chrome"""
@@ -1694,9 +4741,14 @@ class ChromeSessionManager:
         
         for attempt in range(self.max_retries):
             try:
-                # Créer un répertoire temporaire pour les données Chrome
-                self.temp_dir = tempfile.mkdtemp(prefix="chrome_session_")
-                cleanup_temp_dirs.temp_dirs.append(self.temp_dir)
+                if attempt > 0:
+                    record_retry("chrome_session")
+                # Créer un répertoire temporaire pour les données Chrome (sauf profil imposé)
+                if self.user_data_dir:
+                    self.temp_dir = self.user_data_dir
+                else:
+                    self.temp_dir = tempfile.mkdtemp(prefix="chrome_session_")
+                    cleanup_temp_dirs.temp_dirs.append(self.temp_dir)
                 
                 print(f"🔧 Chrome utilise le répertoire: {self.temp_dir}")
                 
@@ -1733,7 +4785,9 @@ class ChromeSessionManager:
                 
                 # Configurer les timeouts
                 self.driver.set_page_load_timeout(30)
-                self.driver.implicitly_wait(10)
+                # Pas d'attente implicite: chaque find_elements vide coûterait 10s,
+                # les attentes passent par wait_for_maps_condition (conditions explicites)
+                self.driver.implicitly_wait(0)
                 
                 return self
             except Exception as e:
@@ -1761,6 +4815,312 @@ class ChromeSessionManager:
         except Exception as e:
             print(f"⚠️ Erreur lors du nettoyage Chrome: {str(e)}")
 
+def handle_google_consent(driver, timeout=5):
+    """
+    Accepte le bandeau de consentement Google une seule fois par session Chrome
+    
+    Les sessions du pool conservent leur profil: une fois le consentement
+    traité, les pages suivantes n'attendent plus le bouton.
+    
+    Args:
+        driver: WebDriver Selenium
+        timeout: Délai d'attente maximum du bouton (secondes)
+    
+    Returns:
+        True si un bouton de consentement a été cliqué
+    """
+    session_id = getattr(driver, "session_id", None)
+    if session_id and session_id in CONSENT_HANDLED_SESSIONS:
+        return False
+    
+    clicked = False
+    try:
+        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable(
+            (By.XPATH, "//button[contains(., 'Accepter') or contains(., 'Accept')]")
+        )).click()
+        clicked = True
+        print("✅ Consentement accepté")
+    except Exception:
+        if DEBUG_MODE:
+            print("⚠️ Aucun consentement à gérer")
+    
+    if session_id:
+        CONSENT_HANDLED_SESSIONS.add(session_id)
+    return clicked
+
+# Sessions Chrome pour lesquelles le consentement a déjà été traité
+CONSENT_HANDLED_SESSIONS = set()
+
+class ChromeDriverPool:
+    """
+    Pool borné de sessions Chrome réutilisées d'un restaurant à l'autre
+    
+    Chaque worker emprunte une session chaude au lieu de relancer Chrome.
+    Les sessions sont vérifiées avant d'être prêtées, recyclées après
+    recycle_after pages, et remplacées si Chrome a planté. Le profil
+    (cookies de consentement inclus) est conservé lors d'un recyclage.
+    """
+    def __init__(self, max_size=NUM_THREADS, recycle_after=CHROME_RECYCLE_AFTER_PAGES, headless=True):
+        self.max_size = max_size
+        self.recycle_after = recycle_after
+        self.headless = headless
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._free_profiles = queue.Queue()
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "crashed": 0}
+    
+    def acquire(self, timeout=None):
+        """
+        Emprunte une session Chrome (attend si toutes sont occupées)
+        
+        Returns:
+            ChromeSessionManager dont le driver peut être None si Chrome n'a pas pu démarrer
+        """
+        acquired = self._slots.acquire(timeout=timeout) if timeout else self._slots.acquire()
+        if not acquired:
+            raise TimeoutError("Aucune session Chrome disponible")
+        
+        try:
+            session = None
+            while session is None:
+                try:
+                    session = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if not self._is_healthy(session):
+                    print("⚠️ Session Chrome inutilisable, remplacement")
+                    self.stats["crashed"] += 1
+                    self._discard(session, keep_profile=False)
+                    session = None
+            
+            if session is None:
+                session = self._create_session()
+            else:
+                self.stats["reused"] += 1
+            
+            session.pages_loaded += 1
+            return session
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, session, healthy=True):
+        """
+        Rend une session au pool, ou la ferme si elle est usée ou plantée
+        
+        Args:
+            session: Session empruntée via acquire()
+            healthy: False si une erreur Selenium a eu lieu pendant l'utilisation
+        """
+        try:
+            if not healthy or not session.driver:
+                self.stats["crashed"] += 1
+                self._discard(session, keep_profile=False)
+            elif self._closed:
+                self._discard(session, keep_profile=False)
+            elif session.pages_loaded >= self.recycle_after:
+                if DEBUG_MODE:
+                    print(f"♻️ Recyclage d'une session Chrome après {session.pages_loaded} pages")
+                self.stats["recycled"] += 1
+                self._discard(session, keep_profile=True)
+            else:
+                self._idle.put(session)
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        """Ferme toutes les sessions Chrome du pool"""
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(session, keep_profile=False)
+        if DEBUG_MODE:
+            print(f"📊 Pool Chrome: {self.stats}")
+    
+    def _create_session(self):
+        try:
+            profile = self._free_profiles.get_nowait()
+            # Un Chrome arrêté proprement peut laisser ses verrous de profil
+            for lock_file in glob.glob(os.path.join(profile, "Singleton*")):
+                try:
+                    os.remove(lock_file)
+                except OSError:
+                    pass
+        except queue.Empty:
+            profile = tempfile.mkdtemp(prefix="chrome_session_")
+            if not hasattr(cleanup_temp_dirs, "temp_dirs"):
+                cleanup_temp_dirs.temp_dirs = []
+            cleanup_temp_dirs.temp_dirs.append(profile)
+        
+        session = ChromeSessionManager(headless=self.headless, user_data_dir=profile)
+        session.__enter__()
+        with self._lock:
+            self._sessions.add(session)
+        self.stats["created"] += 1
+        return session
+    
+    def _discard(self, session, keep_profile):
+        with self._lock:
+            self._sessions.discard(session)
+        session.cleanup()
+        if keep_profile and session.user_data_dir and not self._closed:
+            self._free_profiles.put(session.user_data_dir)
+    
+    def _is_healthy(self, session):
+        if not session.driver:
+            return False
+        try:
+            session.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+# Pool de sessions Chrome partagé (créé à la première utilisation)
+CHROME_POOL = None
+CHROME_POOL_LOCK = threading.Lock()
+
+def get_chrome_pool():
+    """
+    Retourne le pool de sessions Chrome, dimensionné sur le nombre de workers
+    navigateur (PIPELINE_BROWSER_WORKERS, ou NUM_THREADS sans pipeline par étapes)
+    """
+    global CHROME_POOL
+    if CHROME_POOL is None:
+        with CHROME_POOL_LOCK:
+            if CHROME_POOL is None:
+                pool_size = PIPELINE_BROWSER_WORKERS if USE_STAGED_PIPELINE else NUM_THREADS
+                CHROME_POOL = ChromeDriverPool(max_size=max(1, pool_size), recycle_after=CHROME_RECYCLE_AFTER_PAGES)
+    return CHROME_POOL
+
+def close_chrome_pool():
+    """Ferme le pool de sessions Chrome s'il a été créé"""
+    global CHROME_POOL
+    pool = CHROME_POOL
+    CHROME_POOL = None
+    if pool is not None:
+        pool.close()
+
+atexit.register(close_chrome_pool)
+
+@contextmanager
+def chrome_session():
+    """
+    Fournit une session Chrome: empruntée au pool, ou dédiée si le pool est désactivé
+    
+    Usage identique à ChromeSessionManager: `with chrome_session() as session: session.driver...`
+    """
+    if not USE_DRIVER_POOL:
+        with ChromeSessionManager() as session:
+            yield session
+        return
+    
+    pool = get_chrome_pool()
+    session = pool.acquire()
+    healthy = True
+    try:
+        yield session
+    except WebDriverException:
+        healthy = False
+        raise
+    finally:
+        pool.release(session, healthy=healthy)
+
+# Durées réelles des attentes DOM par étape (histogrammes bornés en mémoire)
+READINESS_STATS = defaultdict(LatencyHistogram)
+READINESS_STATS_LOCK = threading.Lock()
+
+# Dernière URL demandée par session Chrome (Google Maps réécrit l'URL après chargement)
+LAST_REQUESTED_URLS = {}
+
+# Conditions DOM attendues pour chaque étape de chargement d'une fiche Google Maps
+MAPS_READY_CONDITIONS = {
+    "place_title": (By.CSS_SELECTOR, "h1.DUwDvf"),
+    "info_panel": (By.CSS_SELECTOR, "button[data-item-id], a[data-item-id]"),
+    "hours_button": (By.CSS_SELECTOR, "button[data-item-id='oh'], div[aria-label*='horaires'], button[aria-label*='horaires'], button[aria-label*='hours']"),
+    "hours_table": (By.CSS_SELECTOR, "table tr, div.section-info-hour-row"),
+}
+
+def record_readiness(step, duration, ready):
+    """Enregistre la durée réelle d'une attente (succès ou délai dépassé)"""
+    key = step if ready else f"{step} (timeout)"
+    with READINESS_STATS_LOCK:
+        READINESS_STATS[key].observe(duration)
+
+def wait_for_maps_condition(driver, step, timeout=None, condition=None):
+    """
+    Attend qu'une condition DOM soit remplie au lieu d'une pause fixe
+    
+    Args:
+        driver: WebDriver Selenium
+        step: Nom de l'étape (clé de MAPS_READY_CONDITIONS / MAPS_READY_TIMEOUTS)
+        timeout: Délai max en secondes (défaut: MAPS_READY_TIMEOUTS[step])
+        condition: Condition Selenium personnalisée (défaut: présence du sélecteur de l'étape)
+    
+    Returns:
+        True si la condition est remplie avant le délai
+    """
+    if timeout is None:
+        timeout = MAPS_READY_TIMEOUTS.get(step, 5)
+    if condition is None:
+        condition = EC.presence_of_element_located(MAPS_READY_CONDITIONS[step])
+    
+    start_time = time.time()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(condition)
+        ready = True
+    except TimeoutException:
+        ready = False
+    duration = time.time() - start_time
+    record_readiness(step, duration, ready)
+    
+    if DEBUG_MODE:
+        status = "prêt" if ready else "délai dépassé"
+        print(f"  ↳ Attente '{step}': {status} en {duration:.2f}s")
+    return ready
+
+def navigate_and_wait(driver, url, step="place_title"):
+    """
+    Charge une URL puis attend que la page soit réellement prête
+    
+    Args:
+        driver: WebDriver Selenium
+        url: URL à charger
+        step: Étape de disponibilité à attendre après le chargement
+    
+    Returns:
+        True si la page est prête avant le délai
+    """
+    driver.get(url)
+    LAST_REQUESTED_URLS[getattr(driver, "session_id", None)] = url
+    wait_for_maps_condition(
+        driver, "page_load",
+        condition=lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+    return wait_for_maps_condition(driver, step)
+
+def is_on_requested_url(driver, url):
+    """Vérifie si la page courante correspond à l'URL demandée (avant ou après redirection)"""
+    return driver.current_url == url or LAST_REQUESTED_URLS.get(getattr(driver, "session_id", None)) == url
+
+def print_readiness_stats():
+    """Affiche les durées réelles des attentes DOM par étape"""
+    with READINESS_STATS_LOCK:
+        stats = {step: histogram.summary() for step, histogram in READINESS_STATS.items()}
+    if not stats:
+        return
+    
+    print("\n⏳ ATTENTES GOOGLE MAPS (durées réelles):")
+    print(f"{'ÉTAPE':<30} | {'APPELS':<6} | {'MOYENNE (s)':<12} | {'P95 (s)':<10} | {'MAX (s)':<10}")
+    print("-" * 81)
+    for step, summary in sorted(stats.items()):
+        print(f"{step:<30} | {summary['count']:<6} | {summary['avg']:<12.2f} | {summary['p95']:<10.2f} | {summary['max']:<10.2f}")
+
 def format_address(restaurant):
     """
     Formate l'adresse d'un restaurant pour la recherche avec gestion avancée des erreurs
@@ -1833,53 +5193,48 @@ def search_google_maps(driver, name, address):
     query = urllib.parse.quote(f"{name} {address}")
     url = f"https://www.google.com/maps/search/{query}"
     driver.get(url)
+    LAST_REQUESTED_URLS[getattr(driver, "session_id", None)] = url
     
-    # Gestion du consentement si nécessaire
-    try:
-        WebDriverWait(driver, 5).until(EC.element_to_be_clickable(
-            (By.XPATH, "//button[contains(., 'Accepter') or contains(., 'Accept')]")
-        )).click()
-        print("✅ Consentement accepté")
-        time.sleep(2)
-    except:
-        print("⚠️ Aucun consentement à gérer")
-    
-    # Attendre que le résultat soit chargé
-    try:
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, 'DUwDvf')))
-        time.sleep(2)
+    # Gestion du consentement si nécessaire (une seule fois par session Chrome)
+    handle_google_consent(driver, timeout=5)
+    
+    # Attendre que la fiche soit chargée (titre), puis ses informations
+    if wait_for_maps_condition(driver, "place_title"):
+        wait_for_maps_condition(driver, "info_panel")
         return driver.current_url
-    except:
-        print("⚠️ Résultat non trouvé sur Google Maps")
-        return None
+    
+    print("⚠️ Résultat non trouvé sur Google Maps")
+    return None
 
 @timing_decorator
-def screenshot_photo(driver, prefix, max_retries=2):
+def screenshot_photo(driver, prefix, max_retries=2, png_bytes=None):
     """
     Capture la photo principale du restaurant sur Google Maps
     
     Args:
         driver: WebDriver Selenium
-        prefix: Préfixe pour le nom du fichier
+        prefix: Préfixe du fichier écrit en mode debug
         max_retries: Nombre maximum de tentatives
+        png_bytes: Capture PNG déjà prise de la fiche (réutilisée à la première tentative)
     
     Returns:
-        Tuple (chemin de l'image, version base64, image PIL)
+        Tuple (chemin de debug ou None, version base64, image PIL)
     """
     last_error = None
     for attempt in range(max_retries):
         try:
-            if attempt > 0 and DEBUG_MODE:
-                print(f"  ↳ Tentative {attempt + 1}/{max_retries} de capture photo")
+            if attempt > 0:
+                record_retry("screenshot_photo")
+                if DEBUG_MODE:
+                    print(f"  ↳ Tentative {attempt + 1}/{max_retries} de capture photo")
             
             # Attendre que la page soit complètement chargée
             WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "DUwDvf"))
             )
             
-            # Prendre la capture d'écran
-            screenshot = driver.get_screenshot_as_png()
-            image = Image.open(BytesIO(screenshot))
+            # Prendre la capture d'écran (en mémoire, sans fichier intermédiaire)
+            screenshot = png_bytes if png_bytes and attempt == 0 else driver.get_screenshot_as_png()
             
             # Coordonnées du crop (à ajuster si nécessaire selon la mise en page de Google Maps)
             left = 30
@@ -1887,14 +5242,13 @@ def screenshot_photo(driver, prefix, max_retries=2):
             right = 330
             bottom = 230
             
-            cropped = image.crop((left, top, right, bottom))
+            cropped = crop_screenshot(screenshot, (left, top, right, bottom))
             
             # Vérifier que l'image n'est pas vide ou trop petite
             if cropped.size[0] < 100 or cropped.size[1] < 100:
                 raise ValueError("Image trop petite, possible erreur de capture")
             
-            path = f"{prefix}_photo.png"
-            cropped.save(path)
+            path = dump_debug_screenshot(cropped, f"{prefix}_photo")
             
             if DEBUG_MODE and attempt > 0:
                 print(f"  ↳ Capture photo réussie après {attempt + 1} tentative(s)")
@@ -1918,17 +5272,19 @@ def screenshot_panel(driver, prefix, max_retries=2):
     
     Args:
         driver: WebDriver Selenium
-        prefix: Préfixe pour le nom du fichier
+        prefix: Préfixe du fichier écrit en mode debug
         max_retries: Nombre maximum de tentatives
     
     Returns:
-        Tuple (chemin de l'image, version base64, objet image)
+        Tuple (chemin de debug ou None, version base64, objet image)
     """
     last_error = None
     for attempt in range(max_retries):
         try:
-            if attempt > 0 and DEBUG_MODE:
-                print(f"  ↳ Tentative {attempt + 1}/{max_retries} de capture du panneau")
+            if attempt > 0:
+                record_retry("screenshot_panel")
+                if DEBUG_MODE:
+                    print(f"  ↳ Tentative {attempt + 1}/{max_retries} de capture du panneau")
             
             # Attendre que le panneau soit chargé
             WebDriverWait(driver, 10).until(
@@ -1941,15 +5297,13 @@ def screenshot_panel(driver, prefix, max_retries=2):
             
             # Prendre la capture d'écran
             screenshot = driver.get_screenshot_as_png()
-            image = Image.open(BytesIO(screenshot))
-            cropped = image.crop((0, 0, 600, 1700))
+            cropped = crop_screenshot(screenshot, OCR_PANEL_CROP)
             
             # Vérifier que l'image n'est pas vide
             if cropped.size[0] < 100 or cropped.size[1] < 100:
                 raise ValueError("Image du panneau trop petite")
             
-            path = f"{prefix}_panel.png"
-            cropped.save(path)
+            path = dump_debug_screenshot(cropped, f"{prefix}_panel")
             
             if DEBUG_MODE and attempt > 0:
                 print(f"  ↳ Capture du panneau réussie après {attempt + 1} tentative(s)")
@@ -1973,17 +5327,19 @@ def screenshot_opening_hours(driver, prefix, max_retries=3):
     
     Args:
         driver: WebDriver Selenium
-        prefix: Préfixe pour le nom du fichier
+        prefix: Préfixe du fichier écrit en mode debug
         max_retries: Nombre maximum de tentatives
     
     Returns:
-        Tuple (chemin de l'image, version base64, objet image) ou (None, None, None)
+        Tuple (chemin de debug ou None, version base64, objet image) ou (None, None, None)
     """
     last_error = None
     for attempt in range(max_retries):
         try:
-            if attempt > 0 and DEBUG_MODE:
-                print(f"  ↳ Tentative {attempt + 1}/{max_retries} de capture des horaires")
+            if attempt > 0:
+                record_retry("screenshot_opening_hours")
+                if DEBUG_MODE:
+                    print(f"  ↳ Tentative {attempt + 1}/{max_retries} de capture des horaires")
             
             # Rechercher le bouton des horaires
             horaires_btn = None
@@ -2010,14 +5366,12 @@ def screenshot_opening_hours(driver, prefix, max_retries=3):
                 
                 # Capture d'écran complète
                 screenshot = driver.get_screenshot_as_png()
-                image = Image.open(BytesIO(screenshot))
                 
                 # Essayer de trouver la zone des horaires approximativement
                 # Coordonnées typiques de la section des horaires
-                horaires_crop = image.crop((600, 200, 1200, 800))
+                horaires_crop = crop_screenshot(screenshot, (600, 200, 1200, 800))
                 
-                path = f"{prefix}_horaires_direct.png"
-                horaires_crop.save(path)
+                path = dump_debug_screenshot(horaires_crop, f"{prefix}_horaires_direct")
                 
                 if DEBUG_MODE:
                     print(f"  ↳ Capture directe des horaires effectuée")
@@ -2030,7 +5384,6 @@ def screenshot_opening_hours(driver, prefix, max_retries=3):
             
             # Prendre une capture d'écran de la section avant de cliquer
             pre_click = driver.get_screenshot_as_png()
-            pre_image = Image.open(BytesIO(pre_click))
             
             # Obtenir la position du bouton
             location = horaires_btn.location
@@ -2038,16 +5391,15 @@ def screenshot_opening_hours(driver, prefix, max_retries=3):
             
             # Étendre la zone de capture pour inclure la liste des horaires 
             # qui apparaît souvent directement sous le bouton
-            horaires_section = pre_image.crop((
+            horaires_section = crop_screenshot(pre_click, (
                 location['x'] - 50,  
                 location['y'] - 20,
                 location['x'] + size['width'] + 300,  # Capturer une zone plus large
                 location['y'] + size['height'] + 300   # Capturer vers le bas pour les horaires
             ))
             
-            # Sauvegarder cette première version
-            path = f"{prefix}_horaires_section.png"
-            horaires_section.save(path)
+            # Conserver cette première version
+            path = dump_debug_screenshot(horaires_section, f"{prefix}_horaires_section")
             
             # Maintenant cliquer pour voir s'il y a un popup
             try:
@@ -2067,13 +5419,11 @@ def screenshot_opening_hours(driver, prefix, max_retries=3):
                 if dialog_present:
                     # Capturer le popup des horaires
                     screenshot = driver.get_screenshot_as_png()
-                    image = Image.open(BytesIO(screenshot))
                     
                     # Coordonnées typiques du popup des horaires
-                    horaires_popup = image.crop((500, 100, 1100, 800))
+                    horaires_popup = crop_screenshot(screenshot, (500, 100, 1100, 800))
                     
-                    path = f"{prefix}_horaires_popup.png"
-                    horaires_popup.save(path)
+                    path = dump_debug_screenshot(horaires_popup, f"{prefix}_horaires_popup")
                     
                     # Fermer le popup
                     try:
@@ -2109,13 +5459,68 @@ def screenshot_opening_hours(driver, prefix, max_retries=3):
         print(f"❌ Impossible de capturer les horaires après {max_retries} tentatives: {last_error}")
     return None, None, None
 
-def encode_image_base64(image):
-    """Convertit une image PIL en base64 pour stockage"""
+def encode_image_base64(image, image_format=None, quality=None, max_size=None):
+    """
+    Convertit une image PIL en URL data base64 pour stockage
+    
+    Args:
+        image: Image PIL
+        image_format: "JPEG", "WEBP" ou "PNG" (défaut: SCREENSHOT_FORMAT)
+        quality: Qualité JPEG/WebP (défaut: SCREENSHOT_QUALITY)
+        max_size: Dimensions max (largeur, hauteur), None pour SCREENSHOT_MAX_SIZE
+    
+    Returns:
+        URL data complète (data:image/...;base64,...)
+    """
+    image_format = (image_format or SCREENSHOT_FORMAT).upper()
+    quality = quality or SCREENSHOT_QUALITY
+    max_size = max_size or SCREENSHOT_MAX_SIZE
+    
+    # Réduire sans toucher à l'image d'origine (qui peut encore servir à l'OCR)
+    if image.width > max_size[0] or image.height > max_size[1]:
+        image = image.copy()
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    # JPEG ne gère ni la transparence ni les palettes
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    
     buffered = BytesIO()
-    image.save(buffered, format="JPEG")
+    if image_format == "PNG":
+        image.save(buffered, format="PNG", optimize=True)
+    else:
+        image.save(buffered, format=image_format, quality=quality)
     img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
     # Ajouter le préfixe pour créer une URL data complète
-    return f"data:image/jpeg;base64,{img_base64}"
+    return f"data:image/{image_format.lower()};base64,{img_base64}"
+
+def crop_screenshot(png_bytes, box):
+    """
+    Recadre une capture PNG en mémoire
+    
+    Args:
+        png_bytes: Capture renvoyée par driver.get_screenshot_as_png()
+        box: Zone (left, top, right, bottom), bornée aux dimensions de la capture
+    
+    Returns:
+        Image PIL recadrée
+    """
+    image = Image.open(BytesIO(png_bytes))
+    left, top, right, bottom = box
+    return image.crop((max(0, left), max(0, top), min(right, image.width), min(bottom, image.height)))
+
+def dump_debug_screenshot(image, name):
+    """
+    Écrit une capture dans SCREENSHOT_DIR, uniquement en mode debug
+    
+    Returns:
+        Chemin du fichier écrit, ou None hors mode debug
+    """
+    if not DEBUG_MODE:
+        return None
+    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+    path = os.path.join(SCREENSHOT_DIR, f"{name}.png")
+    image.save(path)
+    return path
 
 @timing_decorator
 def extract_text_from_image(image, max_retries=2):
@@ -2132,8 +5537,10 @@ def extract_text_from_image(image, max_retries=2):
     last_error = None
     for attempt in range(max_retries):
         try:
-            if attempt > 0 and DEBUG_MODE:
-                print(f"  ↳ Tentative {attempt + 1}/{max_retries} d'extraction OCR")
+            if attempt > 0:
+                record_retry("extract_text_from_image")
+                if DEBUG_MODE:
+                    print(f"  ↳ Tentative {attempt + 1}/{max_retries} d'extraction OCR")
             
             # Améliorer la qualité de l'image pour l'OCR
             enhanced = image.convert('L')  # Conversion en niveaux de gris
@@ -2165,54 +5572,576 @@ def extract_text_from_image(image, max_retries=2):
     print(f"❌ OCR erreur après {max_retries} tentatives: {last_error}")
     return ""
 
-def parse_opening_hours_text(text):
-    """Parse le texte des horaires extrait par OCR"""
-    horaires = {}
-    for line in text.splitlines():
-        if re.match(r"^(luni|marți|miercuri|joi|vineri|sâmbătă|duminică|lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche)", line.strip().lower()):
-            parts = line.split(" ")
-            day = parts[0].lower()
-            horaires[day] = " ".join(parts[1:])
-    return horaires
+# =============================================
+# POOL OCR
+# =============================================
+
+def ocr_screenshot_buffer(png_bytes, crop_box=None):
+    """
+    Exécute l'OCR d'une capture PNG en mémoire (appelée dans un processus du pool)
+    
+    Args:
+        png_bytes: Capture d'écran au format PNG
+        crop_box: Zone (left, top, right, bottom) à conserver, None pour l'image entière
+    
+    Returns:
+        Tuple (texte extrait, durée en secondes)
+    """
+    start_time = time.time()
+    image = crop_screenshot(png_bytes, crop_box) if crop_box else Image.open(BytesIO(png_bytes))
+    text = extract_text_from_image(image)
+    return text, time.time() - start_time
+
+class OcrWorkerPool:
+    """
+    Pool de processus Tesseract alimenté par une file bornée de captures PNG
+    
+    Les threads navigateur déposent leurs captures et repartent aussitôt:
+    l'OCR s'exécute sur les autres cœurs pendant que Chrome charge la fiche
+    suivante. Au-delà de max_pending captures en attente, submit() bloque
+    pour ne pas accumuler les images en mémoire.
+    """
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or OCR_WORKERS
+        # "spawn": un fork depuis un processus multi-threadé (Chrome, Mongo) peut bloquer
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._slots = threading.BoundedSemaphore(max_pending or OCR_MAX_PENDING)
+        self._lock = threading.Lock()
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "ocr_seconds": 0.0,
+            "join_wait_seconds": 0.0,
+        }
+    
+    def submit(self, png_bytes, crop_box=None):
+        """
+        Planifie l'OCR d'une capture
+        
+        Returns:
+            Future dont le résultat est le tuple (texte, durée)
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(ocr_screenshot_buffer, png_bytes, crop_box)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.stats["submitted"] += 1
+        future.add_done_callback(self._on_done)
+        return future
+    
+    def _on_done(self, future):
+        self._slots.release()
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self.stats["failed"] += 1
+            else:
+                duration = future.result()[1]
+                self.stats["completed"] += 1
+                self.stats["ocr_seconds"] += duration
+                METRICS.observe("ocr_screenshot_buffer", duration)
+    
+    def result(self, future, timeout=None):
+        """
+        Attend le texte d'une capture planifiée
+        
+        Returns:
+            Texte extrait ou chaîne vide en cas d'échec ou de délai dépassé
+        """
+        start_time = time.time()
+        try:
+            text, _ = future.result(timeout=timeout)
+            return text
+        except Exception as e:
+            print(f"⚠️ Résultat OCR indisponible: {e}")
+            return ""
+        finally:
+            with self._lock:
+                self.stats["join_wait_seconds"] += time.time() - start_time
+    
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+OCR_POOL = None
+OCR_POOL_LOCK = threading.Lock()
+
+def get_ocr_pool():
+    """Retourne le pool OCR partagé (créé à la première utilisation)"""
+    global OCR_POOL
+    if OCR_POOL is None:
+        with OCR_POOL_LOCK:
+            if OCR_POOL is None:
+                OCR_POOL = OcrWorkerPool()
+                print(f"🔤 Pool OCR démarré ({OCR_POOL.workers} processus)")
+    return OCR_POOL
+
+def close_ocr_pool():
+    """Arrête les processus OCR et affiche leurs statistiques"""
+    global OCR_POOL
+    with OCR_POOL_LOCK:
+        pool, OCR_POOL = OCR_POOL, None
+    if pool is None:
+        return
+    pool.close(wait=False)
+    stats = pool.stats
+    if stats["submitted"]:
+        print(f"🔤 OCR: {stats['completed']}/{stats['submitted']} captures traitées "
+              f"({stats['failed']} échecs), {stats['ocr_seconds']:.1f}s de calcul, "
+              f"{stats['join_wait_seconds']:.1f}s d'attente avant sauvegarde")
+
+atexit.register(close_ocr_pool)
+
+def submit_restaurant_ocr(restaurant_data, png_bytes, crop_box=OCR_PANEL_CROP):
+    """
+    Planifie l'OCR d'une capture et rattache le résultat attendu au restaurant
+    
+    Args:
+        restaurant_data: Document du restaurant en cours de construction
+        png_bytes: Capture d'écran PNG du panneau Google Maps
+        crop_box: Zone à passer à l'OCR
+    """
+    restaurant_data["_ocr_future"] = get_ocr_pool().submit(png_bytes, crop_box)
+
+def join_restaurant_ocr(restaurant_data, timeout=None):
+    """
+    Attend l'OCR planifié pour ce restaurant et complète les champs manquants
+    
+    Sans OCR planifié, ne fait rien. La clé interne est toujours retirée
+    pour que le document reste sérialisable.
+    """
+    future = restaurant_data.pop("_ocr_future", None)
+    if future is None:
+        return
+    pool = OCR_POOL or get_ocr_pool()
+    text = pool.result(future, timeout=OCR_JOIN_TIMEOUT if timeout is None else timeout)
+    apply_ocr_text(restaurant_data, text)
+    # Structuration LLM regroupée avec celle d'autres restaurants, attendue à la sauvegarde
+    submit_restaurant_structuring(restaurant_data, text)
+
+def apply_ocr_text(restaurant_data, text):
+    """
+    Complète téléphone et horaires absents à partir du texte OCR du panneau
+    
+    Les valeurs extraites du DOM restent prioritaires.
+    """
+    if not text:
+        return
+    if not restaurant_data.get("opening_hours"):
+        hours = parse_opening_hours_text(text)
+        if hours:
+            restaurant_data["opening_hours"] = hours
+    if not restaurant_data.get("phone"):
+        phone_match = re.search(r'(?:\+33\s?|0)[1-9](?:[\s.-]?\d{2}){4}', text)
+        if phone_match:
+            restaurant_data["phone"] = phone_match.group(0)
+
+def parse_opening_hours_text(text, use_llm=None, full_day_names=False):
+    """
+    Parse un texte d'horaires (OCR du panneau Maps, page Maps, TheFork, TripAdvisor)
+    
+    Le parsing est déterministe (opening_hours.py); OpenAI n'est sollicité
+    que si le texte contient des horaires que le parser n'a compris qu'en
+    partie (confiance < OPENING_HOURS_MIN_CONFIDENCE). Sans LLM, un résultat
+    sous ce seuil est abandonné plutôt qu'enregistré.
+    
+    Args:
+        text: Texte brut ou liste de lignes
+        use_llm: Autoriser le repli LLM (défaut: OPENING_HOURS_LLM_FALLBACK)
+        full_day_names: Ne reconnaître que les jours en toutes lettres (texte libre)
+    
+    Returns:
+        Liste au format MongoDB ["Monday: 12:00 PM – 2:30 PM, 7:00 PM – 11:00 PM", ...],
+        vide si aucun horaire n'est reconnu
+    """
+    if isinstance(text, (list, tuple)):
+        text = "\n".join(str(line) for line in text)
+    if not text:
+        return []
+    week, confidence = hours_parser.parse_opening_hours(text, full_day_names=full_day_names)
+    use_llm = OPENING_HOURS_LLM_FALLBACK if use_llm is None else use_llm
+    if confidence < OPENING_HOURS_MIN_CONFIDENCE:
+        if not use_llm:
+            # Résultat incertain (mots courants pris pour des jours, heures d'un avis...)
+            return []
+        if hours_parser.has_hours_evidence(text):
+            METRICS.incr("opening_hours_low_confidence")
+            llm_week = call_openai_opening_hours(text)
+            if llm_week and len(llm_week) >= len(week):
+                METRICS.incr("opening_hours_llm")
+                week = llm_week
+    return hours_parser.format_weekday_text(week)
+
+def format_opening_hours(lines):
+    """
+    Convertit les horaires d'une plateforme au format MongoDB
+    
+    Args:
+        lines: Lignes ("Lundi : 12h00 - 14h30 / 19h00 - 22h30") ou texte brut
+    
+    Returns:
+        Liste au format MongoDB (voir parse_opening_hours_text)
+    """
+    return parse_opening_hours_text(lines)
 
 @timing_decorator
-def call_openai_structured_extraction(ocr_text):
+def call_openai_opening_hours(text):
     """
-    Utilise OpenAI pour structurer les données extraites par OCR
+    Demande à OpenAI les horaires d'un texte que le parser n'a pas compris
     
     Args:
-        ocr_text: Texte brut extrait par OCR
+        text: Texte brut des horaires
     
     Returns:
-        Dictionnaire structuré des informations
+        Semaine canonique {jour: [{"open", "close"}, ...]} ou None (réponse invalide, quota épuisé)
     """
+    if not API_BUDGET.acquire("openai"):
+        print("⚠️ Quota OpenAI épuisé, horaires non structurés par le LLM")
+        return None
+    
     prompt = f"""
-Voici un texte brut issu d'un screenshot Google Maps en français :
+Voici un texte brut contenant les horaires d'ouverture d'un restaurant :
 
-{ocr_text}
+{text[:LLM_OCR_MAX_CHARS]}
 
-Extrais les informations suivantes dans un dictionnaire JSON (valeurs vides si non disponibles) :
-- address
+Réponds uniquement avec un objet JSON dont les clés sont les jours en anglais
+(monday ... sunday) et les valeurs la liste des plages d'ouverture au format 24h,
+ex: {{"monday": [{{"open": "12:00", "close": "14:30"}}, {{"open": "19:00", "close": "23:00"}}], "sunday": []}}
+Liste vide pour un jour fermé, jour absent s'il n'est pas mentionné.
+    """
+    
+    try:
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0
+        )
+        content = response.choices[0].message.content.strip()
+        return hours_parser.validate_week(json.loads(content))
+    except Exception as e:
+        print(f"❌ Erreur LLM (horaires) : {e}")
+        return None
+
+# Champs demandés au LLM et types acceptés dans sa réponse
+STRUCTURED_FIELDS = {
+    "address": str,
+    "phone_number": str,
+    "website": str,
+    "price_level": (str, int),
+    "rating": (int, float),
+    "user_ratings_total": int,
+    "service_options": (list, str),
+    "category": str,
+}
+
+STRUCTURED_FIELDS_PROMPT = """- address
 - phone_number
 - website
 - price_level
 - rating
 - user_ratings_total
 - service_options (ex: dine_in, takeaway, delivery)
-- category (ex: 'Restaurant chinois')
+- category (ex: 'Restaurant chinois')"""
+
+def validate_structured_data(data):
+    """
+    Vérifie et nettoie les informations structurées renvoyées par le LLM
+    
+    Les champs inconnus sont ignorés, les valeurs vides conservées telles
+    quelles. Un champ au mauvais type ou une note hors de [0, 5] invalide
+    l'ensemble.
+    
+    Returns:
+        Dictionnaire nettoyé ou None si la réponse est invalide
+    """
+    if not isinstance(data, dict):
+        return None
+    cleaned = {}
+    for field, expected in STRUCTURED_FIELDS.items():
+        value = data.get(field)
+        if value in (None, ""):
+            cleaned[field] = ""
+            continue
+        if field == "service_options" and isinstance(value, dict):
+            # {"dine_in": true, "delivery": false} -> ["dine_in"]
+            value = [option for option, available in value.items() if available is True]
+        if expected is int and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, expected):
+            # Nombres renvoyés en texte ("4,5", "1 234")
+            if expected in (int, (int, float)) and isinstance(value, str):
+                try:
+                    number = float(value.replace(",", ".").replace(" ", "").replace("\u202f", ""))
+                except ValueError:
+                    return None
+                value = int(number) if expected is int else number
+            else:
+                return None
+        if field == "rating" and not 0 <= value <= 5:
+            return None
+        cleaned[field] = value
+    return cleaned
+
+@timing_decorator
+def call_openai_structured_extraction(ocr_text):
+    """
+    Utilise OpenAI pour structurer les données extraites par OCR
+    
+    Args:
+        ocr_text: Texte brut extrait par OCR
+    
+    Returns:
+        Dictionnaire structuré des informations (vide en cas d'échec)
+    """
+    prompt = f"""
+Voici un texte brut issu d'un screenshot Google Maps en français :
+
+{ocr_text[:LLM_OCR_MAX_CHARS]}
+
+Extrais les informations suivantes dans un dictionnaire JSON (valeurs vides si non disponibles) :
+{STRUCTURED_FIELDS_PROMPT}
     """
     
+    if not API_BUDGET.acquire("openai"):
+        print("⚠️ Quota OpenAI épuisé, structuration LLM ignorée")
+        return {}
+    
     try:
         response = openai.ChatCompletion.create(
             model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0
         )
         content = response.choices[0].message.content.strip()
-        return json.loads(content)
+        return validate_structured_data(json.loads(content)) or {}
     except Exception as e:
         print(f"❌ Erreur LLM : {e}")
         return {}
 
+@timing_decorator
+def call_openai_structured_extraction_batch(ocr_texts):
+    """
+    Structure les textes OCR de plusieurs restaurants en une seule requête OpenAI
+    
+    Chaque texte reçoit un identifiant court que le modèle doit reprendre
+    dans sa réponse: les résultats sont associés par identifiant, pas par
+    position.
+    
+    Args:
+        ocr_texts: Dictionnaire {identifiant: texte OCR}
+    
+    Returns:
+        Dictionnaire {identifiant: informations validées}; les identifiants
+        absents, en double ou invalides dans la réponse sont omis
+    """
+    if not API_BUDGET.acquire("openai"):
+        print("⚠️ Quota OpenAI épuisé, structuration LLM ignorée")
+        return {}
+    
+    blocks = "\n\n".join(f'=== id: "{item_id}" ===\n{text[:LLM_OCR_MAX_CHARS]}' for item_id, text in ocr_texts.items())
+    prompt = f"""
+Voici {len(ocr_texts)} textes bruts issus de screenshots Google Maps en français, un par restaurant,
+chacun précédé de son identifiant :
+
+{blocks}
+
+Pour chaque texte, extrais les informations suivantes (valeurs vides si non disponibles) :
+{STRUCTURED_FIELDS_PROMPT}
+
+Réponds uniquement avec un objet JSON de la forme
+{{"results": [{{"id": "<identifiant>", "address": "...", ...}}, ...]}}
+avec exactement un élément par identifiant, sans mélanger les informations de deux textes.
+    """
+    
+    try:
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0
+        )
+        content = response.choices[0].message.content.strip()
+        results = json.loads(content).get("results")
+    except Exception as e:
+        print(f"❌ Erreur LLM (lot de {len(ocr_texts)}): {e}")
+        return {}
+    if not isinstance(results, list):
+        return {}
+    
+    structured = {}
+    duplicates = set()
+    for result in results:
+        item_id = result.get("id") if isinstance(result, dict) else None
+        if item_id not in ocr_texts:
+            continue
+        if item_id in structured:
+            duplicates.add(item_id)
+        data = validate_structured_data(result)
+        if data is not None:
+            structured[item_id] = data
+    # Un identifiant répondu deux fois est ambigu: il repassera en appel unitaire
+    for item_id in duplicates:
+        structured.pop(item_id, None)
+    return structured
+
+class StructuredExtractionBatcher:
+    """
+    Regroupe les structurations LLM de plusieurs restaurants
+    
+    Les workers déposent leur texte OCR et reçoivent un Future; un thread
+    dédié envoie une requête par lot (LLM_BATCH_SIZE textes, ou moins après
+    LLM_BATCH_MAX_WAIT secondes). Seuls les restaurants absents ou invalides
+    dans la réponse du lot sont repris en appel unitaire.
+    """
+    _STOP = object()
+    
+    def __init__(self, batch_size=None, max_wait=None):
+        self.batch_size = max(1, batch_size or LLM_BATCH_SIZE)
+        self.max_wait = max_wait if max_wait is not None else LLM_BATCH_MAX_WAIT
+        self.queue = queue.Queue()
+        self.thread = None
+        self.stats = {"items": 0, "batches": 0, "batched_ok": 0, "fallbacks": 0, "requests": 0}
+        self._lock = threading.Lock()
+    
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+            self.thread.start()
+        return self
+    
+    def submit(self, ocr_text):
+        """
+        Planifie la structuration d'un texte OCR
+        
+        Returns:
+            Future dont le résultat est le dictionnaire structuré (vide en cas d'échec)
+        """
+        future = Future()
+        self.queue.put((ocr_text, future))
+        with self._lock:
+            self.stats["items"] += 1
+        return future
+    
+    def close(self, timeout=None):
+        """Envoie le dernier lot et arrête le thread"""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(self._STOP)
+            self.thread.join(timeout)
+        return self.stats
+    
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0, deadline - time.time())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            
+            if item is self._STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                if not batch:
+                    deadline = time.time() + self.max_wait
+                batch.append(item)
+            
+            if batch and (len(batch) >= self.batch_size or time.time() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+    
+    def _flush(self, batch):
+        if not batch:
+            return
+        texts = {f"r{i + 1}": text for i, (text, _) in enumerate(batch)}
+        try:
+            structured = call_openai_structured_extraction_batch(texts) if len(batch) > 1 else {}
+            requests_sent = 1 if len(batch) > 1 else 0
+            fallbacks = 0
+            for i, (text, future) in enumerate(batch):
+                data = structured.get(f"r{i + 1}")
+                if data is None:
+                    # Élément manquant ou invalide dans le lot (ou lot d'un seul texte)
+                    data = call_openai_structured_extraction(text)
+                    fallbacks += 1
+                    requests_sent += 1
+                future.set_result(data)
+        except Exception as e:
+            print(f"❌ Erreur de structuration LLM: {str(e)}")
+            traceback.print_exc()
+            for _, future in batch:
+                if not future.done():
+                    future.set_result({})
+            return
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["batched_ok"] += len(structured)
+            self.stats["fallbacks"] += fallbacks
+            self.stats["requests"] += requests_sent
+        if DEBUG_MODE:
+            print(f"🧠 Lot LLM: {len(batch)} restaurants, {len(structured)} structurés en lot, {fallbacks} appels unitaires")
+
+LLM_BATCHER = None
+LLM_BATCHER_LOCK = threading.Lock()
+
+def get_llm_batcher():
+    """Regroupeur de structurations LLM partagé (démarré à la première utilisation)"""
+    global LLM_BATCHER
+    with LLM_BATCHER_LOCK:
+        if LLM_BATCHER is None:
+            LLM_BATCHER = StructuredExtractionBatcher().start()
+        return LLM_BATCHER
+
+def close_llm_batcher():
+    """Envoie le dernier lot et affiche le nombre de requêtes économisées"""
+    global LLM_BATCHER
+    with LLM_BATCHER_LOCK:
+        batcher, LLM_BATCHER = LLM_BATCHER, None
+    if batcher is None:
+        return
+    stats = batcher.close()
+    if stats["items"]:
+        print(f"🧠 Structuration LLM: {stats['items']} restaurants en {stats['requests']} requêtes "
+              f"({stats['batches']} lots, {stats['fallbacks']} appels unitaires de repli)")
+
+atexit.register(close_llm_batcher)
+
+def submit_restaurant_structuring(restaurant_data, ocr_text):
+    """Planifie la structuration LLM du texte OCR d'un restaurant (résultat attendu à la sauvegarde)"""
+    if USE_LLM_STRUCTURING and ocr_text and ocr_text.strip():
+        restaurant_data["_structured_future"] = get_llm_batcher().submit(ocr_text)
+
+def join_restaurant_structuring(restaurant_data, timeout=None):
+    """
+    Attend la structuration LLM planifiée et complète les champs manquants
+    
+    Les valeurs issues de Google Maps et du DOM restent prioritaires. La clé
+    interne est toujours retirée pour que le document reste sérialisable.
+    """
+    future = restaurant_data.pop("_structured_future", None)
+    if future is None:
+        return
+    try:
+        data = future.result(timeout=LLM_STRUCTURING_TIMEOUT if timeout is None else timeout)
+    except Exception as e:
+        print(f"⚠️ Structuration LLM indisponible: {e}")
+        return
+    for field in ("address", "website", "price_level", "user_ratings_total", "service_options"):
+        if not restaurant_data.get(field) and data.get(field) not in (None, ""):
+            restaurant_data[field] = data[field]
+    if not restaurant_data.get("phone_number") and not restaurant_data.get("phone") and data.get("phone_number"):
+        restaurant_data["phone_number"] = data["phone_number"]
+    if not restaurant_data.get("rating") and data.get("rating") not in (None, ""):
+        restaurant_data["rating"] = data["rating"]
+    if not restaurant_data.get("category") and data.get("category"):
+        restaurant_data["category"] = [data["category"]]
+
 def scroll_to_bottom_info(driver):
     """Fait défiler le panneau latéral pour voir toutes les informations"""
     try:
@@ -2274,7 +6203,7 @@ def process_restaurant_with_maps_screenshots(maps_data):
     try:
         print(f"📸 Capture des screenshots de Maps pour {name}")
         
-        with ChromeSessionManager() as session:
+        with chrome_session() as session:
             driver = session.driver
             
             if not driver:
@@ -2284,17 +6213,34 @@ def process_restaurant_with_maps_screenshots(maps_data):
             # Essayer de capturer l'état du restaurant
             try:
                 driver.get(maps_url)
-                time.sleep(3)
+                LAST_REQUESTED_URLS[getattr(driver, "session_id", None)] = maps_url
+                handle_google_consent(driver, timeout=3)
+                # Attendre le titre de la fiche puis le panneau d'informations
+                if wait_for_maps_condition(driver, "place_title"):
+                    wait_for_maps_condition(driver, "info_panel")
                 
                 # Capturer l'image principale du restaurant
                 temp_name = f"temp_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+                # Une seule capture PNG en mémoire sert à la photo et à l'OCR du panneau
+                page_png = None
+                try:
+                    page_png = driver.get_screenshot_as_png()
+                except Exception as e:
+                    print(f"⚠️ Capture de la fiche impossible pour {name}: {str(e)}")
                 try:
-                    photo_path, photo_base64, _ = screenshot_photo(driver, temp_name)
+                    _, photo_base64, _ = screenshot_photo(driver, temp_name, png_bytes=page_png)
                     restaurant_data["image"] = photo_base64
                     print(f"✅ Screenshot capturé pour {name}")
                 except Exception as e:
                     print(f"⚠️ Impossible de capturer la photo de {name}: {str(e)}")
                 
+                # OCR du panneau confié au pool de processus: le navigateur continue pendant ce temps
+                if USE_OCR and page_png:
+                    try:
+                        submit_restaurant_ocr(restaurant_data, page_png)
+                    except Exception as e:
+                        print(f"⚠️ OCR non planifié pour {name}: {str(e)}")
+                
                 # Extraire des informations additionnelles (site web, téléphone, horaires...)
                 additional_info = extract_additional_info(driver, maps_url, restaurant_data)
                 if additional_info:
@@ -2318,7 +6264,7 @@ def process_restaurant_with_maps_screenshots(maps_data):
                 for key in ["phone", "website", "categories", "opening_hours", "price_level"]:
                     if key not in restaurant_data or restaurant_data[key] is None:
                         if key == "opening_hours":
-                            restaurant_data[key] = {}
+                            restaurant_data[key] = []
                         elif key == "categories":
                             restaurant_data[key] = []
                         elif key == "price_level":
@@ -2358,7 +6304,7 @@ def capture_maps_screenshot(driver, url):
         url: URL de Google Maps à capturer
     
     Returns:
-        Base64 du screenshot
+        URL data base64 du screenshot (format et taille selon SCREENSHOT_*)
     """
     try:
         # Vérifier que le driver est bien initialisé
@@ -2367,28 +6313,28 @@ def capture_maps_screenshot(driver, url):
             return None
             
         # Charger l'URL si elle n'est pas déjà chargée
-        current_url = driver.current_url
-        if url != current_url:
-            driver.get(url)
-            # Attendre que la page se charge
-            time.sleep(5)
+        if not is_on_requested_url(driver, url):
+            # Attendre que la page soit chargée (et non une pause fixe)
+            navigate_and_wait(driver, url, step="place_title")
             
-            # Gérer le consentement aux cookies si nécessaire
-            try:
-                consent_buttons = driver.find_elements(By.XPATH, 
-                    "//button[contains(., 'Accept') or contains(., 'Accepter') or contains(., 'Reject') or contains(., 'Refuser')]")
-                if consent_buttons:
-                    for button in consent_buttons:
-                        if button.is_displayed():
-                            button.click()
-                            time.sleep(2)
-                            break
-            except:
-                pass
+            # Gérer le consentement aux cookies si nécessaire (une seule fois par session)
+            if getattr(driver, "session_id", None) not in CONSENT_HANDLED_SESSIONS:
+                try:
+                    consent_buttons = driver.find_elements(By.XPATH, 
+                        "//button[contains(., 'Accept') or contains(., 'Accepter') or contains(., 'Reject') or contains(., 'Refuser')]")
+                    if consent_buttons:
+                        for button in consent_buttons:
+                            if button.is_displayed():
+                                button.click()
+                                wait_for_maps_condition(driver, "place_title")
+                                break
+                    CONSENT_HANDLED_SESSIONS.add(driver.session_id)
+                except:
+                    pass
         
         # Prendre le screenshot de la page
-        screenshot = driver.get_screenshot_as_base64()
-        return f"data:image/png;base64,{screenshot}"
+        screenshot = driver.get_screenshot_as_png()
+        return encode_image_base64(Image.open(BytesIO(screenshot)))
         
     except Exception as e:
         print(f"❌ Erreur capture screenshot: {str(e)}")
@@ -2411,11 +6357,11 @@ def extract_additional_info(driver, maps_url, restaurant_data):
         print("❌ Driver non initialisé pour l'extraction d'informations additionnelles")
         return {}
     
-    # S'assurer que nous sommes sur la bonne URL
-    if driver.current_url != maps_url:
+    # S'assurer que nous sommes sur la bonne URL (Google Maps réécrit l'URL après chargement)
+    if not is_on_requested_url(driver, maps_url):
         try:
-            driver.get(maps_url)
-            time.sleep(4)
+            navigate_and_wait(driver, maps_url, step="place_title")
+            wait_for_maps_condition(driver, "info_panel")
         except Exception as e:
             print(f"❌ Erreur lors de la navigation vers {maps_url}: {str(e)}")
             return {}
@@ -2574,82 +6520,42 @@ def extract_additional_info(driver, maps_url, restaurant_data):
                 "div.section-info-hour-text"
             ]
             
+            # Laisser au bouton des horaires le temps d'apparaître (sans pause fixe)
+            wait_for_maps_condition(driver, "hours_button")
+            
             for selector in hours_selectors:
                 hour_elements = driver.find_elements(By.CSS_SELECTOR, selector)
                 if hour_elements:
                     hours_button = hour_elements[0]
                     break
             
-            opening_hours = {}
+            formatted_hours = []
             
             if hours_button:
                 # Essayer de cliquer pour ouvrir les horaires détaillés
                 try:
                     hours_button.click()
-                    time.sleep(1)
+                    wait_for_maps_condition(driver, "hours_table")
                     
                     # Chercher les horaires dans la popup ou dans le panel
                     hours_rows = driver.find_elements(By.CSS_SELECTOR, "table tr, div.section-info-hour-row")
                     
                     if hours_rows:
-                        for row in hours_rows:
-                            row_text = row.text.strip()
-                            # Analyser le texte pour extraire le jour et les heures
-                            day_match = re.search(r'(lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche|monday|tuesday|wednesday|thursday|friday|saturday|sunday)', row_text.lower())
-                            if day_match:
-                                day = day_match.group(1)
-                                # Normaliser le jour en français
-                                day_map = {
-                                    "monday": "lundi", "tuesday": "mardi", "wednesday": "mercredi", 
-                                    "thursday": "jeudi", "friday": "vendredi", "saturday": "samedi", "sunday": "dimanche"
-                                }
-                                day = day_map.get(day, day)
-                                
-                                # Extraire les heures (format: 9:00–22:00 ou 9h00-22h00)
-                                hours_match = re.search(r'(\d{1,2})[h:](\d{2})\s*[-–]\s*(\d{1,2})[h:](\d{2})', row_text)
-                                if hours_match:
-                                    open_hour = int(hours_match.group(1))
-                                    open_minute = int(hours_match.group(2))
-                                    close_hour = int(hours_match.group(3))
-                                    close_minute = int(hours_match.group(4))
-                                    
-                                    opening_hours[day] = {
-                                        "open": f"{open_hour:02d}:{open_minute:02d}",
-                                        "close": f"{close_hour:02d}:{close_minute:02d}"
-                                    }
+                        # Une ligne par jour ("lundi 12:00–14:30, 19:00–23:00"), parsées ensemble
+                        formatted_hours = parse_opening_hours_text([row.text.strip() for row in hours_rows])
                 except Exception as e:
                     if DEBUG_MODE:
                         print(f"⚠️ Erreur lors du clic sur le bouton des horaires: {str(e)}")
             
-            # Si pas d'horaires trouvés, essayer d'extraire directement du texte
-            if not opening_hours:
-                page_source = driver.page_source
-                # Rechercher des patterns d'horaires dans la source de la page
-                hours_pattern = r'(lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche|monday|tuesday|wednesday|thursday|friday|saturday|sunday)[^\n]*?(\d{1,2})[h:](\d{2})\s*[-–]\s*(\d{1,2})[h:](\d{2})'
-                hours_matches = re.findall(hours_pattern, page_source, re.IGNORECASE)
-                
-                if hours_matches:
-                    for match in hours_matches:
-                        day = match[0].lower()
-                        # Normaliser le jour en français
-                        day_map = {
-                            "monday": "lundi", "tuesday": "mardi", "wednesday": "mercredi", 
-                            "thursday": "jeudi", "friday": "vendredi", "saturday": "samedi", "sunday": "dimanche"
-                        }
-                        day = day_map.get(day, day)
-                        
-                        open_hour = int(match[1])
-                        open_minute = int(match[2])
-                        close_hour = int(match[3])
-                        close_minute = int(match[4])
-                        
-                        opening_hours[day] = {
-                            "open": f"{open_hour:02d}:{open_minute:02d}",
-                            "close": f"{close_hour:02d}:{close_minute:02d}"
-                        }
+            # Si pas d'horaires trouvés, essayer d'extraire directement du texte de la page
+            if not formatted_hours:
+                page_text = html_parsing.make_soup(driver.page_source).get_text("\n", strip=True)
+                # Pas de repli LLM sur la page entière: trop de texte sans rapport avec les horaires.
+                # Jours en toutes lettres uniquement: "Sam", "mer", "sun" sont des mots courants d'un avis
+                formatted_hours = parse_opening_hours_text(page_text, use_llm=False, full_day_names=True)
             
-            if opening_hours:
-                result["opening_hours"] = opening_hours
+            if formatted_hours:
+                result["opening_hours"] = formatted_hours
             
         except Exception as e:
             if DEBUG_MODE:
@@ -2735,6 +6641,14 @@ def extract_additional_info(driver, maps_url, restaurant_data):
         traceback.print_exc()
         return {}
 
+# Liens recherchés dans les résultats Bing (expressions compilées une fois)
+BING_PLATFORM_PATTERNS = [
+    ("tripadvisor", re.compile(r'tripadvisor\.(?:fr|com)/Restaurant_Review')),
+    ("lafourchette", re.compile(r'lafourchette\.fr/restaurant')),
+    ("facebook", re.compile(r'facebook\.com')),
+    ("instagram", re.compile(r'instagram\.com'))
+]
+
 def search_links_bing(name, address):
     """
     Recherche les liens des plateformes via Bing avec mise en cache
@@ -2750,9 +6664,10 @@ def search_links_bing(name, address):
     cache_key = f"{name}_{address}"
     
     # Vérifier si les résultats sont déjà en cache
-    if cache_key in BING_SEARCH_CACHE:
+    cached_links = BING_SEARCH_CACHE.get(cache_key)
+    if cached_links is not None:
         print(f"✅ Résultats Bing récupérés depuis le cache pour {name}")
-        return BING_SEARCH_CACHE[cache_key]
+        return cached_links
     
     query = f"{name} {address} restaurant tripadvisor lafourchette"
     print(f"🔍 Recherche sur Bing: {query}")
@@ -2763,30 +6678,25 @@ def search_links_bing(name, address):
     print(f"🌐 URL Bing: {bing_url}")
     
     # Utiliser BrightData pour récupérer le HTML
+    if not HTML_CACHE_OFFLINE and not API_BUDGET.acquire("bing"):
+        print(f"⚠️ Quota de recherches Bing épuisé, liens ignorés pour {name}")
+        return {}
     html = fetch_html_with_brightdata(bing_url, name, "bing_search")
     if not html:
         print(f"❌ Impossible de récupérer le HTML de Bing pour {name}")
         return {}
         
-    # Parser le HTML
-    soup = BeautifulSoup(html, 'html.parser')
+    # Seuls les liens de la page sont utiles: pas d'arbre complet
+    links = html_parsing.extract_links(html)
     
     # Dictionnaire pour stocker les liens trouvés
     platform_links = {}
     
-    # Liste des plateformes à rechercher avec leurs patterns regex
-    platforms = [
-        ("tripadvisor", r'tripadvisor\.(?:fr|com)/Restaurant_Review'),
-        ("lafourchette", r'lafourchette\.fr/restaurant'),
-        ("facebook", r'facebook\.com'),
-        ("instagram", r'instagram\.com')
-    ]
-    
     # Rechercher les liens pour chaque plateforme
-    for platform_name, pattern in platforms:
-        links = soup.find_all('a', href=re.compile(pattern))
-        for link in links:
-            url = link.get('href')
+    for platform_name, pattern in BING_PLATFORM_PATTERNS:
+        for url in links:
+            if not pattern.search(url):
+                continue
             if validate_platform_link(url, platform_name):
                 platform_links[platform_name] = url
                 print(f"  ✅ Trouvé lien {platform_name}: {url}")
@@ -2861,13 +6771,10 @@ def check_mongodb_content():
     Vérifie le contenu de la collection MongoDB
     """
     try:
-        client = get_mongo_client()
-        if not client:
+        collection = get_producers_collection()
+        if collection is None:
             print("❌ Impossible de se connecter à MongoDB")
             return
-            
-        db = client[DB_NAME]
-        collection = db[COLLECTION_NAME]
         
         print(f"\n🔍 Vérification du contenu MongoDB:")
         print(f"  Base de données: {DB_NAME}")
@@ -2881,8 +6788,6 @@ def check_mongodb_content():
         print("\n📋 5 premiers documents:")
         for doc in collection.find().limit(5):
             print(f"  - {doc.get('name', 'Sans nom')} (ID: {doc.get('_id')})")
-            
-        client.close()
         
     except Exception as e:
         print(f"❌ Erreur lors de la vérification MongoDB: {str(e)}")
@@ -2920,8 +6825,8 @@ def enrich_with_platforms(restaurant_data):
             print("❌ BrightData n'est pas activé, impossible de rechercher les liens")
             return restaurant_data
             
-        # Vérifier le token BrightData
-        if not BRIGHTDATA_TOKEN:
+        # Vérifier le token BrightData (inutile en rejeu hors ligne)
+        if not BRIGHTDATA_TOKEN and not HTML_CACHE_OFFLINE:
             print("❌ Token BrightData manquant")
             return restaurant_data
             
@@ -2940,38 +6845,21 @@ def enrich_with_platforms(restaurant_data):
             print("❌ Impossible de récupérer le HTML de Bing")
             return restaurant_data
             
-        # Parser le HTML
-        soup = BeautifulSoup(html, 'html.parser')
+        # Seuls les liens de la page sont utiles: pas d'arbre complet
+        links = html_parsing.extract_links(html)
         
         # Dictionnaire pour stocker les liens trouvés
         platform_links = {}
         
-        # Rechercher les liens TripAdvisor
-        tripadvisor_links = soup.find_all('a', href=re.compile(r'tripadvisor\.fr/Restaurant_Review'))
-        for link in tripadvisor_links:
-            url = link.get('href')
-            if validate_platform_link(url, "tripadvisor"):
-                platform_links["tripadvisor"] = url
-                print(f"✅ Trouvé lien tripadvisor: {url}")
-                break
-                
-        # Rechercher les liens LaFourchette
-        lafourchette_links = soup.find_all('a', href=re.compile(r'lafourchette\.fr/restaurant'))
-        for link in lafourchette_links:
-            url = link.get('href')
-            if validate_platform_link(url, "lafourchette"):
-                platform_links["lafourchette"] = url
-                print(f"✅ Trouvé lien lafourchette: {url}")
-                break
-                
-        # Rechercher les liens Facebook
-        facebook_links = soup.find_all('a', href=re.compile(r'facebook\.com'))
-        for link in facebook_links:
-            url = link.get('href')
-            if validate_platform_link(url, "facebook"):
-                platform_links["facebook"] = url
-                print(f"✅ Trouvé lien facebook: {url}")
-                break
+        # Rechercher les liens TripAdvisor, LaFourchette et Facebook
+        for platform_name, pattern in [("tripadvisor", r'tripadvisor\.fr/Restaurant_Review'),
+                                       ("lafourchette", r'lafourchette\.fr/restaurant'),
+                                       ("facebook", r'facebook\.com')]:
+            for url in [link for link in links if re.search(pattern, link)]:
+                if validate_platform_link(url, platform_name):
+                    platform_links[platform_name] = url
+                    print(f"✅ Trouvé lien {platform_name}: {url}")
+                    break
                 
         print(f"✅ Trouvé {len(platform_links)} liens de plateformes")
         
@@ -2999,11 +6887,9 @@ def normalize_restaurant_data(restaurant_data):
     # Vérifier si le place_id existe et n'est pas vide
     place_id = restaurant_data.get('place_id')
     if not place_id or place_id == "":
-        # Générer un ID unique basé sur le nom et l'adresse
-        custom_id = f"{restaurant_data.get('name', 'unknown')}_{restaurant_data.get('address', 'unknown')}"
-        # Ajouter un UUID pour éviter les doublons
-        import uuid
-        place_id = f"custom_{uuid.uuid4().hex[:10]}_{custom_id.replace(' ', '_')[:30]}"
+        # Identifiant stable (nom + position): un nouveau passage retombe sur le même document
+        place_id = restaurant_dedup.stable_restaurant_id(restaurant_data.get('name'), restaurant_data.get('address'),
+                                                         restaurant_data.get('latitude'), restaurant_data.get('longitude'))
         print(f"⚠️ place_id manquant, généré: {place_id}")
     
     # Récupérer les coordonnées GPS
@@ -3043,7 +6929,7 @@ def normalize_restaurant_data(restaurant_data):
         "maps_url": restaurant_data.get('maps_url', ''),
         "price_level": restaurant_data.get('price_level', ''),
         "rating": restaurant_data.get('rating', 0),
-        "created_at": datetime.now(),
+        # created_at est posé à l'insertion seulement (voir build_restaurant_upsert)
         # Réintégration des champs utiles pour d'autres scripts :
         "reviews": restaurant_data.get('reviews', []),
         "images": restaurant_data.get('images', []),
@@ -3055,6 +6941,15 @@ def normalize_restaurant_data(restaurant_data):
     # (ex: transformer reviews en liste de dicts, images en URLs, etc.)
     return normalized_data
 
+def get_brightdata_client():
+    """Client BrightData partagé (une session keep-alive pour tout le processus)"""
+    return brightdata_client.get_client(
+        token=BRIGHTDATA_TOKEN,
+        zone_concurrency={"web_unlocker1": BRIGHTDATA_CONCURRENCY, "superproxy": BRIGHTDATA_CONCURRENCY}
+    )
+
+atexit.register(brightdata_client.close_client)
+
 @timing_decorator
 def fetch_html_with_brightdata(url, name=None, platform=None, max_retries=3):
     """
@@ -3064,56 +6959,49 @@ def fetch_html_with_brightdata(url, name=None, platform=None, max_retries=3):
     
     # Vérifier d'abord dans le cache
     cache_key = f"{url}_{platform}"
-    if cache_key in HTML_CACHE:
+    cached_html = HTML_CACHE.get(cache_key)
+    if cached_html is not None:
         print(f"{log_prefix}✅ HTML récupéré depuis le cache")
-        return HTML_CACHE[cache_key]
-    
-    # Configuration BrightData
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {BRIGHTDATA_TOKEN}"
-    }
-    
-    payload = {
-        "url": url,
-        "zone": "web_unlocker1",
-        "render": True,
-        "format": "raw"
-    }
-    
-    # S'assurer que max_retries est un entier
-    max_retries = int(max_retries)
+        return cached_html
+    
+    # Puis dans le cache disque (pages des exécutions précédentes)
+    disk_cache = get_html_disk_cache()
+    if disk_cache is not None:
+        cached_html = disk_cache.get(cache_key, allow_stale=HTML_CACHE_OFFLINE)
+        if cached_html is not None:
+            print(f"{log_prefix}✅ HTML récupéré depuis le cache disque")
+            HTML_CACHE[cache_key] = cached_html
+            return cached_html
+    
+    if HTML_CACHE_OFFLINE:
+        print(f"{log_prefix}📴 Mode hors ligne: {platform or url} absent du cache")
+        return None
     
-    for attempt in range(max_retries):
-        try:
-            print(f"{log_prefix}🔑 Utilisation du token BrightData: {BRIGHTDATA_TOKEN[:8]}...")
-            print(f"{log_prefix}🌐 Envoi requête BrightData pour: {platform or url}")
-            
-            response = requests.post(
-                "https://api.brightdata.com/request",
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=120
-            )
-            
-            if response.status_code == 200:
-                print(f"{log_prefix}✅ Réponse BrightData reçue")
-                # Stocker dans le cache
-                HTML_CACHE[cache_key] = response.text
-                return response.text
-            else:
-                print(f"{log_prefix}❌ Erreur BrightData {response.status_code}: {response.text}")
-                if attempt < max_retries - 1:
-                    # Attente exponentielle plus courte si ce n'est pas une erreur 429 (rate limiting)
-                    wait_time = 2 ** attempt if response.status_code == 429 else 1
-                    print(f"{log_prefix}⚠️ Tentative {attempt + 2}/{max_retries} dans {wait_time}s")
-                    time.sleep(wait_time)
-                    
-        except Exception as e:
-            print(f"{log_prefix}❌ Erreur lors de la requête BrightData: {str(e)}")
-            if attempt < max_retries - 1:
-                print(f"{log_prefix}⚠️ Tentative {attempt + 2}/{max_retries}")
-                time.sleep(1)  # Attente plus courte en cas d'erreur de connexion
+    def within_budget():
+        # Chaque tentative consomme une requête BrightData facturée
+        if not API_BUDGET.acquire("brightdata"):
+            print(f"{log_prefix}⚠️ Quota BrightData épuisé")
+            return False
+        return True
+    
+    print(f"{log_prefix}🌐 Envoi requête BrightData pour: {platform or url}")
+    html = get_brightdata_client().fetch(
+        url,
+        zone="web_unlocker1",
+        render=True,
+        timeout=120,
+        max_retries=int(max_retries),
+        before_attempt=within_budget,
+        on_retry=lambda zone: record_retry("fetch_html_with_brightdata"),
+        log_prefix=log_prefix
+    )
+    if html is not None:
+        print(f"{log_prefix}✅ Réponse BrightData reçue")
+        # Stocker dans le cache
+        HTML_CACHE[cache_key] = html
+        if disk_cache is not None:
+            disk_cache.set(cache_key, html, platform=platform)
+        return html
                 
     return None
 
@@ -3237,8 +7125,8 @@ def url_to_base64(url, max_size=(800, 600), quality=90):
         elif img.mode != 'RGB':
              img = img.convert('RGB')
              
-        # Utiliser la fonction existante pour encoder (qui ajoute déjà data:image/jpeg;base64,)
-        base64_string = encode_image_base64(img)
+        # Utiliser la fonction existante pour encoder (qui ajoute déjà le préfixe data:image/...)
+        base64_string = encode_image_base64(img, image_format="JPEG", quality=quality, max_size=max_size)
         return base64_string
         
     except requests.exceptions.RequestException as e:
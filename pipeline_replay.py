@@ -0,0 +1,559 @@
+"""
+Enregistrement et rejeu hors ligne du pipeline restaurants
+
+Pendant une exécution réelle de pipeline_complet_fixed.py, les réponses
+de toutes les dépendances externes sont enregistrées dans un répertoire
+de fixtures:
+- "maps": données Google Maps de chaque restaurant (prepare_maps_data)
+- "browser": résultat de la navigation Chrome (process_restaurant_with_maps_screenshots)
+  et capture PNG du panneau transmise à l'OCR
+- "http": pages HTML BrightData / Bing (fetch_html_with_brightdata)
+- "image": photos téléchargées (url_to_base64)
+- "llm": réponses OpenAI (openai.ChatCompletion.create), indexées par prompt
+
+Le rejeu exécute ensuite le traitement complet des restaurants enregistrés
+(pipeline par étapes ou process_restaurant en pool de threads) sans réseau
+ni navigateur: l'OCR, le parsing HTML, la normalisation, la déduplication
+et les écritures MongoDB (base dédiée, locale) tournent réellement. Le
+rapport donne le débit (restaurants/min), la latence par fonction et la
+mémoire maximale; comparé à un rapport de référence, il sert de garde-fou
+contre les régressions de performance.
+
+Structure d'un enregistrement:
+    <dossier>/manifest.json         restaurants traités, configuration, arguments
+    <dossier>/calls.jsonl.gz        une réponse enregistrée par ligne
+    <dossier>/screenshots/<sha1>.png
+
+Utilisation:
+    python pipeline_replay.py record fixtures/montmartre -- --test-area --brightdata
+    python pipeline_replay.py replay fixtures/montmartre --report baseline.json
+    python pipeline_replay.py replay fixtures/montmartre --baseline baseline.json --max-regression 0.1
+
+La découverte (Google Places) n'est pas rejouée: le rejeu part des
+restaurants reçus par prepare_maps_data pendant l'enregistrement. Les
+requêtes OpenAI regroupées (--llm-structuring) ne sont rejouées que si
+les lots sont composés à l'identique; les réponses absentes sont comptées
+dans le rapport ("misses").
+"""
+
+import os
+import sys
+import copy
+import gzip
+import json
+import time
+import types
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import traceback
+import functools
+from datetime import datetime
+
+try:
+    import resource  # Mémoire maximale du processus (Unix)
+except ImportError:
+    resource = None
+
+import pipeline_complet_fixed as pipeline
+import image_store
+
+BUNDLE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CALLS_FILE = "calls.jsonl.gz"
+SCREENSHOTS_DIR = "screenshots"
+REPLAY_DB_NAME = "Restauration_Replay"  # Base dédiée au rejeu, vidée à chaque lancement
+REPLAY_MONGO_URI = "mongodb://localhost:27017"
+MAX_REGRESSION = 0.10  # Dégradation tolérée par rapport au rapport de référence (10%)
+
+# Options du pipeline enregistrées avec les fixtures et rétablies au rejeu
+CONFIG_FLAGS = ("USE_BRIGHTDATA", "BRIGHTDATA_ENABLED", "ENRICH_PLATFORM_DETAILS", "USE_OCR",
+                "USE_LLM_STRUCTURING", "OPENING_HOURS_LLM_FALLBACK", "USE_STAGED_PIPELINE", "USE_DEDUP_INDEX")
+
+def call_key(*parts):
+    """Clé stable d'un appel (hash de ses paramètres)"""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def restaurant_key(restaurant):
+    """Clé d'un restaurant d'entrée ou de ses données Maps"""
+    return call_key(restaurant.get("place_id"), restaurant.get("name"), restaurant.get("address"),
+                    restaurant.get("maps_url"))
+
+def llm_key(kwargs):
+    return call_key(kwargs.get("model"), kwargs.get("messages"), kwargs.get("temperature"))
+
+def serializable(data):
+    """Copie JSON d'un document (sans Future OCR/LLM ni clés internes, préfixées par "_")"""
+    data = {key: value for key, value in data.items() if not key.startswith("_")}
+    return json.loads(json.dumps(data, default=str))
+
+class _Patches:
+    """Remplacements d'attributs de modules, annulés à la fin de l'enregistrement ou du rejeu"""
+    def __init__(self):
+        self.saved = []
+
+    def set(self, owner, name, value):
+        self.saved.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, value)
+
+    def undo(self):
+        while self.saved:
+            owner, name, value = self.saved.pop()
+            setattr(owner, name, value)
+
+# =============================================
+# ENREGISTREMENT
+# =============================================
+
+class Recorder:
+    """
+    Enregistre les réponses externes d'une exécution réelle du pipeline
+
+    Les fonctions interceptées sont remplacées dans le module du pipeline:
+    les appels internes (résolus à l'exécution par leur nom global) passent
+    par l'enregistreur sans modification du pipeline.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, SCREENSHOTS_DIR), exist_ok=True)
+        self.calls = gzip.open(os.path.join(directory, CALLS_FILE), "wt", encoding="utf-8")
+        self.restaurants = {}
+        self.recorded = set()
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.patches = _Patches()
+
+    def record(self, kind, key, value, duration, **extra):
+        with self.lock:
+            if (kind, key) in self.recorded:
+                return
+            self.recorded.add((kind, key))
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.calls.write(json.dumps({"kind": kind, "key": key, "duration": round(duration, 4),
+                                         "value": value, **extra}, default=str) + "\n")
+
+    def save_screenshot(self, png_bytes):
+        digest = hashlib.sha1(png_bytes).hexdigest()
+        path = os.path.join(self.directory, SCREENSHOTS_DIR, f"{digest}.png")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(png_bytes)
+        return digest
+
+    def install(self):
+        prepare_maps_data = pipeline.prepare_maps_data
+        browse = pipeline.process_restaurant_with_maps_screenshots
+        submit_ocr = pipeline.submit_restaurant_ocr
+        fetch_html = pipeline.fetch_html_with_brightdata
+        url_to_base64 = pipeline.url_to_base64
+        chat_create = pipeline.openai.ChatCompletion.create
+
+        @functools.wraps(prepare_maps_data)
+        def record_maps_data(restaurant):
+            start_time = time.perf_counter()
+            maps_data = prepare_maps_data(restaurant)
+            key = restaurant_key(restaurant)
+            with self.lock:
+                self.restaurants.setdefault(key, serializable(restaurant))
+            self.record("maps", key, maps_data, time.perf_counter() - start_time)
+            return maps_data
+
+        @functools.wraps(submit_ocr)
+        def record_ocr_submit(restaurant_data, png_bytes, crop_box=pipeline.OCR_PANEL_CROP):
+            # Capture rattachée au document pour l'enregistrement de la navigation
+            self.local.screenshot = (id(restaurant_data), self.save_screenshot(png_bytes), list(crop_box or ()))
+            return submit_ocr(restaurant_data, png_bytes, crop_box)
+
+        @functools.wraps(browse)
+        def record_browse(maps_data):
+            self.local.screenshot = None
+            start_time = time.perf_counter()
+            restaurant_data = browse(maps_data)
+            duration = time.perf_counter() - start_time
+            screenshot = getattr(self.local, "screenshot", None)
+            if screenshot and restaurant_data is not None and screenshot[0] != id(restaurant_data):
+                screenshot = None
+            self.record("browser", restaurant_key(maps_data),
+                        serializable(restaurant_data) if restaurant_data is not None else None, duration,
+                        screenshot=screenshot[1] if screenshot else None,
+                        crop_box=screenshot[2] if screenshot else None)
+            return restaurant_data
+
+        @functools.wraps(fetch_html)
+        def record_fetch_html(url, name=None, platform=None, max_retries=3):
+            start_time = time.perf_counter()
+            html = fetch_html(url, name, platform, max_retries)
+            if html is not None:
+                self.record("http", call_key(url, platform), html, time.perf_counter() - start_time)
+            return html
+
+        @functools.wraps(url_to_base64)
+        def record_image(url, max_size=(800, 600), quality=90):
+            start_time = time.perf_counter()
+            data = url_to_base64(url, max_size, quality)
+            self.record("image", call_key(url, max_size, quality), data, time.perf_counter() - start_time)
+            return data
+
+        def record_chat(*args, **kwargs):
+            start_time = time.perf_counter()
+            response = chat_create(*args, **kwargs)
+            self.record("llm", llm_key(kwargs), response.choices[0].message.content, time.perf_counter() - start_time)
+            return response
+
+        self.patches.set(pipeline, "prepare_maps_data", record_maps_data)
+        self.patches.set(pipeline, "submit_restaurant_ocr", record_ocr_submit)
+        self.patches.set(pipeline, "process_restaurant_with_maps_screenshots", record_browse)
+        self.patches.set(pipeline, "fetch_html_with_brightdata", record_fetch_html)
+        self.patches.set(pipeline, "url_to_base64", record_image)
+        self.patches.set(pipeline.openai.ChatCompletion, "create", record_chat)
+
+    def close(self, pipeline_args):
+        """Écrit le manifeste et ferme le fichier des réponses"""
+        self.patches.undo()
+        with self.lock:
+            self.calls.close()
+            manifest = {
+                "version": BUNDLE_VERSION,
+                "created_at": datetime.now().isoformat(),
+                "pipeline_args": pipeline_args,
+                "config": {flag: getattr(pipeline, flag) for flag in CONFIG_FLAGS},
+                "counts": self.counts,
+                "restaurants": list(self.restaurants.values()),
+            }
+        with open(os.path.join(self.directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
+
+def record_run(directory, pipeline_args):
+    """
+    Exécute le pipeline avec ses arguments habituels en enregistrant les réponses externes
+
+    Args:
+        directory: Répertoire des fixtures (créé, contenu précédent remplacé)
+        pipeline_args: Arguments de pipeline_complet_fixed.py (ex: ["--test-area"])
+
+    Returns:
+        Manifeste de l'enregistrement
+    """
+    if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        print(f"♻️ Enregistrement existant remplacé: {directory}")
+        shutil.rmtree(directory)
+    recorder = Recorder(directory)
+    recorder.install()
+    sys.argv = ["pipeline_complet_fixed.py"] + list(pipeline_args)
+    try:
+        pipeline.main()
+    except SystemExit:
+        pass
+    finally:
+        manifest = recorder.close(pipeline_args)
+    print(f"\n💾 Enregistrement: {len(manifest['restaurants'])} restaurants, réponses {manifest['counts']} -> {directory}")
+    return manifest
+
+# =============================================
+# REJEU
+# =============================================
+
+class ReplayError(Exception):
+    """Réponse absente de l'enregistrement"""
+
+class Replayer:
+    """
+    Rejoue les réponses enregistrées à la place des dépendances externes
+
+    Args:
+        directory: Répertoire des fixtures
+        latency_scale: Fraction de la durée enregistrée simulée par une pause
+                       (1.0: latences réelles, 0: aucune attente)
+    """
+    def __init__(self, directory, latency_scale=0.0):
+        self.directory = directory
+        self.latency_scale = latency_scale
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Version d'enregistrement non supportée: {self.manifest.get('version')}")
+        self.calls = {}
+        with gzip.open(os.path.join(directory, CALLS_FILE), "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self.calls[(entry["kind"], entry["key"])] = entry
+        self.misses = {}
+        self.lock = threading.Lock()
+        self.patches = _Patches()
+
+    def lookup(self, kind, key):
+        entry = self.calls.get((kind, key))
+        if entry is None:
+            with self.lock:
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+            raise ReplayError(f"Réponse {kind} absente de l'enregistrement")
+        if self.latency_scale > 0:
+            time.sleep(entry["duration"] * self.latency_scale)
+        return entry
+
+    def load_screenshot(self, digest):
+        with open(os.path.join(self.directory, SCREENSHOTS_DIR, f"{digest}.png"), "rb") as f:
+            return f.read()
+
+    def install(self):
+        # Fonctions rejouées mesurées sous leur nom d'origine (latence par étape comparable)
+        def replaces(original):
+            return lambda func: pipeline.timing_decorator(functools.wraps(original)(func))
+
+        @replaces(pipeline.prepare_maps_data)
+        def replay_maps_data(restaurant):
+            try:
+                return copy.deepcopy(self.lookup("maps", restaurant_key(restaurant))["value"])
+            except ReplayError:
+                return None
+
+        @replaces(pipeline.process_restaurant_with_maps_screenshots)
+        def replay_browse(maps_data):
+            try:
+                entry = self.lookup("browser", restaurant_key(maps_data))
+            except ReplayError:
+                return None
+            if entry["value"] is None:
+                return None
+            restaurant_data = copy.deepcopy(entry["value"])
+            # La capture enregistrée repasse par le vrai pool OCR
+            if entry.get("screenshot") and pipeline.USE_OCR:
+                crop_box = tuple(entry["crop_box"]) if entry.get("crop_box") else None
+                pipeline.submit_restaurant_ocr(restaurant_data, self.load_screenshot(entry["screenshot"]), crop_box)
+            return restaurant_data
+
+        @replaces(pipeline.fetch_html_with_brightdata)
+        def replay_fetch_html(url, name=None, platform=None, max_retries=3):
+            try:
+                return self.lookup("http", call_key(url, platform))["value"]
+            except ReplayError:
+                return None
+
+        def replay_image(url, max_size=(800, 600), quality=90):
+            try:
+                return self.lookup("image", call_key(url, max_size, quality))["value"]
+            except ReplayError:
+                return None
+
+        def replay_chat(*args, **kwargs):
+            content = self.lookup("llm", llm_key(kwargs))["value"]
+            message = types.SimpleNamespace(content=content)
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+        self.patches.set(pipeline, "prepare_maps_data", replay_maps_data)
+        self.patches.set(pipeline, "process_restaurant_with_maps_screenshots", replay_browse)
+        self.patches.set(pipeline, "fetch_html_with_brightdata", replay_fetch_html)
+        self.patches.set(pipeline, "url_to_base64", replay_image)
+        self.patches.set(pipeline.openai.ChatCompletion, "create", replay_chat)
+
+    def uninstall(self):
+        self.patches.undo()
+
+def peak_memory_mb():
+    """
+    Mémoire résidente maximale du processus et de ses enfants terminés (OCR), en Mo
+
+    Returns:
+        Dictionnaire {process, children}, valeurs None si indisponible
+    """
+    if resource is None:
+        return {"process": None, "children": None}
+    # ru_maxrss: kilo-octets sous Linux, octets sous macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "process": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor, 1),
+    }
+
+def prepare_replay_environment(replayer, mongo_uri, db_name, keep_db, work_dir):
+    """
+    Configure le pipeline comme lors de l'enregistrement, sur une base et des fichiers dédiés
+
+    Les caches disque, le budget des API et les images sont redirigés vers
+    work_dir: le rejeu ne lit ni ne consomme rien de l'environnement réel.
+    """
+    if db_name == pipeline.DB_NAME:
+        raise ValueError(f"Le rejeu vide sa base: {db_name} est la base de production")
+    for flag, value in replayer.manifest.get("config", {}).items():
+        if hasattr(pipeline, flag):
+            setattr(pipeline, flag, value)
+    replayer.patches.set(pipeline, "DB_NAME", db_name)
+    # Mesures limitées au rejeu
+    replayer.patches.set(pipeline, "METRICS", pipeline.MetricsRegistry())
+    replayer.patches.set(pipeline, "USE_HTML_DISK_CACHE", False)
+    replayer.patches.set(pipeline, "HTML_CACHE_OFFLINE", False)
+    replayer.patches.set(pipeline, "USE_NEARBY_CACHE", False)
+    pipeline.API_BUDGET.use_state_file(os.path.join(work_dir, "api_budget_usage.json"))
+    if pipeline.IMAGE_STORE_BACKEND != "gridfs":
+        replayer.patches.set(pipeline, "IMAGE_STORE",
+                             image_store.get_image_store("filesystem", root=os.path.join(work_dir, "images")))
+    pipeline.MONGO_MANAGER.configure(uri=mongo_uri)
+    if not keep_db:
+        pipeline.get_mongo_client().drop_database(db_name)
+    pipeline.ensure_producers_indexes()
+
+def replay_run(directory, mongo_uri=REPLAY_MONGO_URI, db_name=REPLAY_DB_NAME, mode=None,
+               latency_scale=0.0, keep_db=False):
+    """
+    Rejoue hors ligne le traitement des restaurants enregistrés
+
+    Args:
+        directory: Répertoire des fixtures
+        mongo_uri: MongoDB local servant de base de rejeu
+        db_name: Base de rejeu (vidée au préalable sauf keep_db)
+        mode: "staged" (pipeline par étapes) ou "threadpool" (process_restaurant); défaut: celui enregistré
+        latency_scale: Fraction des latences enregistrées simulée (0: aucune attente)
+        keep_db: Ne pas vider la base de rejeu
+
+    Returns:
+        Rapport (dictionnaire sérialisable en JSON)
+    """
+    replayer = Replayer(directory, latency_scale=latency_scale)
+    restaurants = replayer.manifest["restaurants"]
+    work_dir = tempfile.mkdtemp(prefix="pipeline_replay_")
+    try:
+        prepare_replay_environment(replayer, mongo_uri, db_name, keep_db, work_dir)
+        replayer.install()
+        if mode is None:
+            mode = "staged" if pipeline.USE_STAGED_PIPELINE else "threadpool"
+        pipeline.USE_STAGED_PIPELINE = mode == "staged"
+
+        print(f"\n▶️ Rejeu de {len(restaurants)} restaurants ({mode}, latences x{latency_scale}) sur {db_name}")
+        start_time = time.perf_counter()
+        success, total = pipeline.process_restaurants_with_threadpool(copy.deepcopy(restaurants), skip_existing=False)
+        elapsed = time.perf_counter() - start_time
+        stored = pipeline.get_producers_collection().count_documents({})
+        pipeline.close_llm_batcher()
+        pipeline.close_ocr_pool()
+        functions = pipeline.METRICS.snapshot()["functions"]
+    finally:
+        replayer.uninstall()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "bundle": os.path.abspath(directory),
+        "generated_at": datetime.now().isoformat(),
+        "mode": mode,
+        "latency_scale": latency_scale,
+        "restaurants": total,
+        "success": success,
+        "stored_documents": stored,
+        "elapsed_seconds": round(elapsed, 3),
+        "restaurants_per_minute": round(total * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+        "memory_mb": peak_memory_mb(),
+        "functions": functions,
+        "misses": replayer.misses,
+    }
+
+def print_report(report):
+    print(f"\n📊 REJEU: {report['success']}/{report['restaurants']} restaurants en {report['elapsed_seconds']:.1f}s "
+          f"({report['restaurants_per_minute']:.1f} restaurants/min), {report['stored_documents']} documents en base")
+    memory = report["memory_mb"]
+    if memory["process"] is not None:
+        print(f"🧠 Mémoire max: {memory['process']:.0f} Mo (processus), {memory['children']:.0f} Mo (processus enfants: OCR)")
+    if report["misses"]:
+        print(f"⚠️ Réponses absentes de l'enregistrement: {report['misses']}")
+    print(f"\n{'Fonction':<45} | {'Appels':<7} | {'p50 (s)':<8} | {'p95 (s)':<8} | {'Total (s)':<9}")
+    print("-" * 90)
+    for name, stats in sorted(report["functions"].items(), key=lambda item: -item[1]["sum"]):
+        print(f"{name:<45} | {stats['count']:<7} | {stats['p50']:<8.3f} | {stats['p95']:<8.3f} | {stats['sum']:<9.2f}")
+
+def compare_reports(report, baseline, max_regression=MAX_REGRESSION):
+    """
+    Compare un rapport de rejeu à un rapport de référence
+
+    Le débit ne doit pas baisser, ni la mémoire maximale augmenter, de plus
+    de max_regression. Les latences par fonction sont affichées à titre
+    indicatif (trop variables sur de petits enregistrements pour bloquer).
+
+    Returns:
+        Liste des régressions bloquantes (vide si le rejeu passe)
+    """
+    regressions = []
+    print(f"\n⚖️ COMPARAISON AVEC LA RÉFÉRENCE ({baseline.get('generated_at', '?')})")
+    if baseline.get("bundle") != report["bundle"] or baseline.get("mode") != report["mode"]:
+        print("⚠️ Enregistrement ou mode différent de la référence: comparaison indicative")
+
+    before, after = baseline.get("restaurants_per_minute") or 0, report["restaurants_per_minute"]
+    change = (after - before) / before if before else 0.0
+    print(f"  Débit: {before:.1f} -> {after:.1f} restaurants/min ({change:+.0%})")
+    if before and change < -max_regression:
+        regressions.append(f"débit en baisse de {-change:.0%}")
+
+    before = (baseline.get("memory_mb") or {}).get("process")
+    after = report["memory_mb"]["process"]
+    if before and after:
+        change = (after - before) / before
+        print(f"  Mémoire max: {before:.0f} -> {after:.0f} Mo ({change:+.0%})")
+        if change > max_regression:
+            regressions.append(f"mémoire en hausse de {change:.0%}")
+
+    if report["success"] < baseline.get("success", 0):
+        regressions.append(f"{baseline['success'] - report['success']} restaurants traités en moins")
+
+    for name, stats in sorted(report["functions"].items()):
+        reference = baseline.get("functions", {}).get(name)
+        if reference and reference["p95"] > 0:
+            change = (stats["p95"] - reference["p95"]) / reference["p95"]
+            if abs(change) > max_regression:
+                print(f"  {name}: p95 {reference['p95']:.3f}s -> {stats['p95']:.3f}s ({change:+.0%})")
+
+    for regression in regressions:
+        print(f"❌ Régression: {regression}")
+    if not regressions:
+        print("✅ Aucune régression au-delà du seuil")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistrement et rejeu hors ligne du pipeline restaurants")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Exécuter le pipeline en enregistrant les réponses externes")
+    record_parser.add_argument("bundle", help="Répertoire des fixtures à créer")
+    record_parser.add_argument("pipeline_args", nargs=argparse.REMAINDER,
+                               help="Arguments de pipeline_complet_fixed.py, après -- (ex: -- --test-area)")
+
+    replay_parser = subparsers.add_parser("replay", help="Rejouer un enregistrement hors ligne et mesurer le débit")
+    replay_parser.add_argument("bundle", help="Répertoire des fixtures")
+    replay_parser.add_argument("--mongo-uri", default=REPLAY_MONGO_URI, help=f"MongoDB de rejeu (défaut: {REPLAY_MONGO_URI})")
+    replay_parser.add_argument("--db", default=REPLAY_DB_NAME, help=f"Base de rejeu, vidée au préalable (défaut: {REPLAY_DB_NAME})")
+    replay_parser.add_argument("--keep-db", action="store_true", help="Ne pas vider la base de rejeu")
+    replay_parser.add_argument("--mode", choices=["staged", "threadpool"], help="Pipeline par étapes ou process_restaurant (défaut: celui enregistré)")
+    replay_parser.add_argument("--latency-scale", type=float, default=0.0,
+                               help="Fraction des latences enregistrées simulée (défaut: 0, 1 = latences réelles)")
+    replay_parser.add_argument("--report", help="Fichier JSON où écrire le rapport")
+    replay_parser.add_argument("--baseline", help="Rapport de référence: code de sortie 1 en cas de régression")
+    replay_parser.add_argument("--max-regression", type=float, default=MAX_REGRESSION,
+                               help=f"Dégradation tolérée (défaut: {MAX_REGRESSION})")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        pipeline_args = args.pipeline_args[1:] if args.pipeline_args[:1] == ["--"] else args.pipeline_args
+        record_run(args.bundle, pipeline_args)
+        return
+
+    try:
+        report = replay_run(args.bundle, mongo_uri=args.mongo_uri, db_name=args.db, mode=args.mode,
+                            latency_scale=max(0.0, args.latency_scale), keep_db=args.keep_db)
+    except Exception as e:
+        print(f"❌ Rejeu impossible: {e}")
+        traceback.print_exc()
+        raise SystemExit(2)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Rapport écrit dans {args.report}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare_reports(report, baseline, max_regression=args.max_regression):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+Déduplication des restaurants entre sources
+
+Un même restaurant peut arriver plusieurs fois dans producers: place_id
+Google dans un cas, identifiant custom_ généré dans un autre, nom écrit
+différemment selon la source ("Le Comptoir du Relais" / "Comptoir du
+Relais"). Ce module fournit:
+- des identifiants custom_ stables (même restaurant -> même identifiant)
+- un index en mémoire: cases geohash (~150 m) + similarité des noms
+  normalisés, pour rattacher un candidat à un document existant
+- un traitement par lots qui fusionne les doublons déjà en base
+
+Deux restaurants ayant chacun un place_id Google différent ne sont jamais
+fusionnés: seuls les rapprochements impliquant au moins un identifiant
+custom_ sont retenus.
+
+Utilisation en ligne de commande:
+    python restaurant_dedup.py merge --db Restauration_Officielle --collection producers --dry-run
+"""
+
+import os
+import re
+import math
+import time
+import hashlib
+import argparse
+import threading
+import traceback
+import unicodedata
+from difflib import SequenceMatcher
+
+from pymongo import MongoClient
+
+try:
+    import Levenshtein
+except ImportError:
+    Levenshtein = None  # Similarité calculée avec difflib (plus lent)
+
+# Configuration
+GEOHASH_PRECISION = 7  # Case d'environ 150 m x 100 m à Paris
+DEDUP_MAX_DISTANCE_M = 80  # Distance max entre deux fiches d'un même restaurant
+DEDUP_NAME_THRESHOLD = 0.85  # Similarité minimale des noms normalisés (0-1)
+SUBSET_SIMILARITY = 0.9  # Similarité d'un nom contenu dans l'autre (mots ajoutés: quartier, spécialité)
+CUSTOM_ID_PREFIX = "custom_"
+MERGE_BATCH_SIZE = 200  # Groupes de doublons fusionnés par lot
+
+# Mots sans valeur distinctive dans un nom de restaurant
+NAME_STOPWORDS = {"le", "la", "les", "l", "de", "du", "des", "d", "et", "the", "restaurant", "resto", "paris"}
+EMPTY_VALUES = (None, "", 0, [], {})
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+def normalize_text(text):
+    """Minuscules, sans accents ni ponctuation"""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM_RE.sub(" ", text.lower()).strip()
+
+def normalize_name(name):
+    """Nom comparable entre sources: sans accents, ponctuation ni mots vides"""
+    tokens = [token for token in normalize_text(name).split() if token not in NAME_STOPWORDS]
+    # Un nom composé uniquement de mots vides ("Le Restaurant") reste comparable
+    return " ".join(tokens) or normalize_text(name)
+
+def name_similarity(a, b):
+    """
+    Similarité de deux noms normalisés (0-1)
+
+    Maximum du ratio de Levenshtein sur les noms et sur leurs mots triés
+    (insensible à l'ordre: "relais comptoir" / "comptoir relais"). Un nom
+    d'au moins deux mots entièrement contenu dans l'autre ("comptoir relais" /
+    "comptoir relais saint germain") vaut SUBSET_SIMILARITY.
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    shorter, longer = sorted((tokens_a, tokens_b), key=len)
+    if len(shorter) >= 2 and shorter <= longer:
+        return SUBSET_SIMILARITY
+    ratio = Levenshtein.ratio if Levenshtein is not None else (lambda x, y: SequenceMatcher(None, x, y).ratio())
+    sorted_a, sorted_b = " ".join(sorted(a.split())), " ".join(sorted(b.split()))
+    return max(ratio(a, b), ratio(sorted_a, sorted_b) if (sorted_a, sorted_b) != (a, b) else 0.0)
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    """Geohash d'un point (chaîne base32 de precision caractères)"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (lon, lon_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            bounds[0] = mid
+        else:
+            bits *= 2
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+def geohash_cell_size(precision=GEOHASH_PRECISION):
+    """Dimensions (degrés de latitude, degrés de longitude) d'une case geohash"""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+def geohash_neighbourhood(lat, lon, precision=GEOHASH_PRECISION):
+    """Case du point et ses 8 voisines"""
+    dlat, dlon = geohash_cell_size(precision)
+    return {geohash_encode(lat + i * dlat, lon + j * dlon, precision) for i in (-1, 0, 1) for j in (-1, 0, 1)}
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Distance approchée en mètres (équirectangulaire, précise à cette échelle)"""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371000 * math.hypot(x, y)
+
+def has_coordinates(lat, lon):
+    return lat is not None and lon is not None and not (lat == 0 and lon == 0)
+
+def is_custom_id(doc_id):
+    return isinstance(doc_id, str) and doc_id.startswith(CUSTOM_ID_PREFIX)
+
+def stable_restaurant_id(name, address=None, lat=None, lon=None):
+    """
+    Identifiant custom_ déterministe d'un restaurant sans place_id
+
+    Calculé sur le nom normalisé et la case geohash (ou l'adresse normalisée
+    sans coordonnées): deux passages sur le même restaurant donnent le même
+    identifiant au lieu d'un nouveau document.
+    """
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        lat = lon = None
+    normalized = normalize_name(name)
+    location = geohash_encode(lat, lon) if has_coordinates(lat, lon) else normalize_text(address)
+    digest = hashlib.sha1(f"{normalized}|{location}".encode("utf-8")).hexdigest()[:10]
+    slug = (normalized or "unknown").replace(" ", "_")[:30]
+    return f"{CUSTOM_ID_PREFIX}{digest}_{slug}"
+
+def doc_coordinates(doc):
+    """(lat, lon) d'un document producers (GeoJSON) ou d'un restaurant du pipeline"""
+    coordinates = (doc.get("gps_coordinates") or {}).get("coordinates")
+    if coordinates and len(coordinates) >= 2:
+        return coordinates[1], coordinates[0]
+    lat = doc.get("latitude", doc.get("lat"))
+    lon = doc.get("longitude", doc.get("lon"))
+    return lat, lon
+
+class DedupIndex:
+    """
+    Index de rapprochement des restaurants, thread-safe
+
+    Les fiches géolocalisées sont rangées par case geohash: un candidat n'est
+    comparé qu'aux fiches de sa case et des 8 voisines (quelques dizaines au
+    plus à Paris). Les fiches sans coordonnées sont retrouvées par nom et
+    adresse normalisés exacts.
+    """
+    def __init__(self, max_distance_m=DEDUP_MAX_DISTANCE_M, name_threshold=DEDUP_NAME_THRESHOLD,
+                 precision=GEOHASH_PRECISION):
+        self.max_distance_m = max_distance_m
+        self.name_threshold = name_threshold
+        self.precision = precision
+        self._cells = {}  # geohash -> {doc_id: (nom normalisé, lat, lon)}
+        self._by_address = {}  # (nom normalisé, adresse normalisée) -> doc_id
+        self._entries = {}  # doc_id -> clé de rangement (geohash ou (nom, adresse))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, doc_id, name, lat=None, lon=None, address=None):
+        """Ajoute (ou déplace) une fiche dans l'index"""
+        normalized = normalize_name(name)
+        if not doc_id or not normalized:
+            return
+        with self._lock:
+            self._remove_locked(doc_id)
+            if has_coordinates(lat, lon):
+                cell = geohash_encode(lat, lon, self.precision)
+                self._cells.setdefault(cell, {})[doc_id] = (normalized, lat, lon)
+                self._entries[doc_id] = cell
+            else:
+                key = (normalized, normalize_text(address))
+                self._by_address.setdefault(key, doc_id)
+                self._entries[doc_id] = key
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id):
+        key = self._entries.pop(doc_id, None)
+        if isinstance(key, str):
+            self._cells.get(key, {}).pop(doc_id, None)
+        elif key is not None and self._by_address.get(key) == doc_id:
+            del self._by_address[key]
+
+    def candidates(self, name, lat=None, lon=None, address=None):
+        """
+        Fiches correspondant à un restaurant, de la plus probable à la moins probable
+
+        Returns:
+            Liste de tuples (doc_id, similarité du nom, distance en mètres)
+        """
+        normalized = normalize_name(name)
+        if not normalized:
+            return []
+        matches = []
+        with self._lock:
+            if has_coordinates(lat, lon):
+                for cell in geohash_neighbourhood(lat, lon, self.precision):
+                    for doc_id, (other_name, other_lat, other_lon) in self._cells.get(cell, {}).items():
+                        distance = distance_m(lat, lon, other_lat, other_lon)
+                        if distance > self.max_distance_m:
+                            continue
+                        similarity = name_similarity(normalized, other_name)
+                        if similarity >= self.name_threshold:
+                            matches.append((doc_id, similarity, distance))
+            doc_id = self._by_address.get((normalized, normalize_text(address)))
+            if doc_id is not None and all(match[0] != doc_id for match in matches):
+                matches.append((doc_id, 1.0, None))
+        matches.sort(key=lambda match: (-match[1], match[2] if match[2] is not None else float("inf")))
+        return matches
+
+    def resolve(self, name, lat=None, lon=None, address=None, doc_id=None):
+        """
+        Document existant correspondant à un restaurant candidat
+
+        Args:
+            name, lat, lon, address: Données du candidat
+            doc_id: Identifiant du candidat (place_id ou custom_), s'il en a un
+
+        Returns:
+            Identifiant du document existant, ou None si le restaurant est nouveau
+        """
+        if doc_id and doc_id in self._entries:
+            return doc_id
+        for other_id, _, _ in self.candidates(name, lat, lon, address):
+            # Deux place_id Google distincts désignent deux établissements distincts
+            if not doc_id or is_custom_id(doc_id) or is_custom_id(other_id):
+                return other_id
+        return None
+
+    @classmethod
+    def from_collection(cls, collection, **kwargs):
+        """Construit l'index à partir des documents d'une collection (nom, adresse, coordonnées)"""
+        index = cls(**kwargs)
+        for doc in collection.find({}, {"name": 1, "address": 1, "gps_coordinates": 1}):
+            lat, lon = doc_coordinates(doc)
+            index.add(doc["_id"], doc.get("name"), lat, lon, doc.get("address"))
+        return index
+
+# =============================================
+# FUSION DES DOUBLONS EXISTANTS
+# =============================================
+
+def find_duplicate_groups(docs, index=None):
+    """
+    Regroupe les documents qui désignent le même restaurant
+
+    Args:
+        docs: Documents (_id, name, address, gps_coordinates)
+        index: DedupIndex à utiliser (défaut: paramètres du module)
+
+    Returns:
+        Liste de listes d'identifiants (groupes d'au moins deux documents)
+    """
+    index = index or DedupIndex()
+    docs = list(docs)
+    for doc in docs:
+        lat, lon = doc_coordinates(doc)
+        index.add(doc["_id"], doc.get("name"), lat, lon, doc.get("address"))
+
+    # Union-find: A~B et B~C regroupent A, B et C, sauf si le groupe réunirait
+    # deux place_id Google distincts (deux établissements voisins au nom proche)
+    parent = {}
+    google_roots = {doc["_id"] for doc in docs if not is_custom_id(doc["_id"])}  # Groupes ayant déjà un place_id Google
+
+    def find(doc_id):
+        parent.setdefault(doc_id, doc_id)
+        while parent[doc_id] != doc_id:
+            parent[doc_id] = parent[parent[doc_id]]
+            doc_id = parent[doc_id]
+        return doc_id
+
+    # Paires les plus sûres d'abord (nom le plus proche, puis distance la plus faible)
+    pairs = []
+    for doc in docs:
+        lat, lon = doc_coordinates(doc)
+        for other_id, similarity, distance in index.candidates(doc.get("name"), lat, lon, doc.get("address")):
+            if other_id != doc["_id"] and (is_custom_id(doc["_id"]) or is_custom_id(other_id)):
+                pairs.append((-similarity, distance if distance is not None else 0.0, str(doc["_id"]), doc["_id"], other_id))
+    pairs.sort(key=lambda pair: pair[:3])
+
+    for _, _, _, doc_id, other_id in pairs:
+        root, other_root = find(doc_id), find(other_id)
+        if root == other_root or (root in google_roots and other_root in google_roots):
+            continue
+        parent[other_root] = root
+        if other_root in google_roots:
+            google_roots.discard(other_root)
+            google_roots.add(root)
+
+    groups = {}
+    for doc in docs:
+        groups.setdefault(find(doc["_id"]), []).append(doc["_id"])
+    return [sorted(group, key=str) for group in groups.values() if len(group) > 1]
+
+def _filled_fields(doc):
+    return sum(1 for value in doc.values() if value not in EMPTY_VALUES)
+
+def choose_survivor(docs):
+    """Document conservé: place_id Google d'abord, puis le plus complet, puis le plus ancien"""
+    def rank(doc):
+        created_at = doc.get("created_at")
+        return (is_custom_id(doc["_id"]), -_filled_fields(doc), created_at is None, created_at or 0, str(doc["_id"]))
+    return min(docs, key=rank)
+
+def merge_documents(survivor, others):
+    """
+    Champs à écrire sur le document conservé
+
+    Les champs vides du document conservé sont complétés par les doublons;
+    les dates de collecte (fetched_at.<groupe>) manquantes sont reprises.
+
+    Returns:
+        Dictionnaire pour $set
+    """
+    updates = {}
+    for other in others:
+        for field, value in other.items():
+            if field in ("_id", "place_id", "created_at", "updated_at", "fetched_at", "merged_ids"):
+                continue
+            if survivor.get(field) in EMPTY_VALUES and field not in updates and value not in EMPTY_VALUES:
+                updates[field] = value
+        for group, fetched_at in (other.get("fetched_at") or {}).items():
+            if group not in (survivor.get("fetched_at") or {}) and f"fetched_at.{group}" not in updates:
+                updates[f"fetched_at.{group}"] = fetched_at
+    # Coordonnées nulles ([0, 0]) remplacées par celles d'un doublon
+    if not has_coordinates(*doc_coordinates(survivor)):
+        for other in others:
+            if has_coordinates(*doc_coordinates(other)):
+                updates["gps_coordinates"] = other["gps_coordinates"]
+                break
+    return updates
+
+def merge_duplicates(collection, dry_run=False, batch_size=MERGE_BATCH_SIZE, index=None):
+    """
+    Fusionne les doublons d'une collection
+
+    Pour chaque groupe, le document conservé est complété puis reçoit les
+    identifiants fusionnés (merged_ids); les autres documents sont supprimés
+    ensuite (un arrêt entre les deux laisse au pire le doublon en place).
+
+    Args:
+        collection: Collection MongoDB (ex: producers)
+        dry_run: Afficher les groupes sans rien modifier
+        batch_size: Groupes chargés par requête
+        index: DedupIndex à utiliser (défaut: paramètres du module)
+
+    Returns:
+        Dictionnaire {documents, groups, removed}
+    """
+    start_time = time.time()
+    docs = list(collection.find({}, {"name": 1, "address": 1, "gps_coordinates": 1}))
+    groups = find_duplicate_groups(docs, index=index)
+    stats = {"documents": len(docs), "groups": len(groups), "removed": 0}
+    print(f"🔎 {len(groups)} groupes de doublons parmi {len(docs)} documents ({time.time() - start_time:.1f}s)")
+
+    for start in range(0, len(groups), batch_size):
+        batch = groups[start:start + batch_size]
+        ids = [doc_id for group in batch for doc_id in group]
+        full_docs = {doc["_id"]: doc for doc in collection.find({"_id": {"$in": ids}})}
+        for group in batch:
+            group_docs = [full_docs[doc_id] for doc_id in group if doc_id in full_docs]
+            if len(group_docs) < 2:
+                continue
+            survivor = choose_survivor(group_docs)
+            others = [doc for doc in group_docs if doc["_id"] != survivor["_id"]]
+            other_ids = [doc["_id"] for doc in others]
+            print(f"{'🔍' if dry_run else '🔗'} {survivor.get('name')} ({survivor['_id']}) <- "
+                  + ", ".join(f"{doc.get('name')} ({doc['_id']})" for doc in others))
+            if dry_run:
+                stats["removed"] += len(others)
+                continue
+            try:
+                update = {"$addToSet": {"merged_ids": {"$each": other_ids}}}
+                updates = merge_documents(survivor, others)
+                if updates:
+                    update["$set"] = updates
+                collection.update_one({"_id": survivor["_id"]}, update)
+                stats["removed"] += collection.delete_many({"_id": {"$in": other_ids}}).deleted_count
+            except Exception as e:
+                print(f"❌ Fusion impossible pour {survivor.get('name')}: {str(e)}")
+                traceback.print_exc()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Déduplication des restaurants entre sources")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = subparsers.add_parser("merge", help="Fusionner les doublons déjà en base")
+    merge_parser.add_argument("--uri", type=str, default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"), help="URI MongoDB")
+    merge_parser.add_argument("--db", type=str, default="Restauration_Officielle", help="Base de données")
+    merge_parser.add_argument("--collection", type=str, default="producers", help="Collection")
+    merge_parser.add_argument("--max-distance", type=float, default=DEDUP_MAX_DISTANCE_M, help=f"Distance max en mètres (défaut: {DEDUP_MAX_DISTANCE_M})")
+    merge_parser.add_argument("--threshold", type=float, default=DEDUP_NAME_THRESHOLD, help=f"Similarité minimale des noms (défaut: {DEDUP_NAME_THRESHOLD})")
+    merge_parser.add_argument("--dry-run", action="store_true", help="Afficher les doublons sans rien modifier")
+
+    args = parser.parse_args()
+    if args.command == "merge":
+        client = MongoClient(args.uri)
+        try:
+            index = DedupIndex(max_distance_m=args.max_distance, name_threshold=args.threshold)
+            stats = merge_duplicates(client[args.db][args.collection], dry_run=args.dry_run, index=index)
+            print(f"✅ {stats['groups']} groupes, {stats['removed']} documents "
+                  f"{'à supprimer' if args.dry_run else 'supprimés'} sur {stats['documents']}")
+        finally:
+            client.close()
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,6 @@ import requests
 import time
 import re
 import json
-from bs4 import BeautifulSoup
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from pymongo import MongoClient
 from collections import OrderedDict
@@ -28,6 +27,9 @@ from pprint import pformat
 import Levenshtein
 import traceback
 from math import cos, sin, sqrt, atan2, radians, degrees
+import image_store  # Stockage des images par contenu (profile_photo en référence)
+import brightdata_client  # Client HTTP BrightData partagé avec pipeline_complet_fixed.py
+import html_parsing  # Parsing HTML rapide (lxml/selectolax si disponibles)
 
 # Limiter le nombre de threads pour éviter le "Resource temporarily unavailable"
 os.environ["OPENBLAS_NUM_THREADS"] = "1"
@@ -241,42 +243,21 @@ def get_brightdata_request(url, timeout=30):
         logger.warning("BrightData n'est pas activé (token manquant)")
         return None
         
-    try:
-        # Configuration complète pour Web Unlocker API
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {BRIGHTDATA_TOKEN}"
-        }
-        
-        # Configuration des paramètres - retirer "device" qui cause l'erreur 400
-        payload = {
-            "zone": BRIGHTDATA_ZONE,
-            "url": url,
-            "format": "raw",
-            "country": "fr",
-            # "device": "desktop",  # Supprimé car non autorisé
-            "render": True
-        }
-        
-        logger.info(f"Requête BrightData vers: {url}")
-        
-        # Requête avec BrightData Web Unlocker API
-        response = requests.post(
-            "https://api.brightdata.com/request", 
-            headers=headers, 
-            json=payload,
-            timeout=timeout
-        )
-        
-        # Log détaillé en cas d'erreur
-        if response.status_code != 200:
-            logger.error(f"Réponse BrightData {response.status_code}: {response.text[:200]}")
-            return None
-            
-        return response.text
-    except Exception as e:
-        logger.error(f"Erreur de requête BrightData: {e}")
-        return None
+    logger.info(f"Requête BrightData vers: {url}")
+    
+    # Client partagé: connexions keep-alive, nouvelles tentatives sur 429/5xx,
+    # limite de requêtes simultanées par zone
+    # ("device" n'est pas transmis: non autorisé par l'API, erreur 400)
+    html = brightdata_client.get_client(token=BRIGHTDATA_TOKEN).fetch(
+        url,
+        zone=BRIGHTDATA_ZONE,
+        render=True,
+        country="fr",
+        timeout=timeout
+    )
+    if html is None:
+        logger.error(f"Échec de la requête BrightData pour {url}")
+    return html
 
 # --- FONCTION UTILITAIRE : Générer une grille de points autour d'un centre ---
 def generate_grid_points(center_lat, center_lng, radius_m, spacing_m=500):
@@ -538,8 +519,8 @@ def search_links_bing(name, city="Paris"):
             logger.error(f"Échec de la requête Bing: code {response.status_code}")
             return None
         
-        # Parser les résultats
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Parser les résultats (seules les citations et les liens sont lus)
+        soup = html_parsing.make_soup(response.text, parse_only=html_parsing.only_tags('cite', 'a'))
         
         # Méthode 1: Chercher dans les éléments <a> avec href
         tripadvisor_urls = []
@@ -1338,6 +1319,17 @@ def process_place(place):
         traceback.print_exc()
         return None
 
+# Stockage des photos de profil hors des documents BeautyPlaces
+WELLNESS_IMAGE_STORE = None
+
+def get_wellness_image_store():
+    """Retourne le stockage d'images (GridFS dans la base courante si configuré)"""
+    global WELLNESS_IMAGE_STORE
+    if WELLNESS_IMAGE_STORE is None:
+        use_gridfs = image_store.IMAGE_STORE_BACKEND == "gridfs"
+        WELLNESS_IMAGE_STORE = image_store.get_image_store(db=db if use_gridfs else None)
+    return WELLNESS_IMAGE_STORE
+
 # --- AJOUT : Fonction de sauvegarde MongoDB robuste ---
 def save_to_mongo(place):
     """Insère ou met à jour un lieu dans la collection BeautyPlaces de MongoDB selon le schéma WellnessPlaceSchema."""
@@ -1355,6 +1347,13 @@ def save_to_mongo(place):
                     # Générer une description par défaut si manquante
                     place["description"] = f"Établissement de {place.get('category', 'beauté et bien-être')} situé à {place.get('location', {}).get('city', 'Paris')}."
         
+        # La photo de profil (URL data base64) est remplacée par sa référence (IMAGE_STORE_ENABLED=true)
+        if image_store.IMAGE_STORE_ENABLED:
+            try:
+                image_store.externalize_images(place, ["profile_photo"], get_wellness_image_store())
+            except Exception as e:
+                logger.warning(f"Photo de profil conservée inline pour {place.get('name', 'Lieu inconnu')}: {e}")
+        
         collection = db["BeautyPlaces"]
         existing = collection.find_one({"place_id": place["place_id"]})
         